@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Rapports Partenaires - Créances, Dettes et Grand Livre Détaillé',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Accounting',
     'summary': 'Rapports PDF Créances Clients, Dettes Fournisseurs et Grand Livre Détaillé',
     'depends': ['account', 'accounting_pdf_reports'],
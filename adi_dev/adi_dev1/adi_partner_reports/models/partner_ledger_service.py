@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models
+
+# Number of journal items fetched per ledger page
+LEDGER_PAGE_SIZE = 2000
+
+
+class PartnerLedgerService(models.AbstractModel):
+    _name = 'partner.ledger.service'
+    _description = 'Service Soldes et Grand Livre Partenaires'
+
+    @api.model
+    def _get_report_options(self, data):
+        """Build the service options from the data of a partner report.
+
+        Options keys:
+            account_ids: receivable/payable accounts to read
+            move_states: accepted account.move states
+            reconciled: include fully reconciled items
+            partner_ids: restrict to these partners (optional)
+            user_ids: restrict to these invoice salespersons (optional)
+            used_context: context given to account.move.line._query_get
+        """
+        form = data['form']
+        return {
+            'account_ids': data['computed']['account_ids'],
+            'move_states': data['computed']['move_state'],
+            'reconciled': form.get('reconciled', True),
+            'partner_ids': form.get('partner_ids') or [],
+            'user_ids': form.get('user_ids') or [],
+            'used_context': form.get('used_context', {}),
+        }
+
+    @api.model
+    def _get_query_parts(self, options):
+        """Return (from_clause, where_clause, params) selecting the partner
+        journal items matching the options. The journal items table keeps
+        the "account_move_line" alias, the move is joined as m."""
+        tables, where_clause, where_params = self.env['account.move.line'].with_context(
+            options.get('used_context', {}))._query_get()
+        from_clause = (tables or '"account_move_line"') + \
+            ' JOIN account_move m ON (m.id = "account_move_line".move_id)'
+
+        clauses, params = [], []
+        if where_clause:
+            clauses.append(where_clause)
+            params += where_params
+        clauses += [
+            '"account_move_line".partner_id IS NOT NULL',
+            'm.state IN %s',
+            '"account_move_line".account_id IN %s',
+        ]
+        params += [tuple(options['move_states']), tuple(options['account_ids'])]
+        if not options.get('reconciled', True):
+            clauses.append('"account_move_line".full_reconcile_id IS NULL')
+        if options.get('partner_ids'):
+            clauses.append('"account_move_line".partner_id IN %s')
+            params.append(tuple(options['partner_ids']))
+        if options.get('user_ids'):
+            clauses.append('m.invoice_user_id IN %s')
+            params.append(tuple(options['user_ids']))
+        return from_clause, ' AND '.join(clauses), params
+
+    @api.model
+    def _get_partner_balances(self, options, group_by_user=False, hide_empty=False):
+        """Sum debit, credit and balance of every partner in one query.
+
+        :returns: list of dicts (partner_id, ref, name, [user_id,] total_debit,
+                  total_credit, balance) ordered by partner ref and name
+        """
+        if not options['account_ids']:
+            return []
+        from_clause, where_clause, params = self._get_query_parts(options)
+        select_fields = '"account_move_line".partner_id, rp.ref, rp.name'
+        group_fields = '"account_move_line".partner_id, rp.ref, rp.name'
+        if group_by_user:
+            select_fields += ', m.invoice_user_id AS user_id'
+            group_fields += ', m.invoice_user_id'
+        having_clause = ""
+        if hide_empty:
+            having_clause = 'HAVING SUM("account_move_line".debit) != 0 OR SUM("account_move_line".credit) != 0'
+        query = """
+            SELECT """ + select_fields + """,
+                   SUM("account_move_line".debit) AS total_debit,
+                   SUM("account_move_line".credit) AS total_credit,
+                   SUM("account_move_line".debit - "account_move_line".credit) AS balance
+            FROM """ + from_clause + """
+            LEFT JOIN res_partner rp ON (rp.id = "account_move_line".partner_id)
+            WHERE """ + where_clause + """
+            GROUP BY """ + group_fields + """
+            """ + having_clause + """
+            ORDER BY rp.ref, rp.name, """ + group_fields
+        self.env.cr.execute(query, tuple(params))
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _get_partner_sums(self, options):
+        """Debit, credit and balance per partner, keyed by partner_id."""
+        return {
+            row['partner_id']: {
+                'debit': row['total_debit'] or 0.0,
+                'credit': row['total_credit'] or 0.0,
+                'debit - credit': row['balance'] or 0.0,
+            }
+            for row in self._get_partner_balances(options)
+        }
+
+    @api.model
+    def _get_ledger_page(self, options, after=None, limit=LEDGER_PAGE_SIZE):
+        """Read one page of journal items ordered by partner, date and id.
+
+        Pagination uses the (partner_id, date, id) key of the last item of
+        the previous page instead of an OFFSET, so every page costs the same
+        whatever the size of the ledger.
+
+        :param after: key returned by the previous call, None for the first page
+        :returns: (rows, key of the next page or None when done)
+        """
+        if not options['account_ids']:
+            return [], None
+        from_clause, where_clause, params = self._get_query_parts(options)
+        if after:
+            where_clause += ' AND ("account_move_line".partner_id, "account_move_line".date, ' \
+                            '"account_move_line".id) > (%s, %s, %s)'
+            params += list(after)
+        query = """
+            SELECT "account_move_line".id,
+                   "account_move_line".partner_id,
+                   "account_move_line".date,
+                   j.code,
+                   acc.code as a_code,
+                   acc.name as a_name,
+                   "account_move_line".ref,
+                   m.name as move_name,
+                   "account_move_line".name,
+                   "account_move_line".debit,
+                   "account_move_line".credit,
+                   "account_move_line".amount_currency,
+                   "account_move_line".currency_id,
+                   c.symbol AS currency_code,
+                   "account_move_line".move_id
+            FROM """ + from_clause + """
+            LEFT JOIN account_journal j ON ("account_move_line".journal_id = j.id)
+            LEFT JOIN account_account acc ON ("account_move_line".account_id = acc.id)
+            LEFT JOIN res_currency c ON ("account_move_line".currency_id = c.id)
+            WHERE """ + where_clause + """
+            ORDER BY "account_move_line".partner_id, "account_move_line".date, "account_move_line".id
+            LIMIT %s"""
+        self.env.cr.execute(query, tuple(params) + (limit,))
+        rows = self.env.cr.dictfetchall()
+        next_key = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_key = (last['partner_id'], last['date'], last['id'])
+        return rows, next_key
+
+    @api.model
+    def _get_partner_ledgers(self, options):
+        """Read the ledger of every partner page by page.
+
+        :returns: dict {partner_id: [lines]} with the displayed name and the
+                  running balance ('progress') of each line
+        """
+        currency = self.env['res.currency']
+        ledgers = {}
+        progress = {}
+        rows, after = self._get_ledger_page(options)
+        while rows:
+            for r in rows:
+                r['displayed_name'] = '-'.join(
+                    r[field_name] for field_name in ('move_name', 'ref', 'name')
+                    if r[field_name] not in (None, '', '/')
+                )
+                progress[r['partner_id']] = progress.get(r['partner_id'], 0.0) + r['debit'] - r['credit']
+                r['progress'] = progress[r['partner_id']]
+                r['currency_id'] = currency.browse(r.get('currency_id'))
+                ledgers.setdefault(r['partner_id'], []).append(r)
+            if not after:
+                break
+            rows, after = self._get_ledger_page(options, after=after)
+        return ledgers
+
+    @api.model
+    def _get_invoice_lines_by_move(self, move_ids):
+        """Product lines of the invoices/credit notes among move_ids, in one
+        query. Payments and miscellaneous entries have no product lines.
+
+        :returns: dict {move_id: [lines]}
+        """
+        if not move_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT
+                aml.id,
+                aml.move_id,
+                COALESCE(pt.name->>'fr_FR', pt.name->>'en_US', aml.name) as product_name,
+                aml.quantity,
+                COALESCE(uom.name->>'fr_FR', uom.name->>'en_US') as product_uom,
+                aml.price_unit,
+                aml.price_subtotal
+            FROM account_move_line aml
+            JOIN account_move am ON am.id = aml.move_id
+            LEFT JOIN product_product pp ON aml.product_id = pp.id
+            LEFT JOIN product_template pt ON pp.product_tmpl_id = pt.id
+            LEFT JOIN uom_uom uom ON aml.product_uom_id = uom.id
+            WHERE aml.move_id IN %s
+                AND aml.display_type = 'product'
+                AND am.move_type IN ('out_invoice', 'out_refund',
+                                     'in_invoice', 'in_refund')
+            ORDER BY aml.move_id, aml.sequence, aml.id
+        """, (tuple(move_ids),))
+        lines_by_move = {}
+        for line in self.env.cr.dictfetchall():
+            lines_by_move.setdefault(line['move_id'], []).append(line)
+        return lines_by_move
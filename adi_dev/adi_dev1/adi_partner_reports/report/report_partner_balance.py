@@ -9,45 +9,11 @@ class ReportPartnerBalance(models.AbstractModel):
     _name = 'report.adi_partner_reports.report_partner_balance'
     _description = 'Rapport Solde Partenaire'
 
-    def _get_partners_data(self, data, query_get_data, account_ids):
+    def _get_partners_data(self, data, account_ids):
         """Retrieve partner balances for given account IDs."""
-        reconcile_clause = ""
-        if not data['form'].get('reconciled'):
-            reconcile_clause = ' AND "account_move_line".full_reconcile_id IS NULL '
-
-        params = [
-            tuple(data['computed']['move_state']),
-            tuple(account_ids),
-        ] + query_get_data[2]
-
-        query = """
-            SELECT
-                "account_move_line".partner_id,
-                rp.ref,
-                rp.name,
-                SUM("account_move_line".debit) AS total_debit,
-                SUM("account_move_line".credit) AS total_credit,
-                SUM("account_move_line".debit - "account_move_line".credit) AS balance
-            FROM """ + query_get_data[0] + """
-            LEFT JOIN account_move m ON (m.id = "account_move_line".move_id)
-            LEFT JOIN res_partner rp ON (rp.id = "account_move_line".partner_id)
-            WHERE "account_move_line".partner_id IS NOT NULL
-                AND m.state IN %s
-                AND "account_move_line".account_id IN %s
-                AND """ + query_get_data[1] + reconcile_clause + """
-            GROUP BY "account_move_line".partner_id, rp.ref, rp.name
-            ORDER BY rp.ref, rp.name
-        """
-        self.env.cr.execute(query, tuple(params))
-        partners_data = self.env.cr.dictfetchall()
-
-        # Filter by selected partners if any
-        if data['form'].get('partner_ids'):
-            partner_ids = data['form']['partner_ids']
-            partners_data = [
-                p for p in partners_data if p['partner_id'] in partner_ids]
-
-        return partners_data
+        service = self.env['partner.ledger.service']
+        options = dict(service._get_report_options(data), account_ids=account_ids)
+        return service._get_partner_balances(options)
 
     def _get_account_ids(self, account_types):
         """Get account IDs for given account types."""
@@ -76,9 +42,6 @@ class ReportPartnerBalance(models.AbstractModel):
 
         data['computed'] = {}
 
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
-
         data['computed']['move_state'] = ['draft', 'posted']
         if data['form'].get('target_move', 'all') == 'posted':
             data['computed']['move_state'] = ['posted']
@@ -96,9 +59,9 @@ class ReportPartnerBalance(models.AbstractModel):
             data['computed']['account_ids'] = customer_account_ids + supplier_account_ids
 
             customer_data = self._get_partners_data(
-                data, query_get_data, customer_account_ids) if customer_account_ids else []
+                data, customer_account_ids) if customer_account_ids else []
             supplier_data = self._get_partners_data(
-                data, query_get_data, supplier_account_ids) if supplier_account_ids else []
+                data, supplier_account_ids) if supplier_account_ids else []
 
             customer_totals = self._compute_totals(customer_data)
             supplier_totals = self._compute_totals(supplier_data)
@@ -145,7 +108,7 @@ class ReportPartnerBalance(models.AbstractModel):
                 raise UserError(_("No accounts found for the selected type."))
 
             partners_data = self._get_partners_data(
-                data, query_get_data, account_ids)
+                data, account_ids)
             totals = self._compute_totals(partners_data)
 
             return {
@@ -10,107 +10,21 @@ class ReportPartnerLedgerDetailed(models.AbstractModel):
     _description = 'Rapport Grand Livre Détaillé Partenaire'
 
     def _lines(self, data, partner):
-        full_account = []
-        currency = self.env['res.currency']
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
-        reconcile_clause = ""
-        if not data['form']['reconciled']:
-            reconcile_clause = ' AND "account_move_line".full_reconcile_id IS NULL '
-        params = [
-            partner.id,
-            tuple(data['computed']['move_state']),
-            tuple(data['computed']['account_ids']),
-        ] + query_get_data[2]
-        query = """
-            SELECT "account_move_line".id,
-                   "account_move_line".date,
-                   j.code,
-                   acc.code as a_code,
-                   acc.name as a_name,
-                   "account_move_line".ref,
-                   m.name as move_name,
-                   "account_move_line".name,
-                   "account_move_line".debit,
-                   "account_move_line".credit,
-                   "account_move_line".amount_currency,
-                   "account_move_line".currency_id,
-                   c.symbol AS currency_code,
-                   "account_move_line".move_id
-            FROM """ + query_get_data[0] + """
-            LEFT JOIN account_journal j ON ("account_move_line".journal_id = j.id)
-            LEFT JOIN account_account acc ON ("account_move_line".account_id = acc.id)
-            LEFT JOIN res_currency c ON ("account_move_line".currency_id=c.id)
-            LEFT JOIN account_move m ON (m.id="account_move_line".move_id)
-            WHERE "account_move_line".partner_id = %s
-                AND m.state IN %s
-                AND "account_move_line".account_id IN %s
-                AND """ + query_get_data[1] + reconcile_clause + """
-                ORDER BY "account_move_line".date"""
-        self.env.cr.execute(query, tuple(params))
-        res = self.env.cr.dictfetchall()
-        sum = 0.0
-        for r in res:
-            r['displayed_name'] = '-'.join(
-                r[field_name] for field_name in ('move_name', 'ref', 'name')
-                if r[field_name] not in (None, '', '/')
-            )
-            sum += r['debit'] - r['credit']
-            r['progress'] = sum
-            r['currency_id'] = currency.browse(r.get('currency_id'))
-            full_account.append(r)
-        return full_account
+        service = self.env['partner.ledger.service']
+        options = dict(service._get_report_options(data), partner_ids=[partner.id])
+        return service._get_partner_ledgers(options).get(partner.id, [])
 
     def _get_invoice_lines(self, move_id):
         """Retrieve product lines for a given account.move (invoice/bill).
         Only returns lines for invoices/credit notes, not payments or misc entries."""
-        self.env.cr.execute("""
-            SELECT
-                aml.id,
-                COALESCE(pt.name->>'fr_FR', pt.name->>'en_US', aml.name) as product_name,
-                aml.quantity,
-                COALESCE(uom.name->>'fr_FR', uom.name->>'en_US') as product_uom,
-                aml.price_unit,
-                aml.price_subtotal
-            FROM account_move_line aml
-            JOIN account_move am ON am.id = aml.move_id
-            LEFT JOIN product_product pp ON aml.product_id = pp.id
-            LEFT JOIN product_template pt ON pp.product_tmpl_id = pt.id
-            LEFT JOIN uom_uom uom ON aml.product_uom_id = uom.id
-            WHERE aml.move_id = %s
-                AND aml.display_type = 'product'
-                AND am.move_type IN ('out_invoice', 'out_refund',
-                                     'in_invoice', 'in_refund')
-            ORDER BY aml.sequence, aml.id
-        """, (move_id,))
-        return self.env.cr.dictfetchall()
+        return self.env['partner.ledger.service']._get_invoice_lines_by_move([move_id]).get(move_id, [])
 
     def _sum_partner(self, data, partner, field):
         if field not in ['debit', 'credit', 'debit - credit']:
             return
-        result = 0.0
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
-        reconcile_clause = ""
-        if not data['form']['reconciled']:
-            reconcile_clause = ' AND "account_move_line".full_reconcile_id IS NULL '
-        params = [
-            partner.id,
-            tuple(data['computed']['move_state']),
-            tuple(data['computed']['account_ids']),
-        ] + query_get_data[2]
-        query = """SELECT sum(""" + field + """)
-                FROM """ + query_get_data[0] + """, account_move AS m
-                WHERE "account_move_line".partner_id = %s
-                    AND m.id = "account_move_line".move_id
-                    AND m.state IN %s
-                    AND account_id IN %s
-                    AND """ + query_get_data[1] + reconcile_clause
-        self.env.cr.execute(query, tuple(params))
-        contemp = self.env.cr.fetchone()
-        if contemp is not None:
-            result = contemp[0] or 0.0
-        return result
+        service = self.env['partner.ledger.service']
+        options = dict(service._get_report_options(data), partner_ids=[partner.id])
+        return service._get_partner_sums(options).get(partner.id, {}).get(field, 0.0)
 
     @api.model
     def _get_report_values(self, docids, data=None):
@@ -120,8 +34,6 @@ class ReportPartnerLedgerDetailed(models.AbstractModel):
         data['computed'] = {}
 
         obj_partner = self.env['res.partner']
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
         data['computed']['move_state'] = ['draft', 'posted']
         if data['form'].get('target_move', 'all') == 'posted':
             data['computed']['move_state'] = ['posted']
@@ -143,31 +55,19 @@ class ReportPartnerLedgerDetailed(models.AbstractModel):
         data['computed']['account_ids'] = [
             a for (a,) in self.env.cr.fetchall()]
 
-        params = [
-            tuple(data['computed']['move_state']),
-            tuple(data['computed']['account_ids']),
-        ] + query_get_data[2]
-        reconcile_clause = ""
-        if not data['form']['reconciled']:
-            reconcile_clause = ' AND "account_move_line".full_reconcile_id IS NULL '
-        query = """
-            SELECT DISTINCT "account_move_line".partner_id
-            FROM """ + query_get_data[0] + """,
-                 account_account AS account,
-                 account_move AS am
-            WHERE "account_move_line".partner_id IS NOT NULL
-                AND "account_move_line".account_id = account.id
-                AND am.id = "account_move_line".move_id
-                AND am.state IN %s
-                AND "account_move_line".account_id IN %s
-                AND NOT account.deprecated
-                AND """ + query_get_data[1] + reconcile_clause
-        self.env.cr.execute(query, tuple(params))
+        # Sums, ledger lines and invoice product lines of all partners are
+        # read in bulk once, the template helpers only look them up.
+        service = self.env['partner.ledger.service']
+        options = service._get_report_options(data)
+        sums = service._get_partner_sums(options)
+        ledgers = service._get_partner_ledgers(options)
+        invoice_lines = service._get_invoice_lines_by_move(
+            {line['move_id'] for lines in ledgers.values() for line in lines})
+
         if data['form']['partner_ids']:
             partner_ids = data['form']['partner_ids']
         else:
-            partner_ids = [
-                res['partner_id'] for res in self.env.cr.dictfetchall()]
+            partner_ids = list(sums)
         partners = obj_partner.browse(partner_ids)
         partners = sorted(
             partners, key=lambda x: (x.ref or '', x.name or ''))
@@ -178,7 +78,7 @@ class ReportPartnerLedgerDetailed(models.AbstractModel):
             'data': data,
             'docs': partners,
             'time': time,
-            'lines': self._lines,
-            'sum_partner': self._sum_partner,
-            'get_invoice_lines': self._get_invoice_lines,
+            'lines': lambda data, partner: ledgers.get(partner.id, []),
+            'sum_partner': lambda data, partner, field: sums.get(partner.id, {}).get(field, 0.0),
+            'get_invoice_lines': lambda move_id: invoice_lines.get(move_id, []),
         }
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Situation Partenaires',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Accounting',
     'summary': 'Grand Livre Partenaires avec filtrage par vendeur',
     'description': """
@@ -20,6 +20,7 @@ Le filtrage est base sur le champ invoice_user_id des factures.
     'depends': [
         'account',
         'accounting_pdf_reports',
+        'adi_partner_reports',
     ],
     'data': [
         'security/ir.model.access.csv',
@@ -71,70 +71,32 @@ class PartnerBalanceWizard(models.TransientModel):
         if not account_ids:
             return self._return_action()
 
-        # Build move state filter
-        move_states = ['posted'] if self.target_move == 'posted' else ['draft', 'posted']
-
-        # Build user filter
-        user_clause = ""
-        params = [tuple(move_states), tuple(account_ids), self.company_id.id]
-        if self.user_ids:
-            user_clause = " AND am.invoice_user_id IN %s "
-            params.append(tuple(self.user_ids.ids))
-
-        # Build partner filter
-        partner_clause = ""
-        if self.partner_ids:
-            partner_clause = " AND aml.partner_id IN %s "
-            params.append(tuple(self.partner_ids.ids))
-
-        # Build date filter
-        date_clause = ""
-        if self.date_from:
-            date_clause += " AND aml.date >= %s "
-            params.append(self.date_from)
-        if self.date_to:
-            date_clause += " AND aml.date <= %s "
-            params.append(self.date_to)
-
-        # Build reconcile filter
-        reconcile_clause = "" if self.reconciled else " AND aml.full_reconcile_id IS NULL "
-
-        # Main query to get partner balances with user info
-        query = """
-            SELECT
-                aml.partner_id,
-                am.invoice_user_id as user_id,
-                SUM(aml.debit) as total_debit,
-                SUM(aml.credit) as total_credit,
-                SUM(aml.debit - aml.credit) as balance
-            FROM account_move_line aml
-            INNER JOIN account_move am ON am.id = aml.move_id
-            WHERE am.state IN %s
-                AND aml.account_id IN %s
-                AND aml.company_id = %s
-                AND aml.partner_id IS NOT NULL
-                """ + user_clause + partner_clause + date_clause + reconcile_clause + """
-            GROUP BY aml.partner_id, am.invoice_user_id
-            HAVING SUM(aml.debit) != 0 OR SUM(aml.credit) != 0
-            ORDER BY aml.partner_id, am.invoice_user_id
-        """
-
-        self.env.cr.execute(query, tuple(params))
-        results = self.env.cr.dictfetchall()
+        # Sum all partners in one query, grouped by salesperson
+        service = self.env['partner.ledger.service']
+        results = service._get_partner_balances({
+            'account_ids': account_ids,
+            'move_states': ['posted'] if self.target_move == 'posted' else ['draft', 'posted'],
+            'reconciled': self.reconciled,
+            'partner_ids': self.partner_ids.ids,
+            'user_ids': self.user_ids.ids,
+            'used_context': {
+                'company_id': self.company_id.id,
+                'date_from': self.date_from,
+                'date_to': self.date_to,
+                'strict_range': True,
+            },
+        }, group_by_user=True, hide_empty=True)
 
         # Create balance lines
-        lines_vals = []
-        for row in results:
-            partner = self.env['res.partner'].browse(row['partner_id'])
-            lines_vals.append({
-                'wizard_id': self.id,
-                'partner_id': row['partner_id'],
-                'partner_ref': partner.ref or '',
-                'user_id': row['user_id'] or False,
-                'debit': row['total_debit'] or 0.0,
-                'credit': row['total_credit'] or 0.0,
-                'balance': row['balance'] or 0.0,
-            })
+        lines_vals = [{
+            'wizard_id': self.id,
+            'partner_id': row['partner_id'],
+            'partner_ref': row['ref'] or '',
+            'user_id': row['user_id'] or False,
+            'debit': row['total_debit'] or 0.0,
+            'credit': row['total_credit'] or 0.0,
+            'balance': row['balance'] or 0.0,
+        } for row in results]
 
         self.env['partner.balance.line'].create(lines_vals)
 
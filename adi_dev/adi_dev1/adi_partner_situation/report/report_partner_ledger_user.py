@@ -10,87 +10,17 @@ class ReportPartnerLedgerUser(models.AbstractModel):
 
     def _lines(self, data, partner):
         """Override to filter by user_ids (invoice salesperson)"""
-        full_account = []
-        currency = self.env['res.currency']
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
-        reconcile_clause = "" if data['form']['reconciled'] else ' AND "account_move_line".full_reconcile_id IS NULL '
-
-        # User filter clause
-        user_clause = ""
-        user_ids = data['form'].get('user_ids', [])
-
-        params = [partner.id, tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
-
-        if user_ids:
-            user_clause = ' AND m.invoice_user_id IN %s '
-            params.append(tuple(user_ids))
-
-        query = """
-            SELECT "account_move_line".id, "account_move_line".date, j.code, acc.code as a_code,
-                   acc.name as a_name, "account_move_line".ref, m.name as move_name,
-                   "account_move_line".name, "account_move_line".debit, "account_move_line".credit,
-                   "account_move_line".amount_currency, "account_move_line".currency_id,
-                   c.symbol AS currency_code
-            FROM """ + query_get_data[0] + """
-            LEFT JOIN account_journal j ON ("account_move_line".journal_id = j.id)
-            LEFT JOIN account_account acc ON ("account_move_line".account_id = acc.id)
-            LEFT JOIN res_currency c ON ("account_move_line".currency_id=c.id)
-            INNER JOIN account_move m ON (m.id="account_move_line".move_id)
-            WHERE "account_move_line".partner_id = %s
-                AND m.state IN %s
-                AND "account_move_line".account_id IN %s
-                AND """ + query_get_data[1] + reconcile_clause + user_clause + """
-            ORDER BY "account_move_line".date"""
-
-        self.env.cr.execute(query, tuple(params))
-        res = self.env.cr.dictfetchall()
-        sum = 0.0
-        for r in res:
-            r['date'] = r['date']
-            r['displayed_name'] = '-'.join(
-                r[field_name] for field_name in ('move_name', 'ref', 'name')
-                if r[field_name] not in (None, '', '/')
-            )
-            sum += r['debit'] - r['credit']
-            r['progress'] = sum
-            r['currency_id'] = currency.browse(r.get('currency_id'))
-            full_account.append(r)
-        return full_account
+        service = self.env['partner.ledger.service']
+        options = dict(service._get_report_options(data), partner_ids=[partner.id])
+        return service._get_partner_ledgers(options).get(partner.id, [])
 
     def _sum_partner(self, data, partner, field):
         """Override to filter by user_ids (invoice salesperson)"""
         if field not in ['debit', 'credit', 'debit - credit']:
             return
-        result = 0.0
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
-        reconcile_clause = "" if data['form']['reconciled'] else ' AND "account_move_line".full_reconcile_id IS NULL '
-
-        # User filter clause
-        user_clause = ""
-        user_ids = data['form'].get('user_ids', [])
-
-        params = [partner.id, tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
-
-        if user_ids:
-            user_clause = ' AND m.invoice_user_id IN %s '
-            params.append(tuple(user_ids))
-
-        query = """SELECT sum(""" + field + """)
-                FROM """ + query_get_data[0] + """, account_move AS m
-                WHERE "account_move_line".partner_id = %s
-                    AND m.id = "account_move_line".move_id
-                    AND m.state IN %s
-                    AND account_id IN %s
-                    AND """ + query_get_data[1] + reconcile_clause + user_clause
-
-        self.env.cr.execute(query, tuple(params))
-
-        contemp = self.env.cr.fetchone()
-        if contemp is not None:
-            result = contemp[0] or 0.0
-        return result
+        service = self.env['partner.ledger.service']
+        options = dict(service._get_report_options(data), partner_ids=[partner.id])
+        return service._get_partner_sums(options).get(partner.id, {}).get(field, 0.0)
 
     @api.model
     def _get_report_values(self, docids, data=None):
@@ -100,8 +30,6 @@ class ReportPartnerLedgerUser(models.AbstractModel):
         data['computed'] = {}
 
         obj_partner = self.env['res.partner']
-        query_get_data = self.env['account.move.line'].with_context(
-            data['form'].get('used_context', {}))._query_get()
         data['computed']['move_state'] = ['draft', 'posted']
         if data['form'].get('target_move', 'all') == 'posted':
             data['computed']['move_state'] = ['posted']
@@ -120,40 +48,24 @@ class ReportPartnerLedgerUser(models.AbstractModel):
             AND NOT a.deprecated""", (tuple(data['computed']['ACCOUNT_TYPE']),))
         data['computed']['account_ids'] = [a for (a,) in self.env.cr.fetchall()]
 
-        # User filter clause
-        user_clause = ""
-        user_ids = data['form'].get('user_ids', [])
-
-        params = [tuple(data['computed']['move_state']), tuple(data['computed']['account_ids'])] + query_get_data[2]
-
-        if user_ids:
-            user_clause = ' AND am.invoice_user_id IN %s '
-            params.append(tuple(user_ids))
-
-        reconcile_clause = "" if data['form']['reconciled'] else ' AND "account_move_line".full_reconcile_id IS NULL '
-        query = """
-            SELECT DISTINCT "account_move_line".partner_id
-            FROM """ + query_get_data[0] + """, account_account AS account, account_move AS am
-            WHERE "account_move_line".partner_id IS NOT NULL
-                AND "account_move_line".account_id = account.id
-                AND am.id = "account_move_line".move_id
-                AND am.state IN %s
-                AND "account_move_line".account_id IN %s
-                AND NOT account.deprecated
-                AND """ + query_get_data[1] + reconcile_clause + user_clause
-
-        self.env.cr.execute(query, tuple(params))
+        # Sums and ledger lines of all partners are read in bulk once
+        # (user filter included), the template helpers only look them up.
+        service = self.env['partner.ledger.service']
+        options = service._get_report_options(data)
+        sums = service._get_partner_sums(options)
+        ledgers = service._get_partner_ledgers(options)
 
         if data['form']['partner_ids']:
             partner_ids = data['form']['partner_ids']
         else:
-            partner_ids = [res['partner_id'] for res in self.env.cr.dictfetchall()]
+            partner_ids = list(sums)
 
         partners = obj_partner.browse(partner_ids)
         partners = sorted(partners, key=lambda x: (x.ref or '', x.name or ''))
 
         # Get user names for display
         user_names = ""
+        user_ids = data['form'].get('user_ids', [])
         if user_ids:
             users = self.env['res.users'].browse(user_ids)
             user_names = ", ".join(users.mapped('name'))
@@ -164,7 +76,7 @@ class ReportPartnerLedgerUser(models.AbstractModel):
             'data': data,
             'docs': partners,
             'time': time,
-            'lines': self._lines,
-            'sum_partner': self._sum_partner,
+            'lines': lambda data, partner: ledgers.get(partner.id, []),
+            'sum_partner': lambda data, partner, field: sums.get(partner.id, {}).get(field, 0.0),
             'user_names': user_names,
         }
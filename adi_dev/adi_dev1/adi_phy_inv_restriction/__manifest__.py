@@ -1,6 +1,6 @@
 {
     'name': 'Adicops STOCK QUANT User Restriction ',
-    'version': '17.0.1.0',
+    'version': '17.0.1.1',
     'sequence': 1,
     'category': 'Inventory',
     'summary': 'Adicops STOCK QUANT User Restriction',
@@ -13,18 +13,17 @@ class StockPicking(models.Model):
     allowed_location_ids = fields.Many2many('stock.location',
                                             compute='_compute_allowed_locations',
                                             )
+    allowed_warehouse_ids = fields.Many2many('stock.warehouse',
+                                             compute='_compute_allowed_locations',
+                                             )
 
     @api.depends('user_id')
     def _compute_allowed_locations(self):
+        # Les emplacements autorisés dépendent de l'utilisateur courant et non
+        # de la ligne : on les lit une seule fois pour tous les quants.
+        user = self.env.user
+        allowed_locations = user.allowed_location_ids
+        allowed_warehouses = user.allowed_warehouse_ids
         for record in self:
-            user_warehouses = self.env.user.allowed_warehouse_ids
-            record.allowed_location_ids = self.env['stock.location'].search(
-                [
-                    ('warehouse_id', 'in', user_warehouses.ids),
-                    ('usage', '!=', 'view'),
-                ])
-
-
-
-
-
+            record.allowed_location_ids = allowed_locations
+            record.allowed_warehouse_ids = allowed_warehouses
@@ -1,6 +1,6 @@
 {
     'name': 'ADICOPS Simple Price Liste',
-    'version': '17.0.0.0',
+    'version': '17.0.0.1',
     'sequence': 1,
     'category': 'Sales',
     'summary': 'ADICOPS Simple Price Liste. ',
@@ -20,7 +20,9 @@
     ], 
     "data":  [
        #'security/groups.xml',
+        'security/ir.model.access.csv',
         'views/product_sale.xml',
+        'views/product_price_tier_log.xml',
       #  'views/product_list.xml',
         ],
     'demo': [],
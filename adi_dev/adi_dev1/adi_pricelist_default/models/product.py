@@ -1,4 +1,14 @@
-from odoo import fields, models, api
+from odoo import fields, models, api, _
+from odoo.tools import split_every
+
+# Prix de chaque type de prix (sale.order.type_prix) sur product.template
+PRICE_TIER_FIELDS = {
+    'public': 'list_price',
+    'revendeur': 'prix_revendeur',
+    'grossiste': 'prix_grossiste',
+}
+REPRICE_BATCH_SIZE = 1000
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -64,3 +74,131 @@ class ProductTemplate(models.Model):
         for product in self:
             if product.standard_price:
                 product.pourcentage_grossiste = ((product.prix_grossiste - product.standard_price) / product.standard_price) * 100
+
+    # Recalcul en lot des prix par palier
+    def _reprice_tiers(self, origin=False):
+        """
+        Recalculer les prix public, revendeur et grossiste à partir du coût
+        et des marges, par lots et en SQL, en historisant les prix modifiés.
+
+        Comme les onchanges, un produit sans coût n'est pas modifié ; un
+        palier sans marge garde son prix (prix saisi directement).
+
+        :return: nombre de produits dont au moins un prix a changé
+        """
+        price_fields = ['list_price', 'prix_revendeur', 'prix_grossiste',
+                        'pourcentage_public', 'pourcentage_revendeur', 'pourcentage_grossiste']
+        self.flush_model(price_fields)
+        changed = 0
+        for batch in split_every(REPRICE_BATCH_SIZE, self.ids, self.browse):
+            costs = {template.id: template.standard_price for template in batch if template.standard_price}
+            if costs:
+                changed += self._update_tier_prices(costs, origin)
+        if changed:
+            self.invalidate_model(['list_price', 'prix_revendeur', 'prix_grossiste', 'write_uid', 'write_date'])
+        return changed
+
+    @api.model
+    def _update_tier_prices(self, costs, origin=False):
+        """Appliquer les coûts {template_id: coût} et journaliser les écarts en une requête."""
+        params = {
+            'ids': list(costs),
+            'costs': list(costs.values()),
+            'price_digits': self.env['decimal.precision'].precision_get('Product Price'),
+            'currency_digits': self.env.company.currency_id.decimal_places,
+            'uid': self.env.uid,
+            'origin': origin or None,
+        }
+        self.env.cr.execute("""
+            WITH cost AS (
+                SELECT * FROM unnest(%(ids)s::int[], %(costs)s::float8[]) AS c(id, cost)
+            ), new AS (
+                SELECT pt.id, c.cost,
+                       pt.list_price AS old_list_price,
+                       pt.prix_revendeur AS old_prix_revendeur,
+                       pt.prix_grossiste AS old_prix_grossiste,
+                       CASE WHEN COALESCE(pt.pourcentage_public, 0) != 0
+                            THEN ROUND((c.cost * (1 + pt.pourcentage_public / 100))::numeric, %(price_digits)s)
+                            ELSE pt.list_price END AS new_list_price,
+                       CASE WHEN COALESCE(pt.pourcentage_revendeur, 0) != 0
+                            THEN ROUND((c.cost * (1 + pt.pourcentage_revendeur / 100))::numeric,
+                                       COALESCE(cur.decimal_places, %(currency_digits)s))
+                            ELSE pt.prix_revendeur END AS new_prix_revendeur,
+                       CASE WHEN COALESCE(pt.pourcentage_grossiste, 0) != 0
+                            THEN ROUND((c.cost * (1 + pt.pourcentage_grossiste / 100))::numeric,
+                                       COALESCE(cur.decimal_places, %(currency_digits)s))
+                            ELSE pt.prix_grossiste END AS new_prix_grossiste
+                FROM product_template pt
+                JOIN cost c ON c.id = pt.id
+                LEFT JOIN res_company rc ON rc.id = pt.company_id
+                LEFT JOIN res_currency cur ON cur.id = rc.currency_id
+            ), updated AS (
+                UPDATE product_template pt
+                SET list_price = new.new_list_price,
+                    prix_revendeur = new.new_prix_revendeur,
+                    prix_grossiste = new.new_prix_grossiste,
+                    write_uid = %(uid)s,
+                    write_date = NOW() AT TIME ZONE 'UTC'
+                FROM new
+                WHERE pt.id = new.id
+                  AND (new.new_list_price IS DISTINCT FROM new.old_list_price
+                       OR new.new_prix_revendeur IS DISTINCT FROM new.old_prix_revendeur
+                       OR new.new_prix_grossiste IS DISTINCT FROM new.old_prix_grossiste)
+                RETURNING new.*
+            )
+            INSERT INTO product_price_tier_log (
+                product_tmpl_id, standard_price,
+                old_list_price, new_list_price,
+                old_prix_revendeur, new_prix_revendeur,
+                old_prix_grossiste, new_prix_grossiste,
+                origin, create_uid, create_date, write_uid, write_date)
+            SELECT id, cost,
+                   old_list_price, new_list_price,
+                   old_prix_revendeur, new_prix_revendeur,
+                   old_prix_grossiste, new_prix_grossiste,
+                   %(origin)s, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM updated
+        """, params)
+        return self.env.cr.rowcount
+
+    def action_reprice_tiers(self):
+        """Action serveur : recalculer les prix des produits sélectionnés."""
+        changed = self._reprice_tiers(origin=_("Recalcul manuel"))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Prix par palier"),
+                'message': _("%s produit(s) repricé(s).") % changed,
+                'type': 'success',
+                'sticky': False,
+            },
+        }
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'standard_price' in vals:
+            # Coût modifié (achat, coût moyen, frais d'approche...) : recalcul des paliers
+            self.product_tmpl_id._reprice_tiers(origin=_("Mise à jour du coût"))
+        return res
+
+
+class ProductPriceTierLog(models.Model):
+    _name = 'product.price.tier.log'
+    _description = 'Historique des prix par palier'
+    _order = 'create_date desc, id desc'
+
+    product_tmpl_id = fields.Many2one('product.template', string="Produit",
+                                      required=True, ondelete='cascade', index=True)
+    standard_price = fields.Float(string="Coût", digits='Product Price')
+    old_list_price = fields.Float(string="Ancien prix public", digits='Product Price')
+    new_list_price = fields.Float(string="Nouveau prix public", digits='Product Price')
+    old_prix_revendeur = fields.Float(string="Ancien prix revendeur", digits='Product Price')
+    new_prix_revendeur = fields.Float(string="Nouveau prix revendeur", digits='Product Price')
+    old_prix_grossiste = fields.Float(string="Ancien prix grossiste", digits='Product Price')
+    new_prix_grossiste = fields.Float(string="Nouveau prix grossiste", digits='Product Price')
+    origin = fields.Char(string="Origine")
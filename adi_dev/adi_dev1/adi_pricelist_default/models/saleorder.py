@@ -1,23 +1,42 @@
 from odoo import api,fields,models
+
+from .product import PRICE_TIER_FIELDS
+
+
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
 
     
 
+    def _get_tier_prices(self, products):
+        """Prix du type de prix de la commande pour tous les produits, lus en une fois."""
+        self.ensure_one()
+        price_field = PRICE_TIER_FIELDS.get(self.type_prix)
+        if not price_field:
+            return {}
+        return dict(zip(products.ids, products.mapped(price_field)))
+
+    def _apply_tier_prices(self, lines):
+        """Appliquer le prix par palier aux lignes, une écriture par prix distinct."""
+        self.ensure_one()
+        lines = lines.filtered('product_id')
+        prices = self._get_tier_prices(lines.product_id)
+        if not prices:
+            return
+        lines_by_price = {}
+        for line in lines:
+            lines_by_price.setdefault(prices[line.product_id.id], []).append(line.id)
+        for price, line_ids in lines_by_price.items():
+            lines.browse(line_ids).price_unit = price
+
     def action_add_from_catalog(self):
         # Appel de la méthode originale pour ajouter les produits depuis le catalogue
         res = super(SaleOrder, self).action_add_from_catalog()
 
         # Mise à jour des prix en fonction du type de prix après ajout des produits
-        for line in self.order_line:
-            if line.product_id:
-                if self.type_prix == 'public':
-                    line.price_unit = line.product_id.list_price
-                elif self.type_prix == 'revendeur':
-                    line.price_unit = line.product_id.prix_revendeur
-                elif self.type_prix == 'grossiste':
-                    line.price_unit = line.product_id.prix_grossiste
+        for order in self:
+            order._apply_tier_prices(order.order_line)
 
         return res
     """
@@ -65,13 +84,7 @@ class SaleOrder(models.Model):
     @api.onchange('type_prix')
     def _onchange_type_prix_order(self):
         for order in self:
-            for line in order.order_line:
-                if order.type_prix == 'public':
-                    line.price_unit = line.product_id.list_price
-                elif order.type_prix == 'revendeur':
-                    line.price_unit = line.product_id.prix_revendeur
-                elif order.type_prix == 'grossiste':
-                    line.price_unit = line.product_id.prix_grossiste
+            order._apply_tier_prices(order.order_line)
         
 class SaleOrderLine(models.Model):
     _inherit = 'sale.order.line'
@@ -79,11 +92,5 @@ class SaleOrderLine(models.Model):
     
     @api.onchange('product_id', 'order_id.type_prix')
     def _onchange_product_id(self):
-        for line in self:
-            if line.product_id:
-                if line.order_id.type_prix == 'public':
-                    line.price_unit = line.product_id.list_price
-                elif line.order_id.type_prix == 'revendeur':
-                    line.price_unit = line.product_id.prix_revendeur
-                elif line.order_id.type_prix == 'grossiste':
-                    line.price_unit = line.product_id.prix_grossiste
\ No newline at end of file
+        for order in self.order_id:
+            order._apply_tier_prices(self.filtered(lambda line: line.order_id == order))
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'SAV Electroménager',
-    'version': '17.0.2.0.0',
+    'version': '17.0.2.1.0',
     'category': 'Services/After Sales',
     'summary': 'Gestion des retours et service après-vente électroménager',
     'description': """
@@ -36,6 +36,7 @@ Module de gestion du service après-vente pour l'électroménager avec workflow
 
 **Statistiques Avancées:**
 * Rapports Pivot et Graph
+* Cube statistique par état, catégorie, réparateur et mois
 * Filtres par point de vente, centre, réparateur
 * Suivi des durées de réparation
     """,
@@ -61,6 +62,7 @@ Module de gestion du service après-vente pour l'électroménager avec workflow
         'views/sav_failure_reason_views.xml',
         # Views - Retours
         'views/sav_return_views.xml',
+        'views/sav_return_report_views.xml',
         # Menus
         'views/sav_menus.xml',
         # Reports
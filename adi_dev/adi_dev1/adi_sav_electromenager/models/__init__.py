@@ -7,3 +7,4 @@ from . import sav_fault_type
 from . import sav_failure_reason
 from . import sav_return
 from . import sav_return_line
+from . import sav_return_report
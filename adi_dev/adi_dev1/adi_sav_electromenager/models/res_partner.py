@@ -110,18 +110,26 @@ class ResPartner(models.Model):
 
     @api.depends('is_sales_point', 'is_return_center')
     def _compute_sav_return_count(self):
-        """Compte le nombre de retours SAV liés à ce partenaire."""
+        """Compte le nombre de retours SAV liés à ce partenaire.
+
+        Un regroupement par point de vente et un par centre de retour pour
+        tout le recordset, au lieu d'un comptage par partenaire.
+        """
+        sales_points = self.filtered('is_sales_point')
+        centers = (self - sales_points).filtered('is_return_center')
+        counts = {}
+        if sales_points:
+            counts.update(self.env['sav.return']._read_group(
+                [('sales_point_id', 'in', sales_points._origin.ids)],
+                ['sales_point_id'], ['__count'],
+            ))
+        if centers:
+            counts.update(self.env['sav.return']._read_group(
+                [('return_center_id', 'in', centers._origin.ids)],
+                ['return_center_id'], ['__count'],
+            ))
         for partner in self:
-            count = 0
-            if partner.is_sales_point:
-                count = self.env['sav.return'].search_count([
-                    ('sales_point_id', '=', partner.id)
-                ])
-            elif partner.is_return_center:
-                count = self.env['sav.return'].search_count([
-                    ('return_center_id', '=', partner.id)
-                ])
-            partner.sav_return_count = count
+            partner.sav_return_count = counts.get(partner._origin, 0)
 
     def action_view_sav_returns(self):
         """Affiche les retours SAV liés à ce partenaire."""
@@ -41,10 +41,14 @@ class SavCategory(models.Model):
     ]
 
     def _compute_return_count(self):
+        # La catégorie est portée par les lignes : compter les retours
+        # distincts de chaque catégorie en un seul regroupement
+        counts = dict(self.env['sav.return.line']._read_group(
+            [('category_id', 'in', self._origin.ids)],
+            ['category_id'], ['return_id:count_distinct'],
+        ))
         for rec in self:
-            rec.return_count = self.env['sav.return'].search_count([
-                ('category_id', '=', rec.id)
-            ])
+            rec.return_count = counts.get(rec._origin, 0)
 
     def action_view_returns(self):
         self.ensure_one()
@@ -53,6 +57,5 @@ class SavCategory(models.Model):
             'name': f'Retours - {self.name}',
             'res_model': 'sav.return',
             'view_mode': 'tree,form,kanban,pivot,graph',
-            'domain': [('category_id', '=', self.id)],
-            'context': {'default_category_id': self.id},
+            'domain': [('line_ids.category_id', '=', self.id)],
         }
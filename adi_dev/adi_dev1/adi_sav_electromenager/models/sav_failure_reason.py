@@ -44,23 +44,21 @@ class SavFailureReason(models.Model):
     ]
 
     def _compute_usage_count(self):
+        counts = dict(self.env['sav.return.line']._read_group(
+            [('failure_reason_id', 'in', self._origin.ids)],
+            ['failure_reason_id'], ['__count'],
+        ))
         for rec in self:
-            rec.usage_count = self.env['sav.return.line'].search_count([
-                ('failure_reason_id', '=', rec.id)
-            ])
+            rec.usage_count = counts.get(rec._origin, 0)
 
     def action_view_returns(self):
         """Ouvre la liste des retours utilisant ce motif d'échec"""
         self.ensure_one()
-        lines = self.env['sav.return.line'].search([
-            ('failure_reason_id', '=', self.id)
-        ])
-        return_ids = lines.mapped('return_id').ids
         return {
             'type': 'ir.actions.act_window',
             'name': f'Retours - {self.name}',
             'res_model': 'sav.return',
             'view_mode': 'tree,form',
-            'domain': [('id', 'in', return_ids)],
+            'domain': [('line_ids.failure_reason_id', '=', self.id)],
             'context': {'create': False},
         }
@@ -49,9 +49,10 @@ class SavFaultType(models.Model):
     ]
 
     def _compute_return_count(self):
+        # Compter les retours uniques qui ont des lignes avec ce type de panne
+        counts = dict(self.env['sav.return.line']._read_group(
+            [('fault_type_id', 'in', self._origin.ids)],
+            ['fault_type_id'], ['return_id:count_distinct'],
+        ))
         for rec in self:
-            # Compter les retours uniques qui ont des lignes avec ce type de panne
-            lines = self.env['sav.return.line'].search([
-                ('fault_type_id', '=', rec.id)
-            ])
-            rec.return_count = len(lines.mapped('return_id'))
+            rec.return_count = counts.get(rec._origin, 0)
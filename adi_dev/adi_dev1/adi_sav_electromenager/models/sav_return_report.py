@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, tools
+
+
+class SavReturnReport(models.Model):
+    """Cube statistique des retours SAV.
+
+    Vue SQL agrégée par retour et par catégorie d'article : le tableau de bord
+    lit directement les agrégats au lieu de recalculer les retours un par un.
+    Un retour contenant plusieurs catégories n'est compté (Nombre de Retours)
+    que sur sa première catégorie afin que les totaux restent exacts.
+    """
+    _name = 'sav.return.report'
+    _description = 'Statistiques des Retours SAV'
+    _auto = False
+    _order = 'date desc'
+    _rec_name = 'return_id'
+
+    return_id = fields.Many2one('sav.return', string='Retour SAV', readonly=True)
+    date = fields.Date(string='Date', readonly=True)
+    state = fields.Selection(
+        selection=lambda self: self.env['sav.return']._fields['state'].selection,
+        string='Statut',
+        readonly=True,
+    )
+    company_id = fields.Many2one('res.company', string='Société', readonly=True)
+    category_id = fields.Many2one('sav.category', string='Catégorie', readonly=True)
+    sales_point_id = fields.Many2one('res.partner', string='Point de Vente', readonly=True)
+    return_center_id = fields.Many2one('res.partner', string='Centre de Retour', readonly=True)
+    repairer_id = fields.Many2one('res.partner', string='Réparateur', readonly=True)
+    factory_id = fields.Many2one('res.partner', string='Usine', readonly=True)
+
+    # Mesures
+    return_count = fields.Integer(string='Nombre de Retours', readonly=True)
+    article_count = fields.Integer(string='Nombre d\'Articles', readonly=True)
+    repaired_count = fields.Integer(string='Articles Réparés', readonly=True)
+    not_repaired_count = fields.Integer(string='Articles Non Réparés', readonly=True)
+    pending_count = fields.Integer(string='Articles En Attente', readonly=True)
+    repair_days = fields.Float(
+        string='Durée Réparation (jours)',
+        readonly=True,
+        group_operator='avg',
+        help='Durée moyenne entre l\'envoi au réparateur et la fin de la réparation',
+    )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW %s AS (
+                SELECT
+                    ROW_NUMBER() OVER (ORDER BY r.id, l.category_id) AS id,
+                    r.id AS return_id,
+                    r.date AS date,
+                    r.state AS state,
+                    r.company_id AS company_id,
+                    l.category_id AS category_id,
+                    r.sales_point_id AS sales_point_id,
+                    r.return_center_id AS return_center_id,
+                    r.repairer_id AS repairer_id,
+                    r.factory_id AS factory_id,
+                    CASE WHEN ROW_NUMBER() OVER (
+                        PARTITION BY r.id ORDER BY l.category_id
+                    ) = 1 THEN 1 ELSE 0 END AS return_count,
+                    COUNT(l.id) AS article_count,
+                    COUNT(l.id) FILTER (
+                        WHERE l.repair_status IN ('repaired', 'replaced')
+                    ) AS repaired_count,
+                    COUNT(l.id) FILTER (
+                        WHERE l.repair_status IN ('not_repairable', 'rejected')
+                    ) AS not_repaired_count,
+                    COUNT(l.id) FILTER (
+                        WHERE l.repair_status = 'pending'
+                    ) AS pending_count,
+                    EXTRACT(EPOCH FROM (r.date_repair_end - r.date_sent_to_repairer)) / 86400.0 AS repair_days
+                FROM sav_return r
+                LEFT JOIN sav_return_line l ON l.return_id = r.id
+                GROUP BY r.id, l.category_id
+            )
+        """ % self._table)
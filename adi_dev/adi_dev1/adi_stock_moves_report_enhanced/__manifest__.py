@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Mouvements des Produits - Enhanced',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.1',
     'category': 'Inventory/Reporting',
     'sequence': 1,
     'author': 'ADICOPS',
@@ -17,6 +17,7 @@ Ce module étend le rapport de mouvements de produits avec des fonctionnalités
 * Sélection des emplacements liés aux entrepôts sélectionnés
 * Filtrage dynamique des emplacements selon les entrepôts choisis
 * Rapport détaillé par emplacement
+* Export Excel du grand livre des mouvements
 
 **Utilisation :**
 1. Choisir "Tous les entrepôts" ou sélectionner des entrepôts spécifiques
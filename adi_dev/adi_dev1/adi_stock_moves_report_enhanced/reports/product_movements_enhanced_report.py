@@ -1,12 +1,223 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, api
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from odoo import models, fields, api
+
+# Nombre de mouvements lus par requête lors du parcours du grand livre
+LEDGER_CHUNK_SIZE = 5000
 
 
 class ProductMovementEnhancedReport(models.AbstractModel):
     _name = 'report.adi_stock_moves_report_enhanced.report_movements'
     _description = 'Rapport Mouvements Produits Amélioré'
 
+    @api.model
+    def _expand_locations(self, location_ids):
+        """Emplacements sélectionnés et leurs sous-emplacements."""
+        if not location_ids:
+            return []
+        return self.env['stock.location'].with_context(active_test=False).search(
+            [('id', 'child_of', list(location_ids))]).ids
+
+    @api.model
+    def _get_opening_balances(self, product_ids, location_ids, date_start):
+        """
+        Calculer les quantités initiales de tous les produits en une requête.
+
+        Somme des mouvements terminés avant date_start, avec la même table et
+        les mêmes emplacements que _iter_movements : entrées vers les
+        emplacements sélectionnés moins sorties depuis ces emplacements
+        (emplacements internes uniquement).
+
+        Returns:
+            dict {product_id: quantité initiale}
+        """
+        if not product_ids or not date_start:
+            return {}
+
+        params = {
+            'product_ids': list(product_ids),
+            'date_start': fields.Date.to_date(date_start),
+            'location_ids': list(location_ids or []),
+        }
+        in_filter = out_filter = location_filter = ""
+        if location_ids:
+            in_filter = "AND m.location_dest_id = ANY(%(location_ids)s)"
+            out_filter = "AND m.location_id = ANY(%(location_ids)s)"
+            location_filter = "AND (m.location_id = ANY(%(location_ids)s) OR m.location_dest_id = ANY(%(location_ids)s))"
+
+        self.env['stock.move'].flush_model(
+            ['product_id', 'state', 'date', 'location_id', 'location_dest_id', 'product_qty'])
+        self.env.cr.execute(f"""
+            SELECT m.product_id,
+                   SUM(CASE WHEN dst.usage = 'internal' {in_filter} THEN m.product_qty ELSE 0 END)
+                 - SUM(CASE WHEN src.usage = 'internal' {out_filter} THEN m.product_qty ELSE 0 END)
+            FROM stock_move m
+            JOIN stock_location src ON src.id = m.location_id
+            JOIN stock_location dst ON dst.id = m.location_dest_id
+            WHERE m.state = 'done'
+              AND m.product_id = ANY(%(product_ids)s)
+              AND m.date < %(date_start)s
+              {location_filter}
+            GROUP BY m.product_id
+        """, params)
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _iter_movements(self, product_ids, location_ids, date_start=False, date_end=False, openings=None):
+        """
+        Parcourir les mouvements terminés, triés par produit puis par date.
+
+        Les mouvements sont lus par tranches (pagination sur produit, date, id) ;
+        le solde courant de chaque tranche est calculé par une fonction de
+        fenêtre puis ajouté au solde reporté de la tranche précédente.
+
+        Yields:
+            (product_id, dict du mouvement)
+        """
+        if not product_ids:
+            return
+
+        params = {
+            'product_ids': list(product_ids),
+            'location_ids': list(location_ids or []),
+            'limit': LEDGER_CHUNK_SIZE,
+        }
+        where = ["m.state = 'done'", "m.product_id = ANY(%(product_ids)s)"]
+        if date_start:
+            params['date_start'] = fields.Date.to_date(date_start)
+            where.append("m.date >= %(date_start)s")
+        if date_end:
+            # Inclure toute la journée de fin
+            params['date_stop'] = fields.Date.to_date(date_end) + timedelta(days=1)
+            where.append("m.date < %(date_stop)s")
+
+        in_filter = out_filter = ""
+        if location_ids:
+            in_filter = "AND m.location_dest_id = ANY(%(location_ids)s)"
+            out_filter = "AND m.location_id = ANY(%(location_ids)s)"
+            where.append("(m.location_id = ANY(%(location_ids)s) OR m.location_dest_id = ANY(%(location_ids)s))")
+
+        # customer_rank / supplier_rank sont ajoutés par le module account
+        if 'customer_rank' in self.env['res.partner']._fields:
+            ranks = "partner.customer_rank, partner.supplier_rank"
+        else:
+            ranks = "0 AS customer_rank, 0 AS supplier_rank"
+
+        query = f"""
+            WITH mv AS (
+                SELECT m.id, m.product_id, m.date, m.name AS move_name,
+                       p.name AS picking_name, partner.name AS partner_name, {ranks},
+                       src.name AS src_name, src.complete_name AS src_full, src.usage AS src_usage,
+                       dst.name AS dst_name, dst.complete_name AS dst_full, dst.usage AS dst_usage,
+                       CASE WHEN dst.usage = 'internal' {in_filter} THEN m.product_qty ELSE 0 END AS in_qty,
+                       CASE WHEN src.usage = 'internal' {out_filter} THEN m.product_qty ELSE 0 END AS out_qty
+                FROM stock_move m
+                JOIN stock_location src ON src.id = m.location_id
+                JOIN stock_location dst ON dst.id = m.location_dest_id
+                LEFT JOIN stock_picking p ON p.id = m.picking_id
+                LEFT JOIN res_partner partner ON partner.id = p.partner_id
+                WHERE {{where}}
+                ORDER BY m.product_id, m.date, m.id
+                LIMIT %(limit)s
+            )
+            SELECT mv.*,
+                   SUM(mv.in_qty - mv.out_qty) OVER (
+                       PARTITION BY mv.product_id ORDER BY mv.date, mv.id
+                   ) AS running_qty
+            FROM mv
+            ORDER BY mv.product_id, mv.date, mv.id
+        """
+
+        self.env.flush_all()
+        carry = dict(openings or {})
+        keyset = None
+        while True:
+            conditions = list(where)
+            if keyset:
+                params.update(zip(('last_product', 'last_date', 'last_id'), keyset))
+                conditions.append(
+                    "(m.product_id, m.date, m.id) > (%(last_product)s, %(last_date)s, %(last_id)s)")
+            self.env.cr.execute(query.format(where=" AND ".join(conditions)), params)
+            rows = self.env.cr.dictfetchall()
+            if not rows:
+                return
+
+            chunk_base = dict(carry)
+            for row in rows:
+                balance = chunk_base.get(row['product_id'], 0.0) + row['running_qty']
+                carry[row['product_id']] = balance
+                yield row['product_id'], self._prepare_movement(row, balance)
+
+            if len(rows) < LEDGER_CHUNK_SIZE:
+                return
+            last = rows[-1]
+            keyset = (last['product_id'], last['date'], last['id'])
+
+    @api.model
+    def _prepare_movement(self, row, balance):
+        """Construire la ligne de mouvement affichée à partir d'une ligne SQL."""
+        # Déterminer le type de partenaire
+        if not row['partner_name']:
+            partner_type = 'Inv. / T.I'
+        elif row['customer_rank'] > 0:
+            partner_type = 'Client'
+        elif row['supplier_rank'] > 0:
+            partner_type = 'Fournisseur'
+        else:
+            partner_type = 'Partenaire'
+
+        # Informations sur l'emplacement
+        location_info = ""
+        if row['src_usage'] == 'internal' and row['dst_usage'] == 'internal':
+            location_info = f"{row['src_name']} → {row['dst_name']}"
+        elif row['dst_usage'] == 'internal':
+            location_info = f"→ {row['dst_name']}"
+        elif row['src_usage'] == 'internal':
+            location_info = f"{row['src_name']} →"
+
+        return {
+            'date': row['date'],
+            'reference': row['picking_name'] or row['move_name'],
+            'partner_type': partner_type,
+            'partner_name': row['partner_name'] or '',
+            'location_info': location_info,
+            'location_src': row['src_full'],
+            'location_dest': row['dst_full'],
+            'in_qty': row['in_qty'],
+            'out_qty': row['out_qty'],
+            'balance': balance,
+        }
+
+    @api.model
+    def _iter_ledger(self, product_ids, location_ids, date_start=False, date_end=False):
+        """
+        Parcourir le grand livre produit par produit (ordre des IDs).
+
+        Les produits sans mouvement ni quantité initiale sont ignorés.
+
+        Yields:
+            (product_id, quantité initiale, itérateur des mouvements)
+        """
+        # Un emplacement parent inclut les mouvements de ses sous-emplacements,
+        # pour la quantité initiale comme pour les mouvements
+        location_ids = self._expand_locations(location_ids)
+        openings = self._get_opening_balances(product_ids, location_ids, date_start)
+        stream = groupby(
+            self._iter_movements(product_ids, location_ids, date_start, date_end, openings),
+            key=itemgetter(0))
+        group = next(stream, None)
+        for product_id in sorted(product_ids):
+            opening = openings.get(product_id, 0.0)
+            if group and group[0] == product_id:
+                yield product_id, opening, map(itemgetter(1), group[1])
+                group = next(stream, None)
+            elif opening:
+                yield product_id, opening, iter(())
+
     def _get_product_movements(self, product, location_ids, date_start=False, date_end=False):
         """
         Récupérer les mouvements d'un produit filtrés par emplacements.
@@ -20,105 +231,18 @@ class ProductMovementEnhancedReport(models.AbstractModel):
         Returns:
             dict avec initial_qty, movements, total_in, total_out, final_qty
         """
-        # Domaine de base
-        domain = [
-            ('product_id', '=', product.id),
-            ('state', '=', 'done'),
-        ]
-
-        # Filtre par date
-        if date_start:
-            domain.append(('date', '>=', date_start))
-        if date_end:
-            domain.append(('date', '<=', date_end))
-
-        # Filtre par emplacements (source OU destination doit être dans les emplacements)
-        if location_ids:
-            domain.append('|')
-            domain.append(('location_id', 'in', location_ids))
-            domain.append(('location_dest_id', 'in', location_ids))
-
-        moves = self.env['stock.move'].search(domain, order='date')
-
-        # Calculer la quantité initiale pour les emplacements sélectionnés
-        if date_start and location_ids:
-            # Quantité initiale = somme des quantités dans les emplacements sélectionnés à date_start
-            initial_qty = 0.0
-            for location_id in location_ids:
-                location = self.env['stock.location'].browse(location_id)
-                qty = product.with_context(
-                    to_date=date_start,
-                    location=location_id
-                ).qty_available
-                initial_qty += qty
-        elif location_ids:
-            initial_qty = 0.0
-        else:
-            initial_qty = product.with_context(to_date=date_start).qty_available if date_start else 0.0
-
-        movements = []
-        balance = initial_qty
-
-        for move in moves:
-            # Déterminer si c'est une entrée ou une sortie pour les emplacements sélectionnés
-            in_qty = 0.0
-            out_qty = 0.0
-
-            if location_ids:
-                # Entrée = destination dans les emplacements sélectionnés
-                if move.location_dest_id.id in location_ids and move.location_dest_id.usage == 'internal':
-                    in_qty = move.product_qty
-                # Sortie = source dans les emplacements sélectionnés
-                if move.location_id.id in location_ids and move.location_id.usage == 'internal':
-                    out_qty = move.product_qty
-            else:
-                # Sans filtre emplacement, utiliser la logique standard
-                if move.location_dest_id.usage == 'internal':
-                    in_qty = move.product_qty
-                if move.location_id.usage == 'internal':
-                    out_qty = move.product_qty
-
-            balance += in_qty - out_qty
-
-            # Déterminer le type de partenaire
-            if not move.picking_id.partner_id.name:
-                partner_type = 'Inv. / T.I'
-            else:
-                if move.picking_id.partner_id.customer_rank > 0:
-                    partner_type = 'Client'
-                elif move.picking_id.partner_id.supplier_rank > 0:
-                    partner_type = 'Fournisseur'
-                else:
-                    partner_type = 'Partenaire'
-
-            # Informations sur l'emplacement
-            location_info = ""
-            if move.location_id.usage == 'internal' and move.location_dest_id.usage == 'internal':
-                location_info = f"{move.location_id.name} → {move.location_dest_id.name}"
-            elif move.location_dest_id.usage == 'internal':
-                location_info = f"→ {move.location_dest_id.name}"
-            elif move.location_id.usage == 'internal':
-                location_info = f"{move.location_id.name} →"
-
-            movements.append({
-                'date': move.date,
-                'reference': move.picking_id.name or move.name,
-                'partner_type': partner_type,
-                'partner_name': move.picking_id.partner_id.name or '',
-                'location_info': location_info,
-                'location_src': move.location_id.display_name,
-                'location_dest': move.location_dest_id.display_name,
-                'in_qty': in_qty,
-                'out_qty': out_qty,
-                'balance': balance
-            })
+        for _product_id, opening, movements in self._iter_ledger([product.id], location_ids, date_start, date_end):
+            return self._summarize_movements(opening, list(movements))
+        return self._summarize_movements(0.0, [])
 
+    @api.model
+    def _summarize_movements(self, initial_qty, movements):
         return {
             'initial_qty': initial_qty,
             'movements': movements,
             'total_in': sum(m['in_qty'] for m in movements),
             'total_out': sum(m['out_qty'] for m in movements),
-            'final_qty': balance
+            'final_qty': movements[-1]['balance'] if movements else initial_qty,
         }
 
     @api.model
@@ -132,19 +256,18 @@ class ProductMovementEnhancedReport(models.AbstractModel):
         warehouses = self.env['stock.warehouse'].browse(warehouse_ids) if warehouse_ids else False
         locations = self.env['stock.location'].browse(location_ids) if location_ids else False
 
+        ledgers = {}
+        for product_id, opening, movements in self._iter_ledger(
+                products.ids, location_ids, data.get('date_start'), data.get('date_end')):
+            ledgers[product_id] = self._summarize_movements(opening, list(movements))
+
+        # Conserver l'ordre des produits
         products_data = {}
         for product in products:
-            movements_data = self._get_product_movements(
-                product,
-                location_ids,
-                data.get('date_start'),
-                data.get('date_end')
-            )
-            # Ne pas inclure les produits sans mouvements
-            if movements_data['movements'] or movements_data['initial_qty'] != 0:
+            if product.id in ledgers:
                 products_data[product.id] = {
                     'product': product,
-                    'movements': movements_data
+                    'movements': ledgers[product.id],
                 }
 
         return {
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+import base64
+import io
+
+import xlsxwriter
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
 
 
 class ProductMovementWizardEnhanced(models.TransientModel):
@@ -98,8 +104,8 @@ class ProductMovementWizardEnhanced(models.TransientModel):
             self.location_ids = False
 
     # ========== Override Action ==========
-    def action_generate_report(self):
-        """Générer le rapport avec les filtres entrepôts/emplacements."""
+    def _get_report_data(self):
+        """Préparer les données du rapport (produits, emplacements, filtres)."""
         self.ensure_one()
 
         # Déterminer les produits (logique originale)
@@ -123,8 +129,7 @@ class ProductMovementWizardEnhanced(models.TransientModel):
             # Emplacements spécifiquement sélectionnés
             locations = self.location_ids
 
-        # Préparer les données pour le rapport
-        data = {
+        return {
             'date_start': self.date_start,
             'date_end': self.date_end,
             'product_ids': products.ids,
@@ -134,6 +139,102 @@ class ProductMovementWizardEnhanced(models.TransientModel):
             'show_all_locations': self.show_all_locations,
         }
 
+    def action_generate_report(self):
+        """Générer le rapport avec les filtres entrepôts/emplacements."""
+        self.ensure_one()
+        data = self._get_report_data()
         return self.env.ref(
             'adi_stock_moves_report_enhanced.action_report_product_movements_enhanced'
         ).report_action(self, data=data)
+
+    def action_export_excel(self):
+        """Exporter le grand livre des mouvements au format Excel."""
+        self.ensure_one()
+        data = self._get_report_data()
+        if not data['product_ids']:
+            raise UserError(_("Aucun produit à exporter."))
+        return self._generer_excel(data)
+
+    def _generer_excel(self, data):
+        """
+        Générer le fichier Excel en écrivant les mouvements au fil de leur
+        lecture : le classeur est en mode mémoire constante, les lignes ne
+        sont jamais chargées toutes ensemble.
+        """
+        report = self.env['report.adi_stock_moves_report_enhanced.report_movements']
+        products = self.env['product.product'].browse(data['product_ids'])
+        products_by_id = {product.id: product for product in products}
+
+        output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet('Mouvements')
+
+        # Formats
+        header_format = workbook.add_format({
+            'bold': True,
+            'bg_color': '#4472C4',
+            'font_color': 'white',
+            'border': 1
+        })
+        product_format = workbook.add_format({'bold': True, 'bg_color': '#D9E1F2'})
+        date_format = workbook.add_format({'num_format': 'dd/mm/yyyy hh:mm'})
+        total_format = workbook.add_format({'bold': True, 'top': 1})
+
+        # En-têtes
+        headers = ['Produit', 'Date', 'Référence', 'Type', 'Partenaire',
+                   'Emplacement', 'Entrée', 'Sortie', 'Solde']
+        for col, header in enumerate(headers):
+            worksheet.write(0, col, header, header_format)
+        worksheet.set_column(0, 0, 35)
+        worksheet.set_column(1, 1, 18)
+        worksheet.set_column(2, 5, 22)
+        worksheet.set_column(6, 8, 12)
+
+        # Données : un bloc par produit (quantité initiale, mouvements, totaux)
+        row = 1
+        for product_id, opening, movements in report._iter_ledger(
+                data['product_ids'], data['location_ids'], data['date_start'], data['date_end']):
+            worksheet.write(row, 0, products_by_id[product_id].display_name, product_format)
+            worksheet.write(row, 5, 'Quantité initiale', product_format)
+            worksheet.write(row, 8, opening, product_format)
+            row += 1
+
+            total_in = total_out = 0.0
+            balance = opening
+            for move in movements:
+                worksheet.write_datetime(row, 1, move['date'], date_format)
+                worksheet.write(row, 2, move['reference'] or '')
+                worksheet.write(row, 3, move['partner_type'])
+                worksheet.write(row, 4, move['partner_name'])
+                worksheet.write(row, 5, move['location_info'])
+                worksheet.write(row, 6, move['in_qty'])
+                worksheet.write(row, 7, move['out_qty'])
+                worksheet.write(row, 8, move['balance'])
+                total_in += move['in_qty']
+                total_out += move['out_qty']
+                balance = move['balance']
+                row += 1
+
+            worksheet.write(row, 5, 'Total', total_format)
+            worksheet.write(row, 6, total_in, total_format)
+            worksheet.write(row, 7, total_out, total_format)
+            worksheet.write(row, 8, balance, total_format)
+            row += 2
+
+        workbook.close()
+        output.seek(0)
+
+        # Créer l'attachement
+        attachment = self.env['ir.attachment'].create({
+            'name': f'Mouvements_Produits_{self.date_start or ""}_{self.date_end or ""}.xlsx',
+            'type': 'binary',
+            'datas': base64.b64encode(output.read()),
+            'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        })
+
+        # Retourner l'action de téléchargement
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{attachment.id}?download=true',
+            'target': 'self',
+        }
@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
+from . import stock_quant
 from . import stock_move
@@ -21,16 +21,17 @@ class StockMove(models.Model):
 
     @api.depends('product_id', 'location_id', 'product_uom_qty')
     def _compute_qty_available_source(self):
+        # Disponibilité de tous les mouvements lue en une seule requête
+        availability = self.env['stock.quant']._get_source_availability(
+            (move.product_id.id, move.location_id.id)
+            for move in self if move.product_id and move.location_id
+        )
         for move in self:
             qty_available = 0.0
             is_insufficient = False
             if move.product_id and move.location_id:
-                # Calculer la quantité disponible dans l'emplacement source
-                quants = self.env['stock.quant'].search([
-                    ('product_id', '=', move.product_id.id),
-                    ('location_id', '=', move.location_id.id),
-                ])
-                qty_available = sum(quants.mapped('quantity')) - sum(quants.mapped('reserved_quantity'))
+                # Quantité disponible dans l'emplacement source
+                qty_available = availability[(move.product_id.id, move.location_id.id)]
                 # Vérifier si le stock est insuffisant
                 if move.product_uom_qty > qty_available:
                     is_insufficient = True
@@ -56,16 +57,17 @@ class StockMoveLine(models.Model):
 
     @api.depends('product_id', 'location_id', 'quantity')
     def _compute_qty_available_source(self):
+        # Disponibilité de toutes les lignes lue en une seule requête
+        availability = self.env['stock.quant']._get_source_availability(
+            (line.product_id.id, line.location_id.id)
+            for line in self if line.product_id and line.location_id
+        )
         for line in self:
             qty_available = 0.0
             is_insufficient = False
             if line.product_id and line.location_id:
-                # Calculer la quantité disponible dans l'emplacement source
-                quants = self.env['stock.quant'].search([
-                    ('product_id', '=', line.product_id.id),
-                    ('location_id', '=', line.location_id.id),
-                ])
-                qty_available = sum(quants.mapped('quantity')) - sum(quants.mapped('reserved_quantity'))
+                # Quantité disponible dans l'emplacement source
+                qty_available = availability[(line.product_id.id, line.location_id.id)]
                 # Vérifier si le stock est insuffisant (quantity remplace qty_done en Odoo 17)
                 if line.quantity > qty_available:
                     is_insufficient = True
@@ -78,40 +80,39 @@ class StockPicking(models.Model):
 
     def button_validate(self):
         """Surcharge pour vérifier la disponibilité avant validation"""
-        for picking in self:
-            # Vérifier seulement pour les transferts sortants (pas les réceptions)
-            if picking.picking_type_code in ('outgoing', 'internal'):
-                # Filtrer uniquement les mouvements actifs (pas annulés, pas faits, avec quantité > 0)
-                # En Odoo 17, move_lines est remplacé par move_ids
-                active_moves = picking.move_ids.filtered(
-                    lambda m: m.state not in ('cancel', 'done') and m.product_uom_qty > 0
-                )
-                for move in active_moves:
-                    if move.product_id and move.location_id:
-                        # Calculer la quantité disponible
-                        quants = self.env['stock.quant'].search([
-                            ('product_id', '=', move.product_id.id),
-                            ('location_id', '=', move.location_id.id),
-                        ])
-                        qty_available = sum(quants.mapped('quantity')) - sum(quants.mapped('reserved_quantity'))
+        # Vérifier seulement pour les transferts sortants (pas les réceptions)
+        # Filtrer uniquement les mouvements actifs (pas annulés, pas faits, avec quantité > 0)
+        # En Odoo 17, move_lines est remplacé par move_ids
+        active_moves = self.filtered(
+            lambda p: p.picking_type_code in ('outgoing', 'internal')
+        ).move_ids.filtered(
+            lambda m: m.state not in ('cancel', 'done') and m.product_uom_qty > 0
+            and m.product_id and m.location_id
+        )
+        # Disponibilité de tous les mouvements en une seule requête
+        availability = self.env['stock.quant']._get_source_availability(
+            (move.product_id.id, move.location_id.id) for move in active_moves
+        )
+        for move in active_moves:
+            qty_available = availability[(move.product_id.id, move.location_id.id)]
 
-                        # Ajouter la quantité réservée pour ce mouvement (elle sera libérée)
-                        # En Odoo 17, reserved_availability peut être remplacé par quantity
-                        qty_available += move.quantity
+            # Ajouter la quantité réservée pour ce mouvement (elle sera libérée)
+            # En Odoo 17, reserved_availability peut être remplacé par quantity
+            qty_available += move.quantity
 
-                        if move.product_uom_qty > qty_available:
-                            raise UserError(_(
-                                "Transfert impossible !\n\n"
-                                "Le produit '%s' n'a pas assez de stock dans l'emplacement source '%s'.\n\n"
-                                "- Quantité demandée: %s %s\n"
-                                "- Quantité disponible: %s %s\n\n"
-                                "Veuillez ajuster la quantité ou attendre un réapprovisionnement."
-                            ) % (
-                                move.product_id.display_name,
-                                move.location_id.complete_name,
-                                move.product_uom_qty,
-                                move.product_uom.name,
-                                qty_available,
-                                move.product_uom.name,
-                            ))
+            if move.product_uom_qty > qty_available:
+                raise UserError(_(
+                    "Transfert impossible !\n\n"
+                    "Le produit '%s' n'a pas assez de stock dans l'emplacement source '%s'.\n\n"
+                    "- Quantité demandée: %s %s\n"
+                    "- Quantité disponible: %s %s\n\n"
+                    "Veuillez ajuster la quantité ou attendre un réapprovisionnement."
+                ) % (
+                    move.product_id.display_name,
+                    move.location_id.complete_name,
+                    move.product_uom_qty,
+                    move.product_uom.name,
+                    qty_available,
+                    move.product_uom.name,
+                ))
         return super().button_validate()
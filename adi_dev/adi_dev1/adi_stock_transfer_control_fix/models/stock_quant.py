@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+# Clé du cache de disponibilité dans les données de la transaction
+# (cr.precommit.data, vidées au commit comme au rollback)
+AVAILABILITY_CACHE_KEY = 'adi_stock_transfer_control_fix.source_availability'
+
+
+class StockQuant(models.Model):
+    _inherit = 'stock.quant'
+
+    @api.model
+    def _get_source_availability(self, pairs):
+        """
+        Quantité disponible (quantité - réservée) par couple produit/emplacement.
+
+        Les couples absents du cache sont lus en une seule requête groupée ;
+        le résultat est mémorisé pour la durée de la transaction, par
+        utilisateur, mode superutilisateur et sociétés (les règles
+        d'enregistrement s'appliquent à la lecture), et invalidé dès qu'un
+        quant est modifié.
+
+        :param pairs: itérable de (product_id, location_id)
+        :return: dict {(product_id, location_id): quantité disponible}
+        """
+        pairs = set(pairs)
+        env_key = (self.env.uid, self.env.su, tuple(self.env.companies.ids))
+        cache = self.env.cr.precommit.data.setdefault(
+            AVAILABILITY_CACHE_KEY, {}).setdefault(env_key, {})
+        missing = pairs.difference(cache)
+        if missing:
+            for pair in missing:
+                cache[pair] = 0.0
+            groups = self._read_group(
+                [
+                    ('product_id', 'in', list({product_id for product_id, _location_id in missing})),
+                    ('location_id', 'in', list({location_id for _product_id, location_id in missing})),
+                ],
+                ['product_id', 'location_id'],
+                ['quantity:sum', 'reserved_quantity:sum'],
+            )
+            for product, location, quantity, reserved_quantity in groups:
+                pair = (product.id, location.id)
+                if pair in missing:
+                    cache[pair] = quantity - reserved_quantity
+        return {pair: cache[pair] for pair in pairs}
+
+    @api.model
+    def _invalidate_source_availability(self):
+        self.env.cr.precommit.data.pop(AVAILABILITY_CACHE_KEY, None)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._invalidate_source_availability()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self._invalidate_source_availability()
+        return super().write(vals)
+
+    def unlink(self):
+        self._invalidate_source_availability()
+        return super().unlink()
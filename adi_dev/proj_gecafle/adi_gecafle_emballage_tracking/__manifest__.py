@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'GECAFLE - Tracking Emballages',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.2',
     'author': 'ADICOPS',
     'website': 'https://adicops-dz.com',
     'email': 'info@adicops.com',
@@ -31,6 +31,7 @@
 
         # Données
         'data/sequence.xml',
+        'data/ir_actions_server_data.xml',
 
         # Vues
         'views/emballage_tracking_views.xml',
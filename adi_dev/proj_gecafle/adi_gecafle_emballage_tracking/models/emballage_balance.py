@@ -1,6 +1,131 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, tools
 
+# Colonnes du registre : quantité cumulée par type de mouvement
+LEDGER_COLUMNS = {
+    'qte_sortie_vente': "m.type_mouvement = 'sortie_vente'",
+    'qte_retour_client': "m.type_mouvement IN ('retour_client', 'consigne')",
+    'qte_entree_reception': "m.type_mouvement = 'entree_reception'",
+    'qte_sortie_producteur': "m.type_mouvement = 'sortie_producteur'",
+    'qte_retour_producteur': "m.type_mouvement = 'retour_producteur'",
+    'qte_regul_entree': "m.type_mouvement = 'regularisation' AND m.sens = 'entree'",
+    'qte_regul_sortie': "m.type_mouvement = 'regularisation' AND m.sens IS DISTINCT FROM 'entree'",
+}
+
+
+class GecafleEmballageBalanceLedger(models.Model):
+    _name = 'gecafle.emballage.balance.ledger'
+    _description = 'Registre des Soldes Emballages'
+    _log_access = False
+
+    tracking_id = fields.Many2one('gecafle.emballage.tracking', string='Tracking',
+                                  required=True, ondelete='cascade', index=True)
+    emballage_id = fields.Many2one('gecafle.emballage', string='Emballage', required=True, ondelete='cascade')
+    client_id = fields.Many2one('gecafle.client', string='Client', ondelete='cascade', index=True)
+    producteur_id = fields.Many2one('gecafle.producteur', string='Producteur', ondelete='cascade', index=True)
+    qte_sortie_vente = fields.Integer(string='Sorties vente')
+    qte_retour_client = fields.Integer(string='Retours client')
+    qte_entree_reception = fields.Integer(string='Entrées réception')
+    qte_sortie_producteur = fields.Integer(string='Sorties producteur')
+    qte_retour_producteur = fields.Integer(string='Retours producteur')
+    qte_regul_entree = fields.Integer(string='Régularisations entrée')
+    qte_regul_sortie = fields.Integer(string='Régularisations sortie')
+    last_movement = fields.Datetime(string='Dernier mouvement')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS gecafle_emballage_balance_ledger_key_uniq
+            ON gecafle_emballage_balance_ledger (tracking_id, COALESCE(client_id, 0), COALESCE(producteur_id, 0))
+        """)
+        # Construit une seule fois : une mise à jour du module ne réécrit pas le registre
+        self.env.cr.execute("SELECT 1 FROM gecafle_emballage_balance_ledger LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    def _aggregate_query(self, where_clause):
+        """Requête d'agrégation des mouvements non annulés vers le registre.
+        Le premier paramètre est le signe appliqué aux quantités (1 ou -1)."""
+        columns = ', '.join(LEDGER_COLUMNS)
+        sums = ', '.join(
+            "%%(sign)s * SUM(CASE WHEN %s THEN m.quantite ELSE 0 END)" % condition
+            for condition in LEDGER_COLUMNS.values()
+        )
+        updates = ', '.join(
+            "%s = gecafle_emballage_balance_ledger.%s + EXCLUDED.%s" % (column, column, column)
+            for column in LEDGER_COLUMNS
+        )
+        return """
+            INSERT INTO gecafle_emballage_balance_ledger
+                (tracking_id, emballage_id, client_id, producteur_id, """ + columns + """, last_movement)
+            SELECT m.tracking_id, t.emballage_id, m.client_id, m.producteur_id, """ + sums + """,
+                   MAX(m.date)
+            FROM gecafle_emballage_mouvement m
+            JOIN gecafle_emballage_tracking t ON t.id = m.tracking_id
+            WHERE m.is_cancelled = False AND """ + where_clause + """
+            GROUP BY m.tracking_id, t.emballage_id, m.client_id, m.producteur_id
+            ON CONFLICT (tracking_id, COALESCE(client_id, 0), COALESCE(producteur_id, 0))
+            DO UPDATE SET """ + updates + """,
+                last_movement = GREATEST(gecafle_emballage_balance_ledger.last_movement, EXCLUDED.last_movement)
+        """
+
+    @api.model
+    def _rebuild(self):
+        """Recalcule entièrement le registre depuis les mouvements
+        (installation ou action « Recalculer le registre des soldes »)"""
+        self.env['gecafle.emballage.mouvement'].flush_model()
+        self.env.cr.execute("DELETE FROM gecafle_emballage_balance_ledger")
+        self.env.cr.execute(self._aggregate_query("TRUE"), {'sign': 1})
+        self.invalidate_model()
+
+    @api.model
+    def _apply_mouvements(self, mouvements, sign):
+        """Ajoute (sign=1) ou retire (sign=-1) les mouvements non annulés du registre,
+        dans la même transaction que leur création, modification ou annulation."""
+        if not mouvements:
+            return
+        mouvements.flush_recordset([
+            'tracking_id', 'client_id', 'producteur_id', 'type_mouvement', 'sens',
+            'quantite', 'date', 'is_cancelled',
+        ])
+        self.env.cr.execute(
+            self._aggregate_query("m.id IN %(ids)s"), {'sign': sign, 'ids': tuple(mouvements.ids)})
+        if sign < 0:
+            # Le dernier mouvement des clés concernées doit être relu
+            self.env.cr.execute("""
+                UPDATE gecafle_emballage_balance_ledger l
+                SET last_movement = (
+                    SELECT MAX(m.date) FROM gecafle_emballage_mouvement m
+                    WHERE m.tracking_id = l.tracking_id
+                      AND m.is_cancelled = False
+                      AND m.id NOT IN %(ids)s
+                      AND COALESCE(m.client_id, 0) = COALESCE(l.client_id, 0)
+                      AND COALESCE(m.producteur_id, 0) = COALESCE(l.producteur_id, 0)
+                )
+                WHERE l.tracking_id IN %(tracking_ids)s
+            """, {'ids': tuple(mouvements.ids), 'tracking_ids': tuple(mouvements.tracking_id.ids)})
+        self.invalidate_model()
+        trackings = mouvements.tracking_id
+        Tracking = self.env['gecafle.emballage.tracking']
+        for fname in ('stock_disponible', 'stock_chez_clients', 'stock_chez_producteurs', 'stock_total'):
+            self.env.add_to_compute(Tracking._fields[fname], trackings)
+
+    @api.model
+    def _get_tracking_totals(self, trackings):
+        """Totaux par type de mouvement pour chaque tracking : {tracking_id: {colonne: qté}}"""
+        totals = {tracking_id: dict.fromkeys(LEDGER_COLUMNS, 0) for tracking_id in trackings.ids}
+        if not trackings.ids:
+            return totals
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT tracking_id, """ + ', '.join('SUM(%s)' % column for column in LEDGER_COLUMNS) + """
+            FROM gecafle_emballage_balance_ledger
+            WHERE tracking_id IN %s
+            GROUP BY tracking_id
+        """, (tuple(trackings.ids),))
+        for row in self.env.cr.fetchall():
+            totals[row[0]] = dict(zip(LEDGER_COLUMNS, row[1:]))
+        return totals
+
 
 class GecafleEmballageBalanceClient(models.Model):
     _name = 'gecafle.emballage.balance.client'
@@ -21,28 +146,18 @@ class GecafleEmballageBalanceClient(models.Model):
         tools.drop_view_if_exists(self.env.cr, self._table)
         self.env.cr.execute("""
             CREATE OR REPLACE VIEW %s AS (
-                SELECT 
-                    row_number() OVER () AS id,
-                    m.client_id,
-                    t.emballage_id,
-                    SUM(CASE WHEN m.type_mouvement = 'sortie_vente' THEN m.quantite ELSE 0 END) AS total_sortant,
-                    SUM(CASE WHEN m.type_mouvement IN ('retour_client', 'consigne') THEN m.quantite ELSE 0 END) AS total_entrant,
-                    SUM(CASE 
-                        WHEN m.type_mouvement = 'sortie_vente' THEN m.quantite 
-                        WHEN m.type_mouvement IN ('retour_client', 'consigne') THEN -m.quantite 
-                        ELSE 0 
-                    END) AS solde,
-                    MAX(m.date) AS last_movement
-                FROM gecafle_emballage_mouvement m
-                INNER JOIN gecafle_emballage_tracking t ON m.tracking_id = t.id
-                WHERE m.client_id IS NOT NULL
-                  AND m.is_cancelled = False
-                GROUP BY m.client_id, t.emballage_id
-                HAVING SUM(CASE 
-                    WHEN m.type_mouvement = 'sortie_vente' THEN m.quantite 
-                    WHEN m.type_mouvement IN ('retour_client', 'consigne') THEN -m.quantite 
-                    ELSE 0 
-                END) != 0
+                SELECT
+                    MIN(l.id) AS id,
+                    l.client_id,
+                    l.emballage_id,
+                    SUM(l.qte_sortie_vente) AS total_sortant,
+                    SUM(l.qte_retour_client) AS total_entrant,
+                    SUM(l.qte_sortie_vente - l.qte_retour_client) AS solde,
+                    MAX(l.last_movement) AS last_movement
+                FROM gecafle_emballage_balance_ledger l
+                WHERE l.client_id IS NOT NULL
+                GROUP BY l.client_id, l.emballage_id
+                HAVING SUM(l.qte_sortie_vente - l.qte_retour_client) != 0
             )
         """ % self._table)
 
@@ -66,27 +181,17 @@ class GecafleEmballageBalanceProducteur(models.Model):
         tools.drop_view_if_exists(self.env.cr, self._table)
         self.env.cr.execute("""
             CREATE OR REPLACE VIEW %s AS (
-                SELECT 
-                    row_number() OVER () AS id,
-                    m.producteur_id,
-                    t.emballage_id,
-                    SUM(CASE WHEN m.type_mouvement IN ('entree_reception', 'retour_producteur') THEN m.quantite ELSE 0 END) AS total_entrant,
-                    SUM(CASE WHEN m.type_mouvement = 'sortie_producteur' THEN m.quantite ELSE 0 END) AS total_sortant,
-                    SUM(CASE 
-                        WHEN m.type_mouvement IN ('entree_reception', 'retour_producteur') THEN m.quantite 
-                        WHEN m.type_mouvement = 'sortie_producteur' THEN -m.quantite 
-                        ELSE 0 
-                    END) AS solde,
-                    MAX(m.date) AS last_movement
-                FROM gecafle_emballage_mouvement m
-                INNER JOIN gecafle_emballage_tracking t ON m.tracking_id = t.id
-                WHERE m.producteur_id IS NOT NULL
-                  AND m.is_cancelled = False
-                GROUP BY m.producteur_id, t.emballage_id
-                HAVING SUM(CASE 
-                    WHEN m.type_mouvement IN ('entree_reception', 'retour_producteur') THEN m.quantite 
-                    WHEN m.type_mouvement = 'sortie_producteur' THEN -m.quantite 
-                    ELSE 0 
-                END) != 0
+                SELECT
+                    MIN(l.id) AS id,
+                    l.producteur_id,
+                    l.emballage_id,
+                    SUM(l.qte_entree_reception + l.qte_retour_producteur) AS total_entrant,
+                    SUM(l.qte_sortie_producteur) AS total_sortant,
+                    SUM(l.qte_entree_reception + l.qte_retour_producteur - l.qte_sortie_producteur) AS solde,
+                    MAX(l.last_movement) AS last_movement
+                FROM gecafle_emballage_balance_ledger l
+                WHERE l.producteur_id IS NOT NULL
+                GROUP BY l.producteur_id, l.emballage_id
+                HAVING SUM(l.qte_entree_reception + l.qte_retour_producteur - l.qte_sortie_producteur) != 0
             )
         """ % self._table)
@@ -111,11 +111,31 @@ class GecafleEmballageMouvement(models.Model):
         default=lambda self: self.env.company
     )
 
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'Nouveau') == 'Nouveau':
-            vals['name'] = self.env['ir.sequence'].next_by_code('gecafle.emballage.mouvement') or 'EMB/'
-        return super().create(vals)
+    # Champs dont la modification change le registre des soldes
+    _LEDGER_FIELDS = {'tracking_id', 'client_id', 'producteur_id', 'type_mouvement', 'quantite',
+                      'date', 'is_cancelled'}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'Nouveau') == 'Nouveau':
+                vals['name'] = self.env['ir.sequence'].next_by_code('gecafle.emballage.mouvement') or 'EMB/'
+        records = super().create(vals_list)
+        self.env['gecafle.emballage.balance.ledger']._apply_mouvements(records, 1)
+        return records
+
+    def write(self, vals):
+        if not self._LEDGER_FIELDS.intersection(vals):
+            return super().write(vals)
+        ledger = self.env['gecafle.emballage.balance.ledger']
+        ledger._apply_mouvements(self, -1)
+        res = super().write(vals)
+        ledger._apply_mouvements(self, 1)
+        return res
+
+    def unlink(self):
+        self.env['gecafle.emballage.balance.ledger']._apply_mouvements(self, -1)
+        return super().unlink()
 
     @api.depends('type_mouvement')
     def _compute_sens(self):
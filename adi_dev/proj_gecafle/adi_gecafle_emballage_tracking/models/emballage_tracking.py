@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 
+import logging
+
+from .emballage_balance import LEDGER_COLUMNS
+
+_logger = logging.getLogger(__name__)
+
 
 class GecafleEmballageTracking(models.Model):
     _name = 'gecafle.emballage.tracking'
@@ -80,45 +86,73 @@ class GecafleEmballageTracking(models.Model):
         default=lambda self: self.env.company
     )
 
-    @api.depends('mouvement_ids', 'mouvement_ids.quantite', 'mouvement_ids.type_mouvement',
-                 'mouvement_ids.is_cancelled')
+    @api.depends('stock_initial')
     def _compute_stocks(self):
-        """Calcule les stocks par emplacement"""
+        """Calcule les stocks par emplacement depuis le registre des soldes.
+        Le registre marque lui-même ces champs à recalculer à chaque mouvement."""
+        totals = self.env['gecafle.emballage.balance.ledger']._get_tracking_totals(self._origin)
         for record in self:
-            stock_disponible = record.stock_initial
-            stock_clients = 0
-            stock_producteurs = 0
-
-            # Filtrer les mouvements non annulés
-            active_mouvements = record.mouvement_ids.filtered(lambda m: not m.is_cancelled)
-
-            for mouvement in active_mouvements:
-                if mouvement.type_mouvement == 'sortie_vente':
-                    stock_disponible -= mouvement.quantite
-                    stock_clients += mouvement.quantite
-                elif mouvement.type_mouvement in ['retour_client', 'consigne']:  # Ajout de 'consigne'
-                    stock_disponible += mouvement.quantite
-                    stock_clients -= mouvement.quantite
-                elif mouvement.type_mouvement == 'entree_reception':
-                    stock_disponible += mouvement.quantite
-                    stock_producteurs -= mouvement.quantite
-                elif mouvement.type_mouvement == 'sortie_producteur':
-                    stock_disponible -= mouvement.quantite
-                    stock_producteurs += mouvement.quantite
-                elif mouvement.type_mouvement == 'retour_producteur':
-                    stock_disponible += mouvement.quantite
-                    stock_producteurs -= mouvement.quantite
-                elif mouvement.type_mouvement == 'regularisation':
-                    if mouvement.sens == 'entree':
-                        stock_disponible += mouvement.quantite
-                    else:
-                        stock_disponible -= mouvement.quantite
+            qte = totals.get(record._origin.id)
+            if not qte:
+                qte = dict.fromkeys(LEDGER_COLUMNS, 0)
+            stock_disponible = (
+                record.stock_initial
+                - qte['qte_sortie_vente'] + qte['qte_retour_client']
+                + qte['qte_entree_reception'] - qte['qte_sortie_producteur']
+                + qte['qte_retour_producteur']
+                + qte['qte_regul_entree'] - qte['qte_regul_sortie']
+            )
+            stock_clients = qte['qte_sortie_vente'] - qte['qte_retour_client']
+            stock_producteurs = (
+                qte['qte_sortie_producteur'] - qte['qte_entree_reception'] - qte['qte_retour_producteur']
+            )
 
             record.stock_disponible = stock_disponible
             record.stock_chez_clients = stock_clients
             record.stock_chez_producteurs = stock_producteurs
             record.stock_total = stock_disponible + stock_clients + stock_producteurs
 
+    @api.model
+    @tools.ormcache()
+    def _is_auto_create_enabled(self):
+        """Paramètre gecafle.tracking_auto_create, mis en cache par registre.
+        set_param vide les caches du registre : la valeur reste à jour."""
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'gecafle.tracking_auto_create', 'True'
+        ) == 'True'
+
+    @api.model
+    def _get_or_create_for_emballages(self, emballages):
+        """Retourne {emballage_id: tracking} en une recherche, en créant
+        d'un seul coup les trackings manquants."""
+        trackings = {}
+        for tracking in self.search([('emballage_id', 'in', emballages.ids)], order='id desc'):
+            trackings[tracking.emballage_id.id] = tracking
+        missing = emballages.filtered(lambda e: e.id not in trackings)
+        if missing:
+            _logger.info("Création du tracking pour les emballages %s", ', '.join(missing.mapped('name')))
+            for tracking in self.create([{
+                'emballage_id': emballage.id,
+                'is_tracked': True,
+                'stock_initial': 0,
+            } for emballage in missing]):
+                trackings[tracking.emballage_id.id] = tracking
+        return trackings
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'emballage_id' in vals:
+            # Garder l'emballage du registre aligné sur celui du tracking
+            self.flush_recordset(['emballage_id'])
+            self.env.cr.execute("""
+                UPDATE gecafle_emballage_balance_ledger l
+                SET emballage_id = t.emballage_id
+                FROM gecafle_emballage_tracking t
+                WHERE l.tracking_id = t.id AND t.id IN %s
+            """, (tuple(self.ids),))
+            self.env['gecafle.emballage.balance.ledger'].invalidate_model(['emballage_id'])
+        return res
+
     @api.depends('mouvement_ids')
     def _compute_mouvement_count(self):
         for record in self:
@@ -22,78 +22,61 @@ class VenteInherit(models.Model):
         # D'abord exécuter la méthode parent
         res = super(VenteInherit, self).action_confirm()
 
-        # Ensuite créer les mouvements si la vente est validée
-        for vente in self:
-            if vente.state == 'valide':
-                _logger.info(f"Création des mouvements d'emballage pour la vente {vente.name}")
-                vente._create_emballage_mouvements()
+        # Ensuite créer en une fois les mouvements des ventes validées
+        self.filtered(lambda v: v.state == 'valide')._create_emballage_mouvements()
 
         return res
 
     def _create_emballage_mouvements(self):
-        """Crée les mouvements d'emballage lors de la validation"""
-        self.ensure_one()
-
+        """Crée les mouvements d'emballage lors de la validation, pour toutes les ventes de self"""
+        Tracking = self.env['gecafle.emballage.tracking']
+        if not self:
+            return
         # Vérifier si la création automatique est activée
-        auto_create = self.env['ir.config_parameter'].sudo().get_param(
-            'gecafle.tracking_auto_create', 'True'
-        )
-
-        if auto_create != 'True':
+        if not Tracking._is_auto_create_enabled():
             _logger.info("Création automatique des mouvements désactivée")
             return
 
-        _logger.info(f"Création des mouvements pour {len(self.detail_emballage_vente_ids)} lignes d'emballage")
-
-        # Créer les mouvements basés sur les lignes d'emballage
-        for line in self.detail_emballage_vente_ids:
-            if not line.emballage_id:
-                continue
+        lines = self.detail_emballage_vente_ids.filtered('emballage_id')
+        # Obtenir ou créer les trackings en une seule requête
+        trackings = Tracking._get_or_create_for_emballages(lines.emballage_id)
 
-            # Obtenir ou créer le tracking
-            tracking = self._get_or_create_tracking(line.emballage_id)
+        vals_list = []
+        for line in lines:
+            vente = line.vente_id
+            tracking = trackings[line.emballage_id.id]
 
             # Sortie d'emballages
             if line.qte_sortantes > 0:
-                mouvement = self.env['gecafle.emballage.mouvement'].create({
+                vals_list.append({
                     'tracking_id': tracking.id,
-                    'date': self.date_vente,
+                    'date': vente.date_vente,
                     'type_mouvement': 'sortie_vente',
                     'quantite': line.qte_sortantes,
-                    'client_id': self.client_id.id,
-                    'vente_id': self.id,
-                    'notes': _("Sortie emballages - Vente %s") % self.name,
+                    'client_id': vente.client_id.id,
+                    'vente_id': vente.id,
+                    'notes': _("Sortie emballages - Vente %s") % vente.name,
                 })
-                _logger.info(f"Mouvement sortie créé : {mouvement.name} - Qté: {line.qte_sortantes}")
 
             # Retour d'emballages
             if line.qte_entrantes > 0:
-                mouvement = self.env['gecafle.emballage.mouvement'].create({
+                vals_list.append({
                     'tracking_id': tracking.id,
-                    'date': self.date_vente,
+                    'date': vente.date_vente,
                     'type_mouvement': 'retour_client',
                     'quantite': line.qte_entrantes,
-                    'client_id': self.client_id.id,
-                    'vente_id': self.id,
-                    'notes': _("Retour emballages - Vente %s") % self.name,
+                    'client_id': vente.client_id.id,
+                    'vente_id': vente.id,
+                    'notes': _("Retour emballages - Vente %s") % vente.name,
                 })
-                _logger.info(f"Mouvement retour créé : {mouvement.name} - Qté: {line.qte_entrantes}")
+
+        if vals_list:
+            self.env['gecafle.emballage.mouvement'].create(vals_list)
+        _logger.info("%s mouvements d'emballage créés pour %s vente(s)", len(vals_list), len(self))
 
     def _get_or_create_tracking(self, emballage):
         """Obtient ou crée le tracking pour un emballage"""
-        tracking = self.env['gecafle.emballage.tracking'].search([
-            ('emballage_id', '=', emballage.id)
-        ], limit=1)
-
-        if not tracking:
-            _logger.info(f"Création du tracking pour l'emballage {emballage.name}")
-            tracking = self.env['gecafle.emballage.tracking'].create({
-                'emballage_id': emballage.id,
-                'is_tracked': True,
-                'stock_initial': 0
-            })
-
-        return tracking
+        return self.env['gecafle.emballage.tracking']._get_or_create_for_emballages(emballage)[emballage.id]
 
     def action_cancel(self):
         """Annule la vente et crée des mouvements inverses"""
@@ -139,61 +122,56 @@ class ReceptionInherit(models.Model):
         """Confirme la réception et crée les mouvements"""
         res = super(ReceptionInherit, self).action_confirm()
 
-        for reception in self:
-            if reception.state == 'confirmee':
-                _logger.info(f"Création des mouvements d'emballage pour la réception {reception.name}")
-                reception._create_emballage_mouvements()
+        self.filtered(lambda r: r.state == 'confirmee')._create_emballage_mouvements()
 
         return res
 
     def _create_emballage_mouvements(self):
-        """Crée les mouvements d'emballage pour les réceptions"""
-        self.ensure_one()
-
+        """Crée les mouvements d'emballage pour les réceptions de self"""
+        Tracking = self.env['gecafle.emballage.tracking']
+        if not self:
+            return
         # Vérifier si la création automatique est activée
-        auto_create = self.env['ir.config_parameter'].sudo().get_param(
-            'gecafle.tracking_auto_create', 'True'
-        )
-
-        if auto_create != 'True':
+        if not Tracking._is_auto_create_enabled():
             _logger.info("Création automatique des mouvements désactivée")
             return
 
-        _logger.info(f"Création des mouvements pour {len(self.details_emballage_reception_ids)} lignes d'emballage")
-
-        # Créer les mouvements basés sur les lignes d'emballage de réception
-        for line in self.details_emballage_reception_ids:
-            if not line.emballage_id:
-                continue
+        lines = self.details_emballage_reception_ids.filtered('emballage_id')
+        # Obtenir ou créer les trackings en une seule requête
+        trackings = Tracking._get_or_create_for_emballages(lines.emballage_id)
 
-            # Obtenir ou créer le tracking
-            tracking = self.env['gecafle.vente']._get_or_create_tracking(line.emballage_id)
+        vals_list = []
+        for line in lines:
+            reception = line.reception_id
+            tracking = trackings[line.emballage_id.id]
 
             # Entrée d'emballages
             if line.qte_entrantes > 0:
-                mouvement = self.env['gecafle.emballage.mouvement'].create({
+                vals_list.append({
                     'tracking_id': tracking.id,
-                    'date': self.reception_date,
+                    'date': reception.reception_date,
                     'type_mouvement': 'entree_reception',
                     'quantite': line.qte_entrantes,
-                    'producteur_id': self.producteur_id.id,
-                    'reception_id': self.id,
-                    'notes': _("Entrée emballages - Réception %s") % self.name,
+                    'producteur_id': reception.producteur_id.id,
+                    'reception_id': reception.id,
+                    'notes': _("Entrée emballages - Réception %s") % reception.name,
                 })
-                _logger.info(f"Mouvement entrée créé : {mouvement.name} - Qté: {line.qte_entrantes}")
 
             # Sortie d'emballages
             if line.qte_sortantes > 0:
-                mouvement = self.env['gecafle.emballage.mouvement'].create({
+                vals_list.append({
                     'tracking_id': tracking.id,
-                    'date': self.reception_date,
+                    'date': reception.reception_date,
                     'type_mouvement': 'sortie_producteur',
                     'quantite': line.qte_sortantes,
-                    'producteur_id': self.producteur_id.id,
-                    'reception_id': self.id,
-                    'notes': _("Sortie emballages - Réception %s") % self.name,
+                    'producteur_id': reception.producteur_id.id,
+                    'reception_id': reception.id,
+                    'notes': _("Sortie emballages - Réception %s") % reception.name,
                 })
-                _logger.info(f"Mouvement sortie créé : {mouvement.name} - Qté: {line.qte_sortantes}")
+
+        if vals_list:
+            self.env['gecafle.emballage.mouvement'].create(vals_list)
+        _logger.info("%s mouvements d'emballage créés pour %s réception(s)", len(vals_list), len(self))
 
 
 # Classes pour les opérations manuelles d'emballages
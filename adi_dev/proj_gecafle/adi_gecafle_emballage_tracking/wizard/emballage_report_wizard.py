@@ -341,6 +341,15 @@ class GecafleEmballageReportWizard(models.TransientModel):
 
         return data
 
+    def _get_trackings_by_emballage(self, mouvements):
+        """Trackings des emballages des mouvements, lus en une seule recherche.
+        Leurs stocks sont tenus à jour par le registre des soldes."""
+        trackings = {}
+        for tracking in self.env['gecafle.emballage.tracking'].search(
+                [('emballage_id', 'in', mouvements.emballage_id.ids)], order='id desc'):
+            trackings[tracking.emballage_id.id] = tracking
+        return trackings
+
     def _prepare_global_data(self, mouvements):
         """Prépare les données pour le rapport global"""
         data = {
@@ -353,6 +362,7 @@ class GecafleEmballageReportWizard(models.TransientModel):
         }
 
         emballages_dict = {}
+        trackings = self._get_trackings_by_emballage(mouvements)
 
         # Calculer les statistiques
         for mouv in mouvements:
@@ -365,9 +375,7 @@ class GecafleEmballageReportWizard(models.TransientModel):
             if mouv.emballage_id:
                 emb_key = mouv.emballage_id.id
                 if emb_key not in emballages_dict:
-                    tracking = self.env['gecafle.emballage.tracking'].search([
-                        ('emballage_id', '=', emb_key)
-                    ], limit=1)
+                    tracking = trackings.get(emb_key)
 
                     emballages_dict[emb_key] = {
                         'emballage': mouv.emballage_id.name,  # Nom string
@@ -397,6 +405,7 @@ class GecafleEmballageReportWizard(models.TransientModel):
 
         # Grouper par emballage
         emballages_dict = {}
+        trackings = self._get_trackings_by_emballage(mouvements)
         for mouv in mouvements:
             # CORRECTION : Vérifier que l'emballage existe
             if not mouv.emballage_id:
@@ -405,9 +414,7 @@ class GecafleEmballageReportWizard(models.TransientModel):
 
             emb_key = mouv.emballage_id.id
             if emb_key not in emballages_dict:
-                tracking = self.env['gecafle.emballage.tracking'].search([
-                    ('emballage_id', '=', emb_key)
-                ], limit=1)
+                tracking = trackings.get(emb_key)
 
                 emballages_dict[emb_key] = {
                     'emballage': mouv.emballage_id.name,  # Nom string au lieu de l'objet
@@ -1,6 +1,6 @@
 {
     "name": "ADI GECAFLE Receptions",
-    "version": "17.0.1.0.0",
+    "version": "17.0.1.0.3",
     "author": "ACICOPS",
     "website": "https://adicops-dz.com/",
     "license": "AGPL-3",
@@ -124,28 +124,40 @@ class GecafleReception(models.Model):
         #Regroupe les lignes de détails dans la réception en sommant la quantité de colis reçus
         #lorsque la désignation, la qualité et le type de colis sont identiques.
 
+        self.filtered('regrouper_lignes')._merge_duplicate_details_lines()
+        return True
+
+    def _merge_duplicate_details_lines(self):
+        """
+        Fusionne uniquement les lignes en doublon (désignation, qualité, type de colis).
+        La première ligne de chaque clé est conservée et sa quantité mise à jour en place,
+        les doublons sont supprimés : les ids des autres lignes restent inchangés.
+        Les lignes ayant déjà des ventes ou des destockages ne sont jamais fusionnées.
+        """
+        new_qty = {}
+        lines_to_delete = self.env['gecafle.details_reception']
         for reception in self:
-            if reception.regrouper_lignes:
-                seen = {}
-                # On stocke ici les lignes à supprimer après le regroupement.
-                lines_to_delete = self.env['gecafle.details_reception']
-                for line in reception.details_reception_ids:
-                    # La clé est composée de la désignation, de la qualité (si renseignée) et du type de colis.
-                    key = (
-                        line.designation_id.id,
-                        line.qualite_id.id if line.qualite_id else False,
-                        line.type_colis_id.id,
-                    )
-                    if key in seen:
-                        # On met à jour la quantité sur la première ligne enregistrée
-                        seen_line = seen[key]
-                        seen_line.qte_colis_recue += line.qte_colis_recue
-                        # On ajoute la ligne en doublon à la liste des lignes à supprimer
-                        lines_to_delete |= line
-                    else:
-                        seen[key] = line
-                if lines_to_delete:
-                    lines_to_delete.unlink()
+            seen = {}
+            for line in reception.details_reception_ids.sorted('id'):
+                if line.qte_colis_vendus or line.qte_colis_destockes:
+                    continue
+                key = (line.designation_id.id, line.qualite_id.id, line.type_colis_id.id)
+                if key in seen:
+                    kept = seen[key]
+                    new_qty[kept] = new_qty.get(kept, kept.qte_colis_recue) + line.qte_colis_recue
+                    lines_to_delete |= line
+                else:
+                    seen[key] = line
+        if not lines_to_delete:
+            return False
+
+        # Une écriture par quantité distincte au lieu d'une par ligne
+        lines_by_qty = {}
+        for line, qty in new_qty.items():
+            lines_by_qty[qty] = lines_by_qty.get(qty, self.env['gecafle.details_reception']) | line
+        lines_to_delete.unlink()
+        for qty, lines in lines_by_qty.items():
+            lines.write({'qte_colis_recue': qty})
         return True
 
 
@@ -173,16 +185,16 @@ class GecafleReception(models.Model):
         Fonction à appeler lors du clic sur le bouton 'Confirmer'.
         Ici, vous pouvez ajouter des validations ou d'autres logiques métier.
         """
+        # Exemple de validation : Vérifier qu'il existe au moins une ligne de réception.
+        # if not rec.details_reception_ids:
+        #     raise UserError(_("Veuillez saisir au moins un détail de réception."))
+
+        # Les réceptions sont confirmées ensemble : un seul calcul du stock pour tout le lot
+        self.state = 'confirmee'
+        self.group_details_lines()
+        self._group_and_create_emballage_details()
+        self._generate_stock_entries()
         for rec in self:
-            # Exemple de validation : Vérifier qu'il existe au moins une ligne de réception.
-            # if not rec.details_reception_ids:
-            #     raise UserError(_("Veuillez saisir au moins un détail de réception."))
-
-            #rec.group_details_lines()
-            rec.state = 'confirmee'
-            rec.group_details_lines()
-            rec._group_and_create_emballage_details()
-            rec._generate_stock_entries()
             if rec.avance_producteur > 0:
                 rec._create_advance_payment()
         return True
@@ -192,23 +204,16 @@ class GecafleReception(models.Model):
         Fonction à appeler lors du clic sur le bouton 'Annuler'.
         Vous pouvez ajouter des contrôles pour empêcher l'annulation si nécessaire.
         """
-        for rec in self:
-            for stock in rec.stock_ids:
-                stock.with_context(force_stock=True).unlink()  # Suppression des destockages associés pour chaque stock lié, en utilisant le contexte
-            rec.stock_ids.with_context(force_stock=True).unlink()
-            rec.state = 'annulee'
+        # Suppression des stocks liés (et de leurs destockages) en une seule fois, en utilisant le contexte
+        self.stock_ids.with_context(force_stock=True).unlink()
+        self.state = 'annulee'
 
         return True
 
     def action_reset_to_draft(self):
-        for rec in self:
-            # Suppression des destockages associés pour chaque stock lié, en utilisant le contexte
-            for stock in rec.stock_ids:
-                stock.with_context(force_stock=True).unlink()  #
-            rec.stock_ids.with_context(force_stock=True).unlink()
-            rec.write({'state': 'brouillon'})
-
-            rec.state = 'brouillon'
+        # Suppression des stocks liés (et de leurs destockages) en une seule fois, en utilisant le contexte
+        self.stock_ids.with_context(force_stock=True).unlink()
+        self.write({'state': 'brouillon'})
         return True
 
     details_reception_ids = fields.One2many(
@@ -247,60 +252,94 @@ class GecafleReception(models.Model):
         """
         Génère les entrées de stock à partir des lignes de réception.
         Prend en compte les ventes déjà réalisées sur les réceptions en brouillon.
+        Fonctionne sur plusieurs réceptions à la fois : les quantités disponibles
+        sont regroupées en SQL puis seules les entrées de stock modifiées sont
+        créées, mises à jour ou supprimées.
         """
-        for rec in self:
-            # Verrouillage des lignes de réception
-            if rec.details_reception_ids:
-                self.env.cr.execute("""
-                            SELECT id FROM gecafle_details_reception 
-                            WHERE reception_id = %s 
-                            FOR UPDATE
-                        """, (rec.id,))
-
-            # Suppression des anciennes entrées de stock pour cette réception
-            rec.stock_ids.with_context(force_stock=True).unlink()
-
-
-            # Vérifier d'abord que toutes les quantités reçues sont cohérentes avec les ventes
-            for line in rec.details_reception_ids:
-                if line.qte_colis_recue < (line.qte_colis_vendus + line.qte_colis_destockes):
-                    raise UserError(_(
-                        "La quantité reçue (%s) ne peut pas être inférieure à la somme des quantités "
-                        "déjà vendues (%s) et destockées (%s) pour le produit %s"
-                    ) % (
-                                        line.qte_colis_recue,
-                                        line.qte_colis_vendus,
-                                        line.qte_colis_destockes,
-                                        line.designation_id.name
-                                    ))
-
-            grouped = {}
-            # Parcourir les lignes de réception
-            for line in rec.details_reception_ids:
-                # Calculer la quantité disponible pour le stock
-                qte_disponible = line.qte_colis_recue - line.qte_colis_vendus - line.qte_colis_destockes
-
-                # Ne créer de stock que si la quantité disponible est positive
-                if qte_disponible > 0:
-                    # Clé de regroupement : produit, qualité et emballage
-                    key = (
-                        line.designation_id.id,
-                        line.qualite_id.id if line.qualite_id else False,
-                        line.type_colis_id.id
-                    )
-                    grouped.setdefault(key, 0)
-                    grouped[key] += qte_disponible
+        if not self.ids:
+            return True
+        DetailsReception = self.env['gecafle.details_reception']
+        Stock = self.env['gecafle.stock'].with_context(force_stock=True)
+        DetailsReception.flush_model([
+            'reception_id', 'designation_id', 'qualite_id', 'type_colis_id',
+            'qte_colis_recue', 'qte_colis_vendus', 'qte_colis_destockes',
+        ])
+        Stock.flush_model(['reception_id', 'designation_id', 'qualite_id', 'emballage_id', 'qte_disponible'])
+
+        # Verrouillage des lignes de réception
+        self.env.cr.execute("""
+            SELECT id FROM gecafle_details_reception
+            WHERE reception_id IN %s
+            FOR UPDATE
+        """, (tuple(self.ids),))
+
+        # Vérifier d'abord que toutes les quantités reçues sont cohérentes avec les ventes
+        self.env.cr.execute("""
+            SELECT id FROM gecafle_details_reception
+            WHERE reception_id IN %s
+              AND qte_colis_recue < COALESCE(qte_colis_vendus, 0) + COALESCE(qte_colis_destockes, 0)
+            ORDER BY id
+            LIMIT 1
+        """, (tuple(self.ids),))
+        row = self.env.cr.fetchone()
+        if row:
+            line = DetailsReception.browse(row[0])
+            raise UserError(_(
+                "La quantité reçue (%s) ne peut pas être inférieure à la somme des quantités "
+                "déjà vendues (%s) et destockées (%s) pour le produit %s"
+            ) % (
+                                line.qte_colis_recue,
+                                line.qte_colis_vendus,
+                                line.qte_colis_destockes,
+                                line.designation_id.name
+                            ))
+
+        # Quantités disponibles par réception, produit, qualité et emballage
+        self.env.cr.execute("""
+            SELECT reception_id, designation_id, qualite_id, type_colis_id,
+                   SUM(qte_colis_recue - COALESCE(qte_colis_vendus, 0) - COALESCE(qte_colis_destockes, 0))
+            FROM gecafle_details_reception
+            WHERE reception_id IN %s
+              AND qte_colis_recue - COALESCE(qte_colis_vendus, 0) - COALESCE(qte_colis_destockes, 0) > 0
+            GROUP BY reception_id, designation_id, qualite_id, type_colis_id
+        """, (tuple(self.ids),))
+        grouped = {
+            (reception_id, designation_id, qualite_id or False, emballage_id): qte
+            for reception_id, designation_id, qualite_id, emballage_id, qte in self.env.cr.fetchall()
+        }
 
-            # Création d'une entrée de stock par groupe
-            for key, qte in grouped.items():
-                designation_id, qualite_id, emballage_id = key
-                self.env['gecafle.stock'].with_context(force_stock=True).create({
-                    'reception_id': rec.id,
-                    'designation_id': designation_id,
-                    'qualite_id': qualite_id,
-                    'emballage_id': emballage_id,
-                    'qte_disponible': qte,
-                })
+        # Entrées de stock existantes : on garde la première de chaque groupe
+        self.env.cr.execute("""
+            SELECT id, reception_id, designation_id, qualite_id, emballage_id, qte_disponible
+            FROM gecafle_stock
+            WHERE reception_id IN %s
+            ORDER BY id
+        """, (tuple(self.ids),))
+        stocks_to_delete = []
+        stocks_by_qty = {}
+        for stock_id, reception_id, designation_id, qualite_id, emballage_id, qte in self.env.cr.fetchall():
+            key = (reception_id, designation_id, qualite_id or False, emballage_id)
+            if key not in grouped:
+                stocks_to_delete.append(stock_id)
+                continue
+            new_qte = grouped.pop(key)
+            if new_qte != qte:
+                stocks_by_qty.setdefault(new_qte, []).append(stock_id)
+
+        if stocks_to_delete:
+            Stock.browse(stocks_to_delete).unlink()
+        for qte, stock_ids in stocks_by_qty.items():
+            Stock.browse(stock_ids).write({'qte_disponible': qte})
+        # Les clés restantes n'ont pas encore d'entrée de stock
+        if grouped:
+            Stock.create([{
+                'reception_id': reception_id,
+                'designation_id': designation_id,
+                'qualite_id': qualite_id,
+                'emballage_id': emballage_id,
+                'qte_disponible': qte,
+            } for (reception_id, designation_id, qualite_id, emballage_id), qte in grouped.items()])
+        return True
 
 
 
@@ -308,8 +347,12 @@ class GecafleReception(models.Model):
 
     def write(self, vals):
         res = super(GecafleReception, self).write(vals)
-        self.group_details_lines()
-        self._group_and_create_emballage_details()
+        # Le regroupement ne concerne que les lignes : inutile de le relancer
+        # lorsque seuls l'entête, les notes ou les paiements sont modifiés.
+        if 'details_reception_ids' in vals or 'regrouper_lignes' in vals:
+            self.group_details_lines()
+        if 'details_reception_ids' in vals or 'details_emballage_reception_ids' in vals:
+            self._group_and_create_emballage_details()
         return res
 
     def _group_details_lines(self):
@@ -317,23 +360,7 @@ class GecafleReception(models.Model):
         # Regroupe les lignes de détails en sommant la quantité de colis reçus
         # lorsque la désignation, la qualité et le type de colis sont identiques.
 
-        grouped_lines = {}
-        for line in self.details_reception_ids:
-            key = (line.designation_id.id, line.qualite_id.id, line.type_colis_id.id)
-            if key in grouped_lines:
-                grouped_lines[key].qte_colis_recue += line.qte_colis_recue
-            else:
-                grouped_lines[key] = line
-
-        # Remplacer les lignes par les lignes regroupées
-        self.details_reception_ids = [(5, 0, 0)]  # Supprime toutes les lignes existantes
-        self.details_reception_ids = [(0, 0, {
-            'designation_id': line.designation_id.id,
-            'qualite_id': line.qualite_id.id,
-            'type_colis_id': line.type_colis_id.id,
-            'qte_colis_recue': line.qte_colis_recue,
-            # Ajoutez d'autres champs si nécessaire
-        }) for line in grouped_lines.values()]
+        self._merge_duplicate_details_lines()
 
     def _group_and_create_emballage_details(self):
         for rec in self:
@@ -748,17 +775,16 @@ class GecafleDetailsReception(models.Model):
     # enlecer
     @api.depends('reception_id.details_reception_ids')
     def _compute_num_seq(self):
+        # Numérotation calculée une seule fois par réception : les lignes sœurs
+        # sont triées une fois puis chaque ligne lit son rang dans un dictionnaire.
+        ranks = {}
+        for reception in self.reception_id:
+            details = reception.details_reception_ids.sorted(
+                key=lambda r: (r.create_date if r.create_date else datetime.min, r.id or 0)
+            )
+            ranks.update({line: index for index, line in enumerate(details, start=1)})
         for rec in self:
-            if rec.reception_id:
-                details = rec.reception_id.details_reception_ids.sorted(
-                    key=lambda r: (r.create_date if r.create_date else datetime.min, r.id or 0)
-                )
-                for index, line in enumerate(details, start=1):
-                    if line == rec:
-                        rec.num_seq = index
-                        break
-            else:
-                rec.num_seq = 0
+            rec.num_seq = ranks.get(rec, 0)
 
 
 
@@ -85,11 +85,11 @@ class GecafleStock(models.Model):
         for stock in self:
             stock.qte_destockee = sum(stock.destockage_ids.mapped('qte_destockee'))
 
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         if not self.env.context.get('force_stock'):
             raise ValidationError(_("La création manuelle du stock est interdite, il est généré automatiquement."))
-        return super(GecafleStock, self).create(vals)
+        return super(GecafleStock, self).create(vals_list)
 
     def write(self, vals):
         if not self.env.context.get('force_stock'):
@@ -1,6 +1,6 @@
 {
     'name': "GECAFLE - Reset des Données",
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'author': 'ADICOPS',
     'website': 'https://adicops-dz.com/',
     'category': 'Tools',
@@ -14,6 +14,10 @@
         - Conserver les données de base (produits, clients, producteurs, etc.)
         - Réinitialiser tous les compteurs à leur valeur initiale
 
+        L'ordre de purge est calculé à partir des clés étrangères du schéma :
+        les tables sans référence conservée sont vidées par un seul TRUNCATE,
+        les autres sont supprimées par lots.
+
         ATTENTION : Cette opération est IRRÉVERSIBLE !
         Seuls les administrateurs système peuvent utiliser cette fonctionnalité.
     """,
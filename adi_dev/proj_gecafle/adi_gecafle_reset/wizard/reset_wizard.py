@@ -1,9 +1,31 @@
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, AccessError
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Nombre de lignes supprimées par requête lorsque TRUNCATE n'est pas possible
+PURGE_BATCH_SIZE = 10000
+
+# Plafond du comptage de secours pour les tables jamais analysées
+COUNT_FALLBACK_LIMIT = 100000
+
+# Modèles dont le volume est affiché dans l'assistant
+INFO_MODELS = {
+    'info_ventes': ['gecafle.vente'],
+    'info_receptions': ['gecafle.reception'],
+    'info_emballages': ['gecafle.emballage.mouvement'],
+    'info_factures': ['account.move'],
+    'info_paiements': ['account.payment'],
+    'info_tresorerie': [
+        'treasury.cash.operation', 'treasury.safe.operation',
+        'treasury.transfer', 'treasury.cash.closing',
+    ],
+    'info_rh': ['attendance.daily', 'employee.advance', 'employee.loan', 'payroll.slip'],
+}
+
 
 class GecafleResetWizard(models.TransientModel):
     _name = 'gecafle.reset.wizard'
@@ -65,45 +87,51 @@ class GecafleResetWizard(models.TransientModel):
         help="Supprime pointages, acomptes, prêts et fiches de paie"
     )
 
-    # Champs informatifs
+    # Champs informatifs (estimations issues des statistiques PostgreSQL)
     info_ventes = fields.Integer(string='Ventes', compute='_compute_counts')
     info_receptions = fields.Integer(string='Réceptions', compute='_compute_counts')
     info_emballages = fields.Integer(string='Mouvements emballages', compute='_compute_counts')
-    info_factures = fields.Integer(string='Factures/Avoirs', compute='_compute_counts')
+    info_factures = fields.Integer(string='Écritures comptables', compute='_compute_counts')
     info_paiements = fields.Integer(string='Paiements', compute='_compute_counts')
     info_tresorerie = fields.Integer(string='Opérations trésorerie', compute='_compute_counts')
     info_rh = fields.Integer(string='Opérations RH/Paie', compute='_compute_counts')
 
     @api.depends('reset_ventes', 'reset_receptions', 'reset_comptabilite', 'reset_emballages', 'reset_tresorerie')
     def _compute_counts(self):
+        tables_by_field = {
+            field_name: [self.env[model_name]._table for model_name in model_names if model_name in self.env]
+            for field_name, model_names in INFO_MODELS.items()
+        }
+        estimates = self._get_row_estimates({t for tables in tables_by_field.values() for t in tables})
         for record in self:
-            record.info_ventes = self._safe_count('gecafle.vente')
-            record.info_receptions = self._safe_count('gecafle.reception')
-            record.info_emballages = self._safe_count('gecafle.emballage.mouvement')
-            record.info_factures = self._safe_count('account.move', [('move_type', 'in', ['out_invoice', 'out_refund', 'in_invoice', 'in_refund'])])
-            record.info_paiements = self._safe_count('account.payment')
-            record.info_tresorerie = (
-                self._safe_count('treasury.cash.operation') +
-                self._safe_count('treasury.safe.operation') +
-                self._safe_count('treasury.transfer') +
-                self._safe_count('treasury.cash.closing')
-            )
-            record.info_rh = (
-                self._safe_count('attendance.daily') +
-                self._safe_count('employee.advance') +
-                self._safe_count('employee.loan') +
-                self._safe_count('payroll.slip')
-            )
+            for field_name, tables in tables_by_field.items():
+                record[field_name] = sum(estimates.get(table, 0) for table in tables)
 
-    def _safe_count(self, model_name, domain=None):
-        """Compte les enregistrements d'un modèle de manière sécurisée."""
-        try:
-            model = self.env.get(model_name)
-            if model is None:
-                return 0
-            return model.sudo().search_count(domain or [])
-        except Exception:
-            return 0
+    def _get_row_estimates(self, tables):
+        """
+        Retourne {table: nombre de lignes estimé} pour les tables existantes.
+        Les vues SQL et les tables absentes ne sont pas retournées.
+        L'estimation vient de pg_class.reltuples (aucun parcours de table) ;
+        une table jamais analysée est comptée avec un plafond.
+        """
+        if not tables:
+            return {}
+        self.env.cr.execute("""
+            SELECT c.relname, c.reltuples::bigint
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = current_schema()
+              AND c.relkind IN ('r', 'p')
+              AND c.relname IN %s
+        """, (tuple(tables),))
+        estimates = dict(self.env.cr.fetchall())
+        for table, estimate in estimates.items():
+            if estimate < 0:
+                self.env.cr.execute(
+                    f'SELECT COUNT(*) FROM (SELECT 1 FROM "{table}" LIMIT %s) sub',
+                    (COUNT_FALLBACK_LIMIT,))
+                estimates[table] = self.env.cr.fetchone()[0]
+        return estimates
 
     def _check_admin_access(self):
         """Vérifie que l'utilisateur est administrateur système."""
@@ -112,8 +140,8 @@ class GecafleResetWizard(models.TransientModel):
 
     def _get_tables_to_purge(self):
         """
-        Retourne la liste des tables à purger dans l'ordre correct.
-        IMPORTANT: Les tables enfants DOIVENT être avant les tables parents.
+        Retourne les tables à purger selon les options cochées.
+        L'ordre de suppression est calculé à partir du schéma (_plan_purge).
         """
         tables = []
 
@@ -183,7 +211,8 @@ class GecafleResetWizard(models.TransientModel):
         # EMBALLAGES - Ordre: mouvements (réf tracking) → balances → tracking → consignes
         if self.reset_emballages:
             tables.extend([
-                'gecafle_emballage_mouvement',  # Doit être EN PREMIER (référence tracking)
+                'gecafle_emballage_mouvement',
+                'gecafle_emballage_balance_ledger',
                 'gecafle_emballage_balance_client',
                 'gecafle_emballage_balance_producteur',
                 'gecafle_emballage_tracking',
@@ -217,6 +246,121 @@ class GecafleResetWizard(models.TransientModel):
 
         return tables
 
+    def _get_foreign_keys(self):
+        """
+        Retourne {table parente: [(table enfant, colonne, action ON DELETE, nullable)]}
+        pour toutes les clés étrangères du schéma.
+        """
+        self.env.cr.execute("""
+            SELECT parent.relname, child.relname, a.attname, c.confdeltype,
+                   NOT a.attnotnull OR array_length(c.conkey, 1) > 1
+            FROM pg_constraint c
+            JOIN pg_class child ON child.oid = c.conrelid
+            JOIN pg_class parent ON parent.oid = c.confrelid
+            JOIN pg_namespace n ON n.oid = child.relnamespace
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f'
+              AND n.nspname = current_schema()
+              AND c.conrelid != c.confrelid
+        """)
+        referencing = defaultdict(list)
+        for parent, child, column, on_delete, nullable in self.env.cr.fetchall():
+            referencing[parent].append((child, column, on_delete, nullable))
+        return referencing
+
+    def _is_wiped_by_purge(self, table, column, on_delete, nullable):
+        """
+        Indique si une table hors sélection, qui référence une table purgée,
+        serait de toute façon entièrement vidée par la purge : elle est vide,
+        ou chacune de ses lignes serait supprimée par ON DELETE CASCADE.
+        """
+        if on_delete == 'c' and not nullable:
+            return True
+        self.env.cr.execute(f'SELECT EXISTS (SELECT 1 FROM "{table}")')
+        return not self.env.cr.fetchone()[0]
+
+    def _plan_purge(self, tables):
+        """
+        Calcule le plan de purge à partir des clés étrangères du schéma.
+
+        Retourne (tables_truncate, tables_delete) :
+        - tables_truncate : ensemble fermé (aucune table conservée ne les
+          référence) vidé par un seul TRUNCATE, sans WAL ligne à ligne ;
+          y sont ajoutées les tables hors sélection qui seraient de toute
+          façon vidées (vides, ou supprimées en cascade) ;
+        - tables_delete : tables référencées par des données conservées,
+          supprimées par lots, tables enfants avant tables parentes, pour
+          que les actions ON DELETE s'appliquent ligne par ligne.
+        """
+        referencing = self._get_foreign_keys()
+        purge = set(tables)
+        truncate = set(tables)
+        blocked = set()
+        wiped = {}
+
+        changed = True
+        while changed:
+            changed = False
+            for parent in sorted(truncate):
+                if parent not in truncate:
+                    continue
+                for child, column, on_delete, nullable in referencing[parent]:
+                    if child in truncate:
+                        continue
+                    if child not in purge and child not in blocked:
+                        key = (child, column)
+                        if key not in wiped:
+                            wiped[key] = self._is_wiped_by_purge(child, column, on_delete, nullable)
+                        if wiped[key]:
+                            truncate.add(child)
+                            changed = True
+                            continue
+                    # Des lignes conservées référencent cette table : DELETE obligatoire
+                    truncate.discard(parent)
+                    blocked.add(parent)
+                    changed = True
+                    break
+
+        # Tables enfants avant tables parentes (parcours en profondeur)
+        to_delete = purge - truncate
+        ordered, visited = [], set()
+
+        def visit(table):
+            visited.add(table)
+            for child, _column, _on_delete, _nullable in referencing[table]:
+                if child in to_delete and child not in visited:
+                    visit(child)
+            ordered.append(table)
+
+        for table in sorted(to_delete):
+            if table not in visited:
+                visit(table)
+
+        return sorted(truncate), ordered
+
+    def _delete_in_batches(self, table_name, estimate):
+        """Supprime toutes les lignes d'une table par lots, avec suivi de progression."""
+        deleted = 0
+        while True:
+            self.env.cr.execute(
+                f'DELETE FROM "{table_name}" '
+                f'WHERE ctid = ANY(ARRAY(SELECT ctid FROM "{table_name}" LIMIT %s))',
+                (PURGE_BATCH_SIZE,))
+            count = self.env.cr.rowcount
+            deleted += count
+            if count:
+                total = max(estimate, deleted)
+                _logger.info(f"Purge {table_name} : {deleted}/{total} ({deleted * 100 // total}%)")
+            if count < PURGE_BATCH_SIZE:
+                return deleted
+
+    def _reset_id_sequences(self, tables):
+        """Remet à 1 les séquences d'identifiants des tables vidées par DELETE."""
+        for table_name in tables:
+            self.env.cr.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), 1, false)",
+                (f'"{table_name}"',))
+
     def _table_exists(self, table_name):
         """Vérifie si une table existe (pas une vue)."""
         self.env.cr.execute("""
@@ -229,16 +373,6 @@ class GecafleResetWizard(models.TransientModel):
         """, (table_name,))
         return self.env.cr.fetchone()[0]
 
-    def _is_view(self, table_name):
-        """Vérifie si c'est une vue SQL."""
-        self.env.cr.execute("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.views
-                WHERE table_schema = 'public' AND table_name = %s
-            )
-        """, (table_name,))
-        return self.env.cr.fetchone()[0]
-
     def _reset_counters(self):
         """Réinitialise tous les compteurs."""
         company = self.env.company.sudo()
@@ -270,6 +404,7 @@ class GecafleResetWizard(models.TransientModel):
             ('code', 'like', 'employee.%'),
         ])
         sequences.write({'number_next': 1})
+        sequences.date_range_ids.write({'number_next': 1})
 
         _logger.info("Tous les compteurs réinitialisés")
 
@@ -306,33 +441,39 @@ class GecafleResetWizard(models.TransientModel):
         _logger.info(f"Utilisateur: {self.env.user.name}")
         _logger.info("=" * 60)
 
-        tables_to_purge = self._get_tables_to_purge()
+        # Tables existantes uniquement (les vues SQL se vident d'elles-mêmes)
+        estimates = self._get_row_estimates(self._get_tables_to_purge())
         total_deleted = 0
         tables_purged = []
 
         # TRANSACTION ATOMIQUE - Tout ou rien
         try:
-            for table_name in tables_to_purge:
-                # Ignorer les vues SQL (elles se vident automatiquement)
-                if self._is_view(table_name):
-                    _logger.info(f"Vue SQL {table_name} - ignorée (sera vide automatiquement)")
-                    continue
-
-                if not self._table_exists(table_name):
-                    _logger.info(f"Table {table_name} n'existe pas - ignorée")
-                    continue
-
-                # Compter avant suppression
-                self.env.cr.execute(f'SELECT COUNT(*) FROM "{table_name}"')
-                count = self.env.cr.fetchone()[0]
+            self.env.flush_all()
+            tables_truncate, tables_delete = self._plan_purge(list(estimates))
+
+            if tables_truncate:
+                restart = ' RESTART IDENTITY' if self.reset_counters else ''
+                self.env.cr.execute(
+                    'TRUNCATE TABLE ' + ', '.join(f'"{t}"' for t in tables_truncate) + restart)
+                for table_name in tables_truncate:
+                    count = estimates.get(table_name, 0)
+                    total_deleted += count
+                    if count:
+                        tables_purged.append(f"{table_name}: ~{count}")
+                _logger.info(f"TRUNCATE de {len(tables_truncate)} tables : {', '.join(tables_truncate)}")
 
+            for table_name in tables_delete:
+                count = self._delete_in_batches(table_name, estimates.get(table_name, 0))
                 if count > 0:
-                    # Supprimer
-                    self.env.cr.execute(f'DELETE FROM "{table_name}"')
                     total_deleted += count
                     tables_purged.append(f"{table_name}: {count}")
                     _logger.info(f"Purgé {count} de {table_name}")
 
+            if self.reset_counters:
+                self._reset_id_sequences(tables_delete)
+
+            self.env.invalidate_all()
+
             # Réinitialiser les compteurs
             if self.reset_counters:
                 self._reset_counters()
@@ -357,7 +498,7 @@ class GecafleResetWizard(models.TransientModel):
             ) % str(e))
 
         # Message de succès
-        message = _("Réinitialisation réussie !\n\nTotal supprimé : %s enregistrements") % total_deleted
+        message = _("Réinitialisation réussie !\n\nTotal supprimé : environ %s enregistrements") % total_deleted
 
         if self.reset_counters:
             message += _("\n\nCompteurs réinitialisés à 00000001")
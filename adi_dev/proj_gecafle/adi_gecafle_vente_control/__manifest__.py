@@ -1,7 +1,7 @@
 # __manifest__.py
 {
     'name': 'ADI GECAFLE - Contrôle des Ventes',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.0.2',
     'category': 'Sales',
     'summary': 'Contrôle avancé des ventes et protection des factures',
     'description': """
@@ -85,9 +85,7 @@ class GecafleReceptionRecapControl(models.Model):
 
         # Régénérer les lignes si nécessaire
         if not self.recap_line_ids:
-            self.generate_recap_lines()
-            self.generate_original_lines()
-            self.generate_sale_lines()
+            self.generate_lines(force=True)
 
         # Message de traçabilité
         self.message_post(
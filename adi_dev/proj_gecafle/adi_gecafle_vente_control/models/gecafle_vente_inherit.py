@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 import logging
@@ -21,15 +23,25 @@ class GecafleVenteControl(models.Model):
     # ============================================
     reception_recap_ids = fields.Many2many(
         'gecafle.reception.recap',
+        'gecafle_vente_reception_recap_rel',
+        'vente_id',
+        'recap_id',
         string="Bordereaux des réceptions",
         compute='_compute_reception_recap_ids',
-        store=False
+        store=True
     )
 
     reception_recap_count = fields.Integer(
         string="Nombre de bordereaux",
         compute='_compute_reception_recap_ids',
-        store=False
+        store=True
+    )
+
+    # Lignes de bordereaux producteur reprenant cette vente
+    recap_sale_line_ids = fields.One2many(
+        'gecafle.reception.recap.sale',
+        'vente_id',
+        string="Lignes de bordereaux"
     )
 
     # Réceptions uniques utilisées dans cette vente
@@ -54,23 +66,25 @@ class GecafleVenteControl(models.Model):
             vente.vente_reception_ids = reception_ids
             vente.vente_reception_count = len(reception_ids)
 
-    @api.depends('detail_vente_ids.reception_id')
+    @api.depends('detail_vente_ids.reception_id.recap_ids')
     def _compute_reception_recap_ids(self):
         """Calcule les bordereaux (récapitulatifs) liés aux réceptions de cette vente"""
+        # Les bordereaux de toutes les réceptions du lot sont lus en une fois
+        self.detail_vente_ids.reception_id.recap_ids
         for vente in self:
-            # Récupérer toutes les réceptions uniques de cette vente
-            reception_ids = vente.detail_vente_ids.mapped('reception_id.id')
-
-            if reception_ids:
-                # Chercher les récapitulatifs liés à ces réceptions
-                recaps = self.env['gecafle.reception.recap'].search([
-                    ('reception_id', 'in', reception_ids)
-                ])
-                vente.reception_recap_ids = recaps
-                vente.reception_recap_count = len(recaps)
-            else:
-                vente.reception_recap_ids = False
-                vente.reception_recap_count = 0
+            recaps = vente.detail_vente_ids.reception_id.recap_ids
+            vente.reception_recap_ids = recaps
+            vente.reception_recap_count = len(recaps)
+
+    def _get_recaps_by_vente(self):
+        """Retourne {vente_id: bordereaux reprenant ses lignes}, en une requête"""
+        recaps_by_vente = defaultdict(lambda: self.env['gecafle.reception.recap'])
+        vente_ids = [vente_id for vente_id in self._origin.ids if vente_id]
+        if vente_ids:
+            for vente, recap in self.env['gecafle.reception.recap.sale']._read_group(
+                    [('vente_id', 'in', vente_ids)], ['vente_id', 'recap_id']):
+                recaps_by_vente[vente.id] |= recap
+        return recaps_by_vente
 
     def action_view_reception_recaps(self):
         """Ouvre la liste des bordereaux des réceptions liées à cette vente"""
@@ -148,14 +162,16 @@ class GecafleVenteControl(models.Model):
     has_recap_lines = fields.Boolean(
         string="A des lignes dans récap",
         compute='_compute_has_recap_lines',
-        store=True
+        store=True,
+        index=True
     )
 
     # NOUVEAU : Champ pour vérifier les avoirs
     has_avoirs = fields.Boolean(
         string="A des avoirs",
         compute='_compute_has_avoirs',
-        store=True
+        store=True,
+        index=True
     )
 
     avoir_count = fields.Integer(
@@ -171,37 +187,24 @@ class GecafleVenteControl(models.Model):
         currency_field='currency_id'
     )
 
-    @api.depends('avoir_ids')
+    @api.depends('avoir_ids.state', 'avoir_ids.montant_avoir')
     def _compute_has_avoirs(self):
         """Vérifie si la vente a des avoirs"""
         for vente in self:
-            # Rechercher les avoirs liés à cette vente
-            avoirs = self.env['gecafle.avoir.client'].search([
-                ('vente_id', '=', vente.id),
-                ('state', '!=', 'annule')  # Ignorer les avoirs annulés
-            ])
+            # Ignorer les avoirs annulés
+            avoirs = vente.avoir_ids.filtered(lambda a: a.state != 'annule')
 
             vente.has_avoirs = bool(avoirs)
             vente.avoir_count = len(avoirs)
             vente.avoir_total_amount = sum(avoirs.mapped('montant_avoir'))
 
-    @api.depends('detail_vente_ids')
+    @api.depends('recap_sale_line_ids.recap_id.state')
     def _compute_has_recap_lines(self):
         """Vérifie si des lignes de vente sont dans une récap producteur"""
+        recaps_by_vente = self._get_recaps_by_vente()
         for vente in self:
-            # CORRECTION : Recherche basée sur les ventes liées aux lignes
-            has_lines = False
-
-            # Méthode 1 : Chercher via les récaps existants
-            recaps = self.env['gecafle.reception.recap'].search([
-                ('sale_line_ids.vente_id', '=', vente.id),
-                ('state', '!=', 'annule')
-            ])
-
-            if recaps:
-                has_lines = True
-
-            vente.has_recap_lines = has_lines
+            recaps = recaps_by_vente[vente._origin.id]
+            vente.has_recap_lines = any(recap.state != 'annule' for recap in recaps)
 
     @api.depends('state', 'has_recap_lines', 'invoice_id', 'has_avoirs', 'reception_recap_count')
     def _compute_can_reset(self):
@@ -222,10 +225,7 @@ class GecafleVenteControl(models.Model):
             # NOUVEAU : Vérification des avoirs
             if self.has_avoirs:
                 avoir_details = []
-                avoirs = self.env['gecafle.avoir.client'].search([
-                    ('vente_id', '=', self.id),
-                    ('state', '!=', 'annule')
-                ])
+                avoirs = self.avoir_ids.filtered(lambda a: a.state != 'annule')
 
                 for avoir in avoirs:
                     avoir_details.append(
@@ -307,15 +307,17 @@ class GecafleVenteControl(models.Model):
     can_edit_price = fields.Boolean(
         string="Peut modifier le prix",
         compute='_compute_can_edit_price',
+        store=True,
         help="Indique si le prix des lignes peut être modifié directement"
     )
 
     has_vendor_invoice_on_recap = fields.Boolean(
         string="A une facture fournisseur sur récap",
         compute='_compute_can_edit_price',
+        store=True
     )
 
-    @api.depends('state', 'invoice_id', 'invoice_id.payment_state', 'reception_recap_ids.invoice_id')
+    @api.depends('state', 'invoice_id', 'invoice_id.payment_state', 'recap_sale_line_ids.recap_id.invoice_id')
     def _compute_can_edit_price(self):
         """
         Détermine si le prix peut être modifié directement.
@@ -325,6 +327,7 @@ class GecafleVenteControl(models.Model):
         2. Facture sans paiement (payment_state == 'not_paid')
         3. Pas de facture fournisseur sur les récaps liées
         """
+        recaps_by_vente = self._get_recaps_by_vente()
         for vente in self:
             can_edit = False
             has_vendor_invoice = False
@@ -332,18 +335,9 @@ class GecafleVenteControl(models.Model):
             if vente.state == 'valide' and vente.invoice_id:
                 # Vérifier si facture non payée
                 if vente.invoice_id.payment_state == 'not_paid':
-                    can_edit = True
-
                     # Vérifier les récaps liées
-                    recaps = self.env['gecafle.reception.recap'].search([
-                        ('sale_line_ids.vente_id', '=', vente.id)
-                    ])
-
-                    for recap in recaps:
-                        if recap.invoice_id:
-                            can_edit = False
-                            has_vendor_invoice = True
-                            break
+                    has_vendor_invoice = any(recap.invoice_id for recap in recaps_by_vente[vente._origin.id])
+                    can_edit = not has_vendor_invoice
 
             elif vente.state == 'brouillon':
                 # Toujours éditable en brouillon
@@ -563,11 +557,7 @@ class GecafleVenteControl(models.Model):
             ) % (self.invoice_id.name, self.invoice_id.payment_state)
 
         # Vérifier les récaps liées
-        recaps = self.env['gecafle.reception.recap'].search([
-            ('sale_line_ids.vente_id', '=', self.id)
-        ])
-
-        for recap in recaps:
+        for recap in self.recap_sale_line_ids.recap_id:
             if recap.invoice_id:
                 return False, _(
                     "Impossible de modifier le prix : le bordereau %s a une facture fournisseur (%s).\n"
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'ADI GECAFLE - Automatisation Facturation Vente',
-    'version': '17.0.1.0.2',
+    'version': '17.0.1.1.0',
     'category': 'Sales/Accounting',
     'summary': 'Automatisation de la création des factures avec comptabilisation directe',
     'description': """
@@ -12,6 +12,8 @@
         - Paramètre société pour activer la comptabilisation automatique
         - Gestion intelligente des erreurs avec fallback en mode brouillon
         - Logs détaillés des opérations
+        - File de facturation : création, comptabilisation et envoi par lots
+          en arrière-plan, sans bloquer la validation des ventes
     """,
     'author': 'ADICOPS',
     'website': 'https://adicops-dz.com',
@@ -23,8 +25,9 @@
     ],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/res_company_views.xml',
-        #'views/gecafle_vente_views.xml',
+        'views/gecafle_vente_views.xml',
     ],
     'installable': True,
     'auto_install': False,
@@ -2,9 +2,13 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 import logging
+import threading
 
 _logger = logging.getLogger(__name__)
 
+INVOICE_QUEUE_CRON = 'adi_gecafle_vente_invoice_automation.ir_cron_process_invoice_queue'
+INVOICE_QUEUE_BATCH_SIZE = 50
+
 
 class GecafleVente(models.Model):
     _inherit = 'gecafle.vente'
@@ -15,7 +19,7 @@ class GecafleVente(models.Model):
         ('success', 'Succès'),
         ('draft_fallback', 'Créée en brouillon (erreur)'),
         ('failed', 'Échec')
-    ], string="Statut automatisation facture", readonly=True, copy=False)
+    ], string="Statut automatisation facture", readonly=True, copy=False, index=True)
 
     invoice_automation_error = fields.Text(
         string="Erreur d'automatisation",
@@ -31,95 +35,221 @@ class GecafleVente(models.Model):
     )
 
     def action_confirm(self):
-        """Surcharge pour gérer l'automatisation des factures"""
-        _logger.info("=== DÉBUT action_confirm du module automatisation ===")
-
-        for vente in self:
-            if vente.state == 'brouillon':
-                _logger.info(f"Traitement de la vente {vente.name}")
-
-                # IMPORTANT : Utiliser le contexte pour permettre les modifications
-                vente_with_context = vente.with_context(allow_adjustment=True)
-
-                # 1. Appeler le super qui va créer la facture via le module vente_invoices
-                res = super(GecafleVente, vente_with_context).action_confirm()
-
-                # 2. Si une facture a été créée, gérer la comptabilisation automatique
-                if vente.invoice_ids:
-                    invoice = vente.invoice_ids[0]
-                    _logger.info(f"Facture {invoice.name} trouvée pour la vente {vente.name}")
-
-                    # Vérifier si on doit comptabiliser automatiquement
-                    if vente.company_id.sudo().auto_post_sales_invoices:
-                        if invoice.state == 'draft':
-                            _logger.info(f"Tentative de comptabilisation automatique pour {invoice.name}")
-                            try:
-                                invoice.action_post()
-
-                                # Marquer le succès avec contexte
-                                vente_with_context.write({
-                                    'invoice_automation_status': 'success',
-                                    'invoice_auto_posted': True,
-                                    'invoice_automation_error': False
-                                })
-
-                                # Logger le succès dans le chatter
-                                vente.message_post(
-                                    body=_("✅ Facture %s créée et comptabilisée automatiquement.") % invoice.name,
-                                    message_type='notification'
-                                )
-
-                                _logger.info(f"Facture {invoice.name} comptabilisée avec succès")
-
-                            except (UserError, ValidationError, Exception) as e:
-                                error_msg = str(e)
-                                _logger.warning(f"⚠️ Erreur lors de la comptabilisation de {invoice.name}: {error_msg}")
-
-                                # Si l'option de retry en brouillon est activée
-                                if vente.company_id.sudo().invoice_auto_validation_retry:
-                                    # La facture reste en brouillon
-                                    vente_with_context.write({
-                                        'invoice_automation_status': 'draft_fallback',
-                                        'invoice_auto_posted': False,
-                                        'invoice_automation_error': error_msg
-                                    })
-
-                                    # Logger l'erreur dans le chatter si configuré
-                                    if vente.company_id.sudo().invoice_auto_log_errors:
-                                        vente.message_post(
-                                            body=_(
-                                                "⚠️ La facture %s a été créée en brouillon car la comptabilisation "
-                                                "automatique a échoué.\n\nErreur: %s\n\n"
-                                                "Veuillez vérifier et valider manuellement la facture."
-                                            ) % (invoice.name, error_msg),
-                                            message_type='warning'
-                                        )
-                                else:
-                                    # Lever l'erreur si pas de fallback
-                                    raise
-                        elif invoice.state == 'posted':
-                            # La facture est déjà comptabilisée (par le module vente_invoices)
-                            _logger.info(f"La facture {invoice.name} est déjà comptabilisée")
-                            vente_with_context.write({
-                                'invoice_automation_status': 'success',
-                                'invoice_auto_posted': True,
-                                'invoice_automation_error': False
-                            })
-                    else:
-                        # Comptabilisation automatique désactivée
-                        _logger.info(
-                            f"Comptabilisation automatique désactivée - Facture {invoice.name} laissée en état {invoice.state}")
-                        vente_with_context.write({
-                            'invoice_automation_status': 'success',
-                            'invoice_auto_posted': False,
-                            'invoice_automation_error': False
-                        })
+        """Surcharge : la validation ne traite que la vente et le stock.
+
+        La création, la comptabilisation et l'envoi des factures sont placés dans
+        une file d'attente traitée par la tâche planifiée, hors de la transaction
+        qui verrouille les lignes de réception.
+        """
+        brouillons = self.filtered(lambda v: v.state == 'brouillon')
+        vente_with_context = self.with_context(allow_adjustment=True, gecafle_defer_invoice=True)
+        res = super(GecafleVente, vente_with_context).action_confirm()
+
+        a_facturer = brouillons.filtered(lambda v: v.state == 'valide' and not v.invoice_ids)
+        if not a_facturer:
+            return res
+
+        asynchrones = a_facturer.filtered(lambda v: v.company_id.sudo().invoice_posting_async)
+        if asynchrones:
+            asynchrones._enqueue_invoice_posting()
+
+        synchrones = a_facturer - asynchrones
+        if synchrones:
+            # File désactivée pour la société : traitement immédiat, sans commit
+            synchrones._enqueue_invoice_posting(trigger=False)
+            invoices = synchrones._process_invoice_posting()
+            synchrones._send_invoice_emails(invoices)
+
+        return res
+
+    def _enqueue_invoice_posting(self, trigger=True):
+        """Place les ventes dans la file de facturation et réveille le traitement"""
+        self.with_context(allow_adjustment=True).write({
+            'invoice_automation_status': 'pending',
+            'invoice_auto_posted': False,
+            'invoice_automation_error': False,
+        })
+        _logger.info(f"{len(self)} vente(s) placée(s) dans la file de facturation")
+
+        if trigger:
+            cron = self.env.ref(INVOICE_QUEUE_CRON, raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+
+    @api.model
+    def _fetch_invoice_queue_batch(self, batch_size):
+        """Réserve un lot de ventes en attente de facturation.
+
+        SKIP LOCKED permet à plusieurs workers de vider la file en parallèle sans
+        traiter deux fois la même vente ni attendre les verrous d'une autre.
+        """
+        self.flush_model(['invoice_automation_status', 'state'])
+        self.env.cr.execute("""
+            SELECT id FROM gecafle_vente
+            WHERE invoice_automation_status = 'pending'
+              AND state = 'valide'
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _cron_process_invoice_queue(self, batch_size=INVOICE_QUEUE_BATCH_SIZE):
+        """Tâche planifiée : crée, comptabilise puis envoie les factures en attente"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        while True:
+            ventes = self._fetch_invoice_queue_batch(batch_size)
+            if not ventes:
+                break
+
+            # La tâche tourne en superutilisateur : chaque vente est facturée
+            # dans sa propre société, avec ses journaux, comme à la validation
+            par_societe = ventes.grouped('company_id')
+            invoices = self.env['account.move']
+            for company, ventes_societe in par_societe.items():
+                invoices |= ventes_societe.with_company(company)._process_invoice_posting()
+            if auto_commit:
+                self.env.cr.commit()
+
+            # Les emails ne partent qu'une fois les factures commitées
+            for company, ventes_societe in par_societe.items():
+                ventes_societe.with_company(company)._send_invoice_emails(invoices)
+            if auto_commit:
+                self.env.cr.commit()
+
+            if len(ventes) < batch_size:
+                break
+
+    def _process_invoice_posting(self):
+        """Crée et comptabilise les factures des ventes en attente.
+
+        Les factures manquantes sont créées en un seul lot ; si le lot échoue,
+        chaque vente est reprise dans son propre savepoint pour que l'erreur ne
+        bloque que la vente concernée, qui reste disponible pour un nouvel essai.
+        Retourne les factures comptabilisées.
+        """
+        a_creer = self.filtered(lambda v: not v.invoice_id).with_context(allow_adjustment=True)
+        echecs = self.browse()
+        try:
+            with self.env.cr.savepoint():
+                a_creer._create_invoices()
+        except Exception:
+            _logger.info(f"Échec de la création groupée de {len(a_creer)} factures, reprise une par une")
+            for vente in a_creer:
+                try:
+                    with self.env.cr.savepoint():
+                        vente._create_invoice()
+                except Exception as e:
+                    _logger.warning(f"⚠️ Erreur lors de la création de la facture de {vente.name}: {e}")
+                    vente._set_invoice_automation_error('failed', str(e))
+                    echecs |= vente
+
+        ventes = self - echecs
+        invoices = ventes.invoice_id
+        to_post = invoices.filtered(
+            lambda i: i.state == 'draft' and i.company_id.sudo().auto_post_sales_invoices)
+        errors = self._post_invoices(to_post)
+
+        success_posted = self.browse()
+        success_draft = self.browse()
+        for vente in ventes:
+            invoice = vente.invoice_id
+            if not invoice:
+                vente._set_invoice_automation_error('failed', _("Aucune facture n'a pu être créée pour cette vente."))
+            elif invoice in errors:
+                if vente.company_id.sudo().invoice_auto_validation_retry:
+                    # La facture reste en brouillon
+                    vente._set_invoice_automation_error('draft_fallback', errors[invoice], invoice)
                 else:
-                    _logger.warning(f"Aucune facture créée pour la vente {vente.name}")
+                    vente._set_invoice_automation_error('failed', errors[invoice], invoice)
+            elif invoice.state == 'posted':
+                success_posted |= vente
+                if invoice in to_post:
+                    vente.message_post(
+                        body=_("✅ Facture %s créée et comptabilisée automatiquement.") % invoice.name,
+                        message_type='notification'
+                    )
+            else:
+                # Comptabilisation automatique désactivée
+                success_draft |= vente
 
-                return res
+        if success_posted:
+            success_posted.with_context(allow_adjustment=True).write({
+                'invoice_automation_status': 'success',
+                'invoice_auto_posted': True,
+                'invoice_automation_error': False,
+            })
+        if success_draft:
+            success_draft.with_context(allow_adjustment=True).write({
+                'invoice_automation_status': 'success',
+                'invoice_auto_posted': False,
+                'invoice_automation_error': False,
+            })
 
-        return True
+        _logger.info(
+            f"File de facturation : {len(self)} vente(s) traitée(s), "
+            f"{len(success_posted)} facture(s) comptabilisée(s), "
+            f"{len(self) - len(success_posted) - len(success_draft)} en erreur"
+        )
+        return invoices.filtered(lambda i: i.state == 'posted')
+
+    def _post_invoices(self, invoices):
+        """Comptabilise les factures en un seul appel.
+
+        En cas d'échec du lot, chaque facture est reprise individuellement pour
+        isoler celles en erreur. Retourne {facture: message d'erreur}.
+        """
+        if not invoices:
+            return {}
+        try:
+            with self.env.cr.savepoint():
+                invoices.action_post()
+            return {}
+        except Exception:
+            _logger.info(f"Échec de la comptabilisation groupée de {len(invoices)} factures, reprise une par une")
+
+        errors = {}
+        for invoice in invoices:
+            try:
+                with self.env.cr.savepoint():
+                    invoice.action_post()
+            except Exception as e:
+                _logger.warning(f"⚠️ Erreur lors de la comptabilisation de {invoice.name}: {e}")
+                errors[invoice] = str(e)
+        return errors
+
+    def _set_invoice_automation_error(self, status, error_msg, invoice=None):
+        """Enregistre l'échec de facturation d'une vente"""
+        self.ensure_one()
+        self.with_context(allow_adjustment=True).write({
+            'invoice_automation_status': status,
+            'invoice_auto_posted': False,
+            'invoice_automation_error': error_msg,
+        })
+
+        if not self.company_id.sudo().invoice_auto_log_errors:
+            return
+        if invoice:
+            body = _(
+                "⚠️ La facture %s a été créée en brouillon car la comptabilisation "
+                "automatique a échoué.\n\nErreur: %s\n\n"
+                "Veuillez vérifier et valider manuellement la facture."
+            ) % (invoice.name, error_msg)
+        else:
+            body = _(
+                "⚠️ La création automatique de la facture a échoué.\n\nErreur: %s\n\n"
+                "Utilisez « Réessayer Comptabilisation » après correction."
+            ) % error_msg
+        self.message_post(body=body, message_type='notification')
+
+    def _send_invoice_emails(self, invoices):
+        """Envoie les factures comptabilisées si la société l'a demandé"""
+        for invoice in invoices:
+            vente = invoice.gecafle_vente_id
+            if vente in self and vente.company_id.sudo().invoice_auto_send_email:
+                vente._send_invoice_email(invoice)
 
     def _validate_sale_only(self):
         """Cette méthode n'est plus nécessaire car on utilise super()"""
@@ -167,50 +297,35 @@ class GecafleVente(models.Model):
                 )
 
     def action_retry_invoice_posting(self):
-        """Action manuelle pour réessayer de comptabiliser une facture en brouillon"""
-        self.ensure_one()
-
-        if not self.invoice_ids:
-            raise UserError(_("Aucune facture n'est liée à cette vente."))
-
-        invoice = self.invoice_ids[0]
-
-        if invoice.state != 'draft':
-            raise UserError(_("La facture n'est pas en brouillon."))
-
-        try:
-            invoice.action_post()
-
-            # Utiliser le contexte pour permettre la modification
-            self.with_context(allow_adjustment=True).write({
-                'invoice_automation_status': 'success',
-                'invoice_auto_posted': True,
-                'invoice_automation_error': False
-            })
-
-            self.message_post(
-                body=_("✅ Facture %s comptabilisée avec succès (réessai manuel).") % invoice.name,
+        """Replace dans la file les ventes dont la facturation a échoué"""
+        a_relancer = self.filtered(
+            lambda v: v.state == 'valide'
+            and v.invoice_automation_status in ('failed', 'draft_fallback')
+        )
+        if not a_relancer:
+            raise UserError(_("Aucune vente en erreur de facturation à relancer."))
+
+        for vente in a_relancer:
+            invoice = vente.invoice_ids[:1]
+            if invoice and invoice.state == 'cancel':
+                raise UserError(_(
+                    "La facture %s de la vente %s est annulée."
+                ) % (invoice.name, vente.name))
+
+        a_relancer._enqueue_invoice_posting()
+        for vente in a_relancer:
+            vente.message_post(
+                body=_("🔄 Facturation replacée dans la file d'attente (réessai manuel)."),
                 message_type='notification'
             )
 
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': _('Succès'),
-                    'message': _('La facture a été comptabilisée avec succès.'),
-                    'type': 'success',
-                    'sticky': False,
-                }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('File de facturation'),
+                'message': _('%s vente(s) replacée(s) dans la file de facturation.') % len(a_relancer),
+                'type': 'info',
+                'sticky': False,
             }
-
-        except Exception as e:
-            error_msg = str(e)
-
-            self.with_context(allow_adjustment=True).write({
-                'invoice_automation_error': error_msg
-            })
-
-            raise UserError(_(
-                "Impossible de comptabiliser la facture.\n\nErreur: %s"
-            ) % error_msg)
+        }
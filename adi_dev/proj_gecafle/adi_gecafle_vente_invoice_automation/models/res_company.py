@@ -13,6 +13,14 @@ class ResCompany(models.Model):
              "comptabilisées. En cas d'erreur, elles seront créées en brouillon."
     )
 
+    invoice_posting_async = fields.Boolean(
+        string="Facturer en arrière-plan",
+        default=True,
+        help="Si activé, la validation d'une vente ne fait que mettre à jour le stock : "
+             "la facture est créée, comptabilisée et envoyée par une tâche planifiée. "
+             "Sinon, la facture est traitée pendant la validation."
+    )
+
     # Paramètres additionnels pour la gestion
     invoice_auto_validation_retry = fields.Boolean(
         string="Réessayer en mode brouillon si erreur",
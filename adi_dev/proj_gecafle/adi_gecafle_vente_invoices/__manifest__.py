@@ -1,12 +1,15 @@
 {
     'name': 'ADI Ventes - Factures Clients',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Sales/Accounting',
     'summary': 'Intégration des ventes GECAFLE avec la facturation Odoo',
     'description': """
         Ce module permet de créer automatiquement des factures clients
         à partir des bons de vente GECAFLE tout en conservant toutes
         les informations spécifiques (poids, emballages, consignes, etc.)
+
+        Facturation de masse : les bons sélectionnés sont facturés en un seul
+        lot, avec regroupement optionnel par client et par journée.
     """,
     'author': 'ADICOPS',
     'website': 'https://adicops.com/',
@@ -12,11 +12,22 @@ class AccountMove(models.Model):
         ondelete='restrict'
     )
 
+    # Bons de vente regroupés dans une même facture (client / journée)
+    gecafle_vente_ids = fields.Many2many(
+        'gecafle.vente',
+        'account_move_gecafle_vente_rel',
+        'move_id',
+        'vente_id',
+        string="Bons de vente regroupés",
+        readonly=True,
+        copy=False
+    )
+
     # Informations du client GECAFLE
     gecafle_client_id = fields.Many2one(
         'gecafle.client',
         string="Client GECAFLE",
-        related='gecafle_vente_id.client_id',
+        compute='_compute_gecafle_client_id',
         store=True
     )
 
@@ -92,20 +103,25 @@ class AccountMove(models.Model):
             else:
                 move.consigne_appliquee = False
 
-    @api.depends('gecafle_vente_id')
+    @api.depends('gecafle_vente_id.client_id', 'gecafle_vente_ids.client_id')
+    def _compute_gecafle_client_id(self):
+        for move in self:
+            move.gecafle_client_id = move.gecafle_vente_id.client_id or move.gecafle_vente_ids[:1].client_id
+
+    @api.depends('gecafle_vente_id', 'gecafle_vente_ids')
     def _compute_gecafle_totals(self):
         for move in self:
-            if move.move_type in ['out_invoice', 'out_refund'] and move.gecafle_vente_id:
-                # Copier tous les totaux depuis le bon de vente
-                vente = move.gecafle_vente_id
-                move.total_poids_brut = vente.total_poids_brut
-                move.total_poids_colis = vente.total_poids_colis
-                move.total_poids_net = vente.total_poids_net
-                move.montant_total_commission = vente.montant_total_commission
-                move.montant_total_emballages = vente.montant_total_emballages
-                move.montant_total_consigne = vente.montant_total_consigne
-                move.montant_remise_globale = vente.montant_remise_globale
-                move.montant_total_net = vente.montant_total_net
+            ventes = move.gecafle_vente_id or move.gecafle_vente_ids
+            if move.move_type in ['out_invoice', 'out_refund'] and ventes:
+                # Copier tous les totaux depuis le(s) bon(s) de vente
+                move.total_poids_brut = sum(ventes.mapped('total_poids_brut'))
+                move.total_poids_colis = sum(ventes.mapped('total_poids_colis'))
+                move.total_poids_net = sum(ventes.mapped('total_poids_net'))
+                move.montant_total_commission = sum(ventes.mapped('montant_total_commission'))
+                move.montant_total_emballages = sum(ventes.mapped('montant_total_emballages'))
+                move.montant_total_consigne = sum(ventes.mapped('montant_total_consigne'))
+                move.montant_remise_globale = sum(ventes.mapped('montant_remise_globale'))
+                move.montant_total_net = sum(ventes.mapped('montant_total_net'))
             else:
                 move.total_poids_brut = 0
                 move.total_poids_colis = 0
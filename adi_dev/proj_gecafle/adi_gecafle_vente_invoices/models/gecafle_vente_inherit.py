@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
+import logging
+
 from odoo import models,fields,api,_
 
 from odoo.exceptions import UserError
 
+_logger = logging.getLogger(__name__)
+
 
 class GecafleVente(models.Model):
     _inherit = 'gecafle.vente'
@@ -21,6 +26,17 @@ class GecafleVente(models.Model):
         string="Factures"
     )
 
+    # Factures regroupant plusieurs bons d'un même client sur une journée
+    grouped_invoice_ids = fields.Many2many(
+        'account.move',
+        'account_move_gecafle_vente_rel',
+        'vente_id',
+        'move_id',
+        string="Factures regroupées",
+        readonly=True,
+        copy=False
+    )
+
     invoice_count = fields.Integer(
         string="Nombre de factures",
         compute='_compute_invoice_count'
@@ -33,22 +49,22 @@ class GecafleVente(models.Model):
         store = True,
     )
 
-    @api.depends('invoice_ids')
+    @api.depends('invoice_ids', 'grouped_invoice_ids')
     def _compute_invoice_count(self):
         for vente in self:
-            vente.invoice_count = len(vente.invoice_ids)
+            vente.invoice_count = len(vente.invoice_ids | vente.grouped_invoice_ids)
 
-    @api.depends('invoice_ids')
+    @api.depends('invoice_ids', 'grouped_invoice_ids')
     def _compute_invoice_id(self):
         for vente in self:
-            vente.invoice_id = vente.invoice_ids[:1]
+            vente.invoice_id = vente.invoice_ids[:1] or vente.grouped_invoice_ids[:1]
 
     def action_confirm(self):
         """Surcharge pour créer automatiquement la facture"""
         res = super().action_confirm()
-        """ 
-        
-        """
+        if self.env.context.get('gecafle_defer_invoice'):
+            # La facture sera créée par la file de comptabilisation
+            return res
 
         for vente in self:
             if vente.state == 'valide' and not vente.invoice_ids:
@@ -69,10 +85,50 @@ class GecafleVente(models.Model):
     def _create_invoice(self):
         """Crée une facture client à partir du bon de vente"""
         self.ensure_one()
+        return self._create_invoices()
 
-        partner = self._get_or_create_partner()
+    def _create_invoices(self, consolidate=False):
+        """Crée en un seul appel les factures d'un lot de bons de vente.
 
-        invoice_vals = {
+        Les partenaires de tous les clients sont résolus en une fois, puis
+        toutes les factures sont créées par un unique create(vals_list).
+        Avec consolidate=True, les bons d'un même client et d'une même journée
+        sont regroupés dans une seule facture.
+        Retourne les factures créées.
+        """
+        ventes = self.filtered(
+            lambda v: v.state == 'valide' and not v.invoice_ids and not v.grouped_invoice_ids
+        )
+        if not ventes:
+            return self.env['account.move']
+
+        partners = ventes._get_or_create_partners()
+
+        if consolidate:
+            groups = defaultdict(lambda: self.browse())
+            for vente in ventes:
+                key = (vente.company_id.id, vente.client_id.id, vente.date_vente.date())
+                groups[key] |= vente
+            groups = list(groups.values())
+        else:
+            groups = list(ventes)
+
+        vals_list = []
+        for group in groups:
+            partner = partners[group.client_id.id]
+            if len(group) == 1:
+                vals_list.append(group._prepare_invoice_vals(partner))
+            else:
+                vals_list.append(group._prepare_grouped_invoice_vals(partner))
+
+        invoices = self.env['account.move'].create(vals_list)
+        _logger.info(f"{len(invoices)} facture(s) créée(s) pour {len(ventes)} bon(s) de vente")
+        return invoices
+
+    def _prepare_invoice_vals(self, partner):
+        """Prépare les valeurs de la facture d'un bon de vente"""
+        self.ensure_one()
+        return {
             'move_type': 'out_invoice',
             'partner_id': partner.id,
             'invoice_date': fields.Date.today(),
@@ -80,64 +136,121 @@ class GecafleVente(models.Model):
             'ref': _("Bon de vente %s") % self.name,
             'gecafle_vente_id': self.id,
             'narration': self.notes or '',
-            'invoice_line_ids': []
+            'invoice_line_ids': [(0, 0, line_vals) for line_vals in self._prepare_invoice_lines()],
         }
 
+    def _prepare_grouped_invoice_vals(self, partner):
+        """Prépare les valeurs d'une facture regroupant plusieurs bons de vente"""
+        names = ', '.join(self.mapped('name'))
+        invoice_lines = []
+        for vente in self:
+            invoice_lines.append((0, 0, {
+                'name': _("Bon de vente %s") % vente.name,
+                'display_type': 'line_section',
+            }))
+            invoice_lines += [(0, 0, line_vals) for line_vals in vente._prepare_invoice_lines()]
+
+        return {
+            'move_type': 'out_invoice',
+            'partner_id': partner.id,
+            'invoice_date': fields.Date.today(),
+            'invoice_origin': names,
+            'ref': _("Bons de vente %s") % names,
+            'gecafle_vente_ids': [(6, 0, self.ids)],
+            'narration': self[:1].notes or '',
+            'invoice_line_ids': invoice_lines,
+        }
+
+    def _prepare_invoice_lines(self):
+        """Prépare les lignes de facture (produits, emballages, remise) du bon de vente"""
+        self.ensure_one()
+
         # Créer les lignes de produits
-        for line in self.detail_vente_ids:
-            invoice_line_vals = self._prepare_product_invoice_line(line)
-            invoice_vals['invoice_line_ids'].append((0, 0, invoice_line_vals))
+        invoice_lines = [self._prepare_product_invoice_line(line) for line in self.detail_vente_ids]
 
         # MODIFICATION : Gestion des emballages selon le type de client
         if self.client_id.est_fidel:
             # Client fidèle : facturer uniquement les emballages non rendus si le paramètre est activé
             if self.company_id.fideles_paient_emballages_non_rendus and self.montant_emballages_non_rendus > 0:
-                emballage_line_vals = {
+                invoice_lines.append({
                     'name': _("Emballages non rendus (jetables)"),
                     'quantity': 1,
                     'price_unit': self.montant_emballages_non_rendus,
                     'gecafle_line_type': 'emballage',
-                }
-                invoice_vals['invoice_line_ids'].append((0, 0, emballage_line_vals))
+                })
         else:
             # Client non fidèle : facturer tous les emballages
             if self.montant_total_emballages > 0:
-                emballage_line_vals = self._prepare_emballage_line()
-                invoice_vals['invoice_line_ids'].append((0, 0, emballage_line_vals))
+                invoice_lines.append(self._prepare_emballage_line())
 
         # Ajouter la ligne de remise si applicable
         if self.montant_remise_globale > 0:
-            remise_line_vals = self._prepare_remise_line()
-            invoice_vals['invoice_line_ids'].append((0, 0, remise_line_vals))
+            invoice_lines.append(self._prepare_remise_line())
 
-        # Créer et valider la facture
-        invoice = self.env['account.move'].create(invoice_vals)
-        #invoice.action_post()
-
-        return invoice
+        return invoice_lines
 
     def _get_or_create_partner(self):
         """Recherche ou crée un res.partner pour le client GECAFLE"""
         self.ensure_one()
+        return self._get_or_create_partners()[self.client_id.id]
 
-        # Rechercher un partner existant par nom et téléphone
-        domain = [('name', '=', self.client_id.name)]
-        if self.client_id.tel_mob:
-            domain.append(('phone', '=', self.client_id.tel_mob))
+    def _get_or_create_partners(self):
+        """Résout en lot les res.partner des clients des bons de vente.
 
-        partner = self.env['res.partner'].search(domain, limit=1)
+        Le lien gecafle.client ↔ res.partner (module de synchronisation) est lu
+        en une requête ; les clients non liés sont recherchés par nom et
+        téléphone, et les partenaires manquants créés en un seul appel.
+        Retourne {client_id: res.partner}.
+        """
+        Partner = self.env['res.partner']
+        clients = self.client_id
+        partners = {}
 
-        if not partner:
-            # Créer le partner
-            partner = self.env['res.partner'].create({
-                'name': self.client_id.name,
-                'phone': self.client_id.tel_mob,
-                'street': self.client_id.adresse,
-                'customer_rank': 1,
-                'lang': 'fr_FR' if self.client_id.langue_client == 'fr' else 'ar_SA',
-            })
+        linked = 'gecafle_client_id' in Partner._fields
+        if linked:
+            for partner in Partner.search_fetch([('gecafle_client_id', 'in', clients.ids)], ['gecafle_client_id']):
+                partners.setdefault(partner.gecafle_client_id.id, partner)
 
-        return partner
+        # Rechercher un partner existant par nom et téléphone
+        missing = clients.filtered(lambda c: c.id not in partners)
+        if missing:
+            by_name = defaultdict(lambda: Partner)
+            for partner in Partner.search_fetch([('name', 'in', list(set(missing.mapped('name'))))], ['name', 'phone']):
+                by_name[partner.name] |= partner
+            for client in missing:
+                candidates = by_name[client.name]
+                if client.tel_mob:
+                    candidates = candidates.filtered(lambda p: p.phone == client.tel_mob)
+                if candidates:
+                    partners[client.id] = candidates[0]
+
+        # Créer les partners manquants
+        to_create = missing.filtered(lambda c: c.id not in partners)
+        if to_create:
+            vals_list = []
+            for client in to_create:
+                vals = {
+                    'name': client.name,
+                    'phone': client.tel_mob,
+                    'street': client.adresse,
+                    'customer_rank': 1,
+                    'lang': 'fr_FR' if client.langue_client == 'fr' else 'ar_SA',
+                }
+                if linked:
+                    vals.update({
+                        'gecafle_client_id': client.id,
+                        'is_gecafle_synced': True,
+                        'sync_source': 'gecafle',
+                    })
+                vals_list.append(vals)
+
+            created = Partner.with_context(sync_in_progress=True).create(vals_list)
+            for client, partner in zip(to_create, created):
+                partners[client.id] = partner
+                if linked:
+                    client.with_context(sync_in_progress=True).res_partner_id = partner
+
+        return partners
 
     def _prepare_product_invoice_line(self, sale_line):
         """Prépare les valeurs pour une ligne de facture produit"""
@@ -188,16 +301,17 @@ class GecafleVente(models.Model):
         """Affiche la facture liée"""
         self.ensure_one()
 
-        if not self.invoice_ids:
+        invoices = self.invoice_ids | self.grouped_invoice_ids
+        if not invoices:
             raise UserError(_("Aucune facture n'est liée à ce bon de vente."))
 
-        if len(self.invoice_ids) == 1:
+        if len(invoices) == 1:
             return {
                 'name': _('Facture Client'),
                 'type': 'ir.actions.act_window',
                 'view_mode': 'form',
                 'res_model': 'account.move',
-                'res_id': self.invoice_ids[0].id,
+                'res_id': invoices.id,
                 'target': 'current',
             }
         else:
@@ -206,10 +320,43 @@ class GecafleVente(models.Model):
                 'type': 'ir.actions.act_window',
                 'view_mode': 'tree,form',
                 'res_model': 'account.move',
-                'domain': [('id', 'in', self.invoice_ids.ids)],
+                'domain': [('id', 'in', invoices.ids)],
                 'target': 'current',
             }
 
+    def action_create_invoices_batch(self):
+        """Action de masse : une facture par bon de vente"""
+        return self._action_create_invoices_batch(consolidate=False)
+
+    def action_create_invoices_grouped(self):
+        """Action de masse : une facture par client et par journée"""
+        return self._action_create_invoices_batch(consolidate=True)
+
+    def _action_create_invoices_batch(self, consolidate):
+        invoices = self._create_invoices(consolidate=consolidate)
+        if not invoices:
+            raise UserError(_("Aucun bon de vente validé et non facturé dans la sélection."))
+
+        return {
+            'name': _('Factures Clients'),
+            'type': 'ir.actions.act_window',
+            'view_mode': 'tree,form',
+            'res_model': 'account.move',
+            'domain': [('id', 'in', invoices.ids)],
+            'target': 'current',
+        }
+
+    def action_cancel(self):
+        """Bloque l'annulation d'un bon inclus dans une facture regroupée active"""
+        for vente in self:
+            grouped = vente.grouped_invoice_ids.filtered(lambda i: i.state != 'cancel')
+            if grouped:
+                raise UserError(_(
+                    "Impossible d'annuler cette vente car elle est incluse dans la facture regroupée %s.\n"
+                    "Veuillez d'abord annuler ou extourner cette facture."
+                ) % ', '.join(grouped.mapped('name')))
+        return super().action_cancel()
+
         # Champ pour le bandeau d'état de facturation/paiement
     invoice_status_badge = fields.Selection([
         ('facture', 'مفوتر'),
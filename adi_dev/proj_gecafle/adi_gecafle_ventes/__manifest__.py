@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     "name": "ADI GECAFLE Gestion des Ventes",
-    "version": "17.0.1.1.0",
+    "version": "17.0.1.1.3",
     "author": "ACICOPS",
     "website": "https://adicops-dz.com/",
     "license": "AGPL-3",
@@ -37,6 +37,27 @@ class GecafleReceptionInherit(models.Model):
 
             record.display_name = f"[{nom}] {producteur} - {date_str}"
 
+    has_stock = fields.Boolean(
+        string="Stock disponible",
+        compute="_compute_has_stock",
+        search="_search_has_stock",
+        help="Au moins une ligne de la réception a encore des colis disponibles."
+    )
+
+    @api.depends('details_reception_ids.qte_colis_disponibles')
+    def _compute_has_stock(self):
+        for record in self:
+            record.has_stock = any(line.qte_colis_disponibles > 0 for line in record.details_reception_ids)
+
+    def _search_has_stock(self, operator, value):
+        if operator not in ('=', '!='):
+            raise UserError(_("Opérateur non supporté pour le filtre de stock : %s") % operator)
+        # Sous-requête évaluée côté serveur (index partiel sur les lignes avec stock) :
+        # aucune liste d'ids n'est transmise au navigateur
+        positive = (operator == '=') == bool(value)
+        domain = [('details_reception_ids', 'any', [('qte_colis_disponibles', '>', 0)])]
+        return domain if positive else ['!'] + domain
+
     def name_get(self):
         return [(record.id, record.display_name) for record in self]
 
@@ -76,6 +97,14 @@ class GecafleDetailsReceptionInherit(models.Model):
         'detail_reception_id',
         string="Lignes de destockage"
     )
+
+    def init(self):
+        # Index partiel utilisé par le filtre has_stock des réceptions
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS gecafle_details_reception_in_stock_idx
+            ON gecafle_details_reception (reception_id)
+            WHERE qte_colis_disponibles > 0
+        """)
     qte_colis_vendus = fields.Integer(
         string="Quantité Vendue",
         compute="_compute_quantities",
@@ -193,33 +222,16 @@ class GecafleDetailsVentes(models.Model):
         'gecafle.reception',
         string="Réception",
         required=True,
-        domain=lambda self: self._get_reception_domain()
+        domain="[('state', 'in', ['brouillon', 'confirmee']), ('has_stock', '=', True)]"
     )
 
     @api.model
     def _get_reception_domain(self):
         """Retourne le domaine pour filtrer les réceptions avec stock disponible"""
-        # Rechercher toutes les réceptions qui ont du stock disponible
-        receptions_with_stock = self.env['gecafle.details_reception'].search([
-            ('qte_colis_disponibles', '>', 0)
-        ]).mapped('reception_id.id')
-
-
-        # Créer le domaine
         return [
             ('state', 'in', ['brouillon', 'confirmee']),
-            ('id', 'in', receptions_with_stock),
+            ('has_stock', '=', True),
         ]
-    """ 
-     reception_id = fields.Many2one(
-        'gecafle.reception',
-        string="Réception",
-        required=True,
-        domain="[('state', 'in', ['brouillon', 'confirmee'])]",
-
-    )
-
-    """
 
 
 
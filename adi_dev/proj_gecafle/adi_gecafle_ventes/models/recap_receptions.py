@@ -442,11 +442,12 @@ class GecafleReceptionRecap(models.Model):
         readonly=True
     )
 
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'Nouveau') == 'Nouveau':
-            vals['name'] = self.env['ir.sequence'].next_by_code('gecafle.reception.recap') or 'REC/'
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', 'Nouveau') == 'Nouveau':
+                vals['name'] = self.env['ir.sequence'].next_by_code('gecafle.reception.recap') or 'REC/'
+        return super().create(vals_list)
 
     @api.depends('recap_line_ids.montant_vente', 'recap_line_ids.montant_commission')
     def _compute_totals(self):
@@ -455,110 +456,180 @@ class GecafleReceptionRecap(models.Model):
             record.total_commission = sum(line.montant_commission for line in record.recap_line_ids)
             record.net_a_payer = record.total_ventes - record.total_commission
 
-    def generate_recap_lines(self):
-        """Génère les lignes récapitulatives depuis les ventes"""
+    lines_generated_at = fields.Datetime(
+        string="Lignes générées le",
+        readonly=True,
+        copy=False,
+        help="Date de la dernière génération des lignes. Seuls les récapitulatifs dont "
+             "les ventes ou la réception ont changé depuis sont régénérés."
+    )
+
+    def _get_stale_recaps(self):
+        """Retourne les récapitulatifs dont les ventes ou les lignes de réception
+        ont été modifiées (ou supprimées) depuis la dernière génération."""
+        if not self.ids:
+            return self
+        self.env['gecafle.details_ventes'].flush_model()
+        self.env['gecafle.vente'].flush_model(['state'])
+        self.env['gecafle.details_reception'].flush_model()
+        self.env['gecafle.reception.recap.sale'].flush_model(['recap_id'])
+        self.flush_recordset(['reception_id', 'lines_generated_at'])
+        self.env.cr.execute("""
+            SELECT r.id
+            FROM gecafle_reception_recap r
+            WHERE r.id IN %s
+              AND (
+                r.lines_generated_at IS NULL
+                OR EXISTS (
+                    SELECT 1
+                    FROM gecafle_details_ventes dv
+                    JOIN gecafle_vente v ON v.id = dv.vente_id
+                    WHERE dv.reception_id = r.reception_id
+                      AND (dv.write_date >= r.lines_generated_at OR v.write_date >= r.lines_generated_at)
+                )
+                OR EXISTS (
+                    SELECT 1
+                    FROM gecafle_details_reception dr
+                    WHERE dr.reception_id = r.reception_id
+                      AND dr.write_date >= r.lines_generated_at
+                )
+                OR (SELECT COUNT(*) FROM gecafle_reception_recap_sale s WHERE s.recap_id = r.id)
+                   != (SELECT COUNT(*)
+                       FROM gecafle_details_ventes dv
+                       JOIN gecafle_vente v ON v.id = dv.vente_id
+                       WHERE dv.reception_id = r.reception_id AND v.state = 'valide')
+              )
+        """, (tuple(self.ids),))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _fetch_sale_rows(self):
+        """Lignes de vente validées des réceptions des récapitulatifs, en une requête."""
+        self.env['gecafle.details_ventes'].flush_model()
+        self.env['gecafle.vente'].flush_model(['state', 'client_id', 'date_vente'])
+        self.env.cr.execute("""
+            SELECT dv.reception_id, dv.vente_id, v.client_id, v.date_vente,
+                   dv.produit_id, dv.qualite_id, dv.type_colis_id, dv.nombre_colis,
+                   dv.poids_net, dv.prix_unitaire, dv.montant_net,
+                   dv.taux_commission, dv.montant_commission
+            FROM gecafle_details_ventes dv
+            JOIN gecafle_vente v ON v.id = dv.vente_id
+            WHERE dv.reception_id IN %s
+              AND v.state = 'valide'
+            ORDER BY dv.id
+        """, (tuple(self.reception_id.ids),))
+        sale_rows = {}
+        for row in self.env.cr.dictfetchall():
+            sale_rows.setdefault(row['reception_id'], []).append(row)
+        return sale_rows
+
+    def _prepare_recap_lines_vals(self, sale_rows):
+        """Regroupe les lignes de vente par produit/qualité/prix"""
         self.ensure_one()
-
-        # Supprimer les lignes existantes
-        self.recap_line_ids.unlink()
-
-        # Dictionnaire pour regrouper par produit/qualité/prix
         grouped_lines = {}
-
-        # Récupérer toutes les lignes de vente liées à cette réception
-        sale_lines = self.env['gecafle.details_ventes'].search([
-            ('reception_id', '=', self.reception_id.id),
-            ('vente_id.state', '=', 'valide')
-        ])
-
-        for line in sale_lines:
+        for row in sale_rows:
             # Clé de regroupement: (produit_id, qualité_id, prix_kg)
-            key = (line.produit_id.id, line.qualite_id.id if line.qualite_id else False, line.prix_unitaire)
-
+            key = (row['produit_id'], row['qualite_id'] or False, row['prix_unitaire'])
             if key not in grouped_lines:
                 grouped_lines[key] = {
-                    'produit_id': line.produit_id.id,
-                    'qualite_id': line.qualite_id.id if line.qualite_id else False,
-                    'type_colis_id': line.type_colis_id.id,
-                    'prix_unitaire': line.prix_unitaire,
+                    'recap_id': self.id,
+                    'produit_id': row['produit_id'],
+                    'qualite_id': row['qualite_id'] or False,
+                    'type_colis_id': row['type_colis_id'],
+                    'prix_unitaire': row['prix_unitaire'],
                     'nombre_colis': 0,
                     'poids_net': 0.0,
                     'montant_vente': 0.0,
-                    'taux_commission': line.taux_commission,
+                    'taux_commission': row['taux_commission'],
                     'montant_commission': 0.0,
                 }
+            values = grouped_lines[key]
+            values['nombre_colis'] += row['nombre_colis'] or 0
+            values['poids_net'] += row['poids_net'] or 0.0
+            values['montant_vente'] += row['montant_net'] or 0.0
+            values['montant_commission'] += row['montant_commission'] or 0.0
+        return list(grouped_lines.values())
+
+    def _prepare_sale_lines_vals(self, sale_rows):
+        self.ensure_one()
+        return [{
+            'recap_id': self.id,
+            'vente_id': row['vente_id'],
+            'client_id': row['client_id'],
+            'date_vente': row['date_vente'],
+            'produit_id': row['produit_id'],
+            'qualite_id': row['qualite_id'] or False,
+            'type_colis_id': row['type_colis_id'],
+            'nombre_colis': row['nombre_colis'],
+            'poids_net': row['poids_net'],
+            'prix_unitaire': row['prix_unitaire'],
+            'montant_net': row['montant_net'],
+            'taux_commission': row['taux_commission'],
+            'montant_commission': row['montant_commission'],
+        } for row in sale_rows]
+
+    def _prepare_original_lines_vals(self):
+        self.ensure_one()
+        return [{
+            'recap_id': self.id,
+            'designation_id': line.designation_id.id,
+            'qualite_id': line.qualite_id.id if line.qualite_id else False,
+            'type_colis_id': line.type_colis_id.id,
+            'qte_colis_vendus': line.qte_colis_vendus,
+            'qte_colis_destockes': line.qte_colis_destockes,
+        } for line in self.reception_id.details_reception_ids]
+
+    def _build_lines(self, parts=('recap', 'original', 'sale')):
+        """
+        Régénère les lignes demandées pour tous les récapitulatifs de self :
+        une requête pour les ventes, une suppression et un create par type de ligne.
+        """
+        if not self:
+            return True
+        sale_rows = self._fetch_sale_rows() if {'recap', 'sale'} & set(parts) else {}
+        line_models = {
+            'recap': ('gecafle.reception.recap.line', 'recap_line_ids'),
+            'original': ('gecafle.reception.recap.original', 'original_line_ids'),
+            'sale': ('gecafle.reception.recap.sale', 'sale_line_ids'),
+        }
+        for part in parts:
+            model_name, field_name = line_models[part]
+            # Supprimer les lignes existantes
+            self.mapped(field_name).unlink()
+            vals_list = []
+            for recap in self:
+                rows = sale_rows.get(recap.reception_id.id, [])
+                if part == 'recap':
+                    vals_list += recap._prepare_recap_lines_vals(rows)
+                elif part == 'sale':
+                    vals_list += recap._prepare_sale_lines_vals(rows)
+                else:
+                    vals_list += recap._prepare_original_lines_vals()
+            self.env[model_name].create(vals_list)
+        if set(parts) == set(line_models):
+            self.lines_generated_at = self.env.cr.now()
+        return True
+
+    def generate_lines(self, force=False):
+        """Génère les trois types de lignes pour plusieurs récapitulatifs à la fois.
+        Sans `force`, seuls les récapitulatifs dont les ventes ont changé sont régénérés."""
+        recaps = self if force else self._get_stale_recaps()
+        return recaps._build_lines()
+
+    def action_regenerate_lines(self):
+        recaps = self.filtered(lambda r: r.state == 'brouillon')
+        return recaps.generate_lines()
 
-            grouped_lines[key]['nombre_colis'] += line.nombre_colis
-            grouped_lines[key]['poids_net'] += line.poids_net
-            grouped_lines[key]['montant_vente'] += line.montant_net
-            grouped_lines[key]['montant_commission'] += line.montant_commission
-
-        # Créer les lignes récapitulatives
-        for values in grouped_lines.values():
-            self.env['gecafle.reception.recap.line'].create({
-                'recap_id': self.id,
-                'produit_id': values['produit_id'],
-                'qualite_id': values['qualite_id'],
-                'type_colis_id': values['type_colis_id'],
-                'prix_unitaire': values['prix_unitaire'],
-                'nombre_colis': values['nombre_colis'],
-                'poids_net': values['poids_net'],
-                'montant_vente': values['montant_vente'],
-                'taux_commission': values['taux_commission'],
-                'montant_commission': values['montant_commission'],
-            })
+    def generate_recap_lines(self):
+        """Génère les lignes récapitulatives depuis les ventes"""
+        return self._build_lines(parts=('recap',))
 
     def generate_original_lines(self):
         """Copie les lignes de réception originales"""
-        self.ensure_one()
-
-        # Supprimer les lignes existantes
-        self.original_line_ids.unlink()
-
-        # Récupérer les lignes de réception
-        for line in self.reception_id.details_reception_ids:
-            self.env['gecafle.reception.recap.original'].create({
-                'recap_id': self.id,
-                'designation_id': line.designation_id.id,
-                'qualite_id': line.qualite_id.id if line.qualite_id else False,
-                'type_colis_id': line.type_colis_id.id,
-                #  'poids_colis': line.poids_colis,
-                #  'qte_colis_recue': line.qte_colis_recue,
-                #  'poids_brut': line.poids_brut,
-                #  'poids_net': line.poids_net,
-                'qte_colis_vendus': line.qte_colis_vendus,
-                'qte_colis_destockes': line.qte_colis_destockes,
-            })
+        return self._build_lines(parts=('original',))
 
     def generate_sale_lines(self):
         """Copie les lignes de vente liées"""
-        self.ensure_one()
-
-        # Supprimer les lignes existantes
-        self.sale_line_ids.unlink()
-
-        # Récupérer toutes les lignes de vente liées à cette réception
-        sale_lines = self.env['gecafle.details_ventes'].search([
-            ('reception_id', '=', self.reception_id.id),
-            ('vente_id.state', '=', 'valide')
-        ])
-
-        for line in sale_lines:
-            self.env['gecafle.reception.recap.sale'].create({
-                'recap_id': self.id,
-                'vente_id': line.vente_id.id,
-                'client_id': line.vente_id.client_id.id,
-                'date_vente': line.vente_id.date_vente,
-                'produit_id': line.produit_id.id,
-                'qualite_id': line.qualite_id.id if line.qualite_id else False,
-                'type_colis_id': line.type_colis_id.id,
-                'nombre_colis': line.nombre_colis,
-                'poids_net': line.poids_net,
-                'prix_unitaire': line.prix_unitaire,
-                'montant_net': line.montant_net,
-                'taux_commission': line.taux_commission,
-                'montant_commission': line.montant_commission,
-            })
+        return self._build_lines(parts=('sale',))
 
     def action_validate(self):
         """Valide le récapitulatif"""
@@ -699,7 +770,8 @@ class GecafleReceptionRecapSale(models.Model):
     vente_id = fields.Many2one(
         'gecafle.vente',
         string="Vente",
-        required=True
+        required=True,
+        index=True
     )
     client_id = fields.Many2one(
         'gecafle.client',
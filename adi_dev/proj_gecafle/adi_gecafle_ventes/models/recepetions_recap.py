@@ -70,9 +70,7 @@ class GecafleReception(models.Model):
         })
 
         # Générer les lignes
-        recap.generate_recap_lines()
-        recap.generate_original_lines()
-        recap.generate_sale_lines()
+        recap.generate_lines(force=True)
 
         # Ouvrir le formulaire du récapitulatif
         return {
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Smart Payment Dispatch',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.0',
     'category': 'Accounting/Payment',
     'summary': 'Répartition automatique intelligente des paiements sur les factures impayées',
     'description': """
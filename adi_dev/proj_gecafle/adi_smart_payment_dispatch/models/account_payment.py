@@ -1,12 +1,25 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
+from contextlib import contextmanager
 from datetime import datetime, date
 import logging
 
 _logger = logging.getLogger(__name__)
 
 
+def _fifo_split(residuals, amount, currency):
+    """Répartit `amount` sur les restes dus `residuals` (déjà triés FIFO).
+    Retourne la liste des montants alloués, dans le même ordre."""
+    allocations = []
+    remaining = amount
+    for residual in residuals:
+        allocated = min(residual, remaining) if currency.compare_amounts(remaining, 0) > 0 else 0.0
+        allocations.append(currency.round(allocated))
+        remaining -= allocated
+    return allocations
+
+
 class AccountPayment(models.Model):
     _inherit = 'account.payment'
 
@@ -77,12 +90,8 @@ class AccountPayment(models.Model):
             self._compute_allocation_amounts()
 
     # ========== Private Methods ==========
-    def _get_unpaid_invoices(self):
-        """Récupère toutes les factures impayées du partenaire"""
+    def _get_unpaid_invoices_domain(self):
         self.ensure_one()
-        if not self.partner_id:
-            return self.env['account.move']
-
         domain = [
             ('partner_id', '=', self.partner_id.id),
             ('state', '=', 'posted'),
@@ -95,9 +104,17 @@ class AccountPayment(models.Model):
             domain.append(('move_type', 'in', ['out_invoice', 'out_refund']))
         else:  # supplier
             domain.append(('move_type', 'in', ['in_invoice', 'in_refund']))
+        return domain
 
-        # Tri par date de facture (FIFO)
-        invoices = self.env['account.move'].search(domain, order='invoice_date ASC, id ASC')
+    def _get_unpaid_invoices(self):
+        """Récupère toutes les factures impayées du partenaire"""
+        self.ensure_one()
+        if not self.partner_id:
+            return self.env['account.move']
+
+        # Tri par date de facture (FIFO), restes dus lus dans la même requête
+        invoices = self.env['account.move'].search_fetch(
+            self._get_unpaid_invoices_domain(), ['amount_residual'], order='invoice_date ASC, id ASC')
 
         _logger.info(f"Found {len(invoices)} unpaid invoices for partner {self.partner_id.name}")
         return invoices
@@ -125,60 +142,61 @@ class AccountPayment(models.Model):
             self.allocation_line_ids = lines_vals
 
     def _create_allocation_lines_after_save(self):
-        """Crée les lignes d'allocation après la sauvegarde du paiement"""
-        self.ensure_one()
-
-        if not self.partner_id or not self.id:
+        """Crée les lignes d'allocation après la sauvegarde des paiements.
+        La répartition FIFO est calculée en une passe sur les restes dus et
+        toutes les lignes sont créées en un seul appel."""
+        payments = self.filtered(lambda p: p.partner_id and p.id)
+        if not payments:
             return
 
         # Supprimer les lignes existantes non lettrées
-        self.allocation_line_ids.filtered(lambda l: l.state == 'draft').unlink()
-
-        invoices = self._get_unpaid_invoices()
-        if not invoices:
-            return
+        payments.allocation_line_ids.filtered(lambda l: l.state == 'draft').unlink()
 
-        # Créer les lignes avec payment_id
-        for invoice in invoices:
-            if invoice and invoice.exists() and invoice.id:
-                try:
-                    self.env['payment.allocation.line'].create({
-                        'payment_id': self.id,
-                        'invoice_id': invoice.id,
-                        'allocated_amount': 0.0,
-                    })
-                    _logger.info(f"Created allocation line for invoice {invoice.name}")
-                except Exception as e:
-                    _logger.error(f"Error creating allocation line: {str(e)}")
+        vals_list = []
+        for payment in payments:
+            invoices = payment._get_unpaid_invoices()
+            if not invoices:
+                continue
+            if payment.auto_allocate and payment.amount > 0:
+                amounts = _fifo_split(invoices.mapped('amount_residual'), payment.amount, payment.currency_id)
+            else:
+                amounts = [0.0] * len(invoices)
+            vals_list += [{
+                'payment_id': payment.id,
+                'invoice_id': invoice.id,
+                'allocated_amount': amount,
+            } for invoice, amount in zip(invoices, amounts)]
+
+        if vals_list:
+            self.env['payment.allocation.line'].create(vals_list)
+            _logger.info(f"Created {len(vals_list)} allocation lines for {len(payments)} payment(s)")
 
     def _compute_allocation_amounts(self):
         """Calcule uniquement les montants alloués sans toucher aux factures"""
-        try:
-            if not self.allocation_line_ids or self.amount <= 0:
+        for payment in self:
+            lines = payment.allocation_line_ids
+            if not lines:
+                continue
+            residuals = [line.invoice_id.amount_residual if line.invoice_id else 0.0 for line in lines]
+            if payment.amount > 0:
+                amounts = _fifo_split(residuals, payment.amount, payment.currency_id)
+            else:
                 # Remise à zéro des montants alloués
-                for line in self.allocation_line_ids:
-                    line.allocated_amount = 0.0
-                return
-
-            remaining_amount = self.amount
-
-            # Répartition sur les lignes existantes
-            for line in self.allocation_line_ids:
-                if remaining_amount <= 0:
-                    line.allocated_amount = 0.0
-                    continue
-
-                # S'assurer qu'on a bien l'invoice_id
-                if line.invoice_id:
-                    # Montant à allouer = minimum entre le restant dû et le montant disponible
-                    amount_to_allocate = min(line.invoice_id.amount_residual, remaining_amount)
-                    line.allocated_amount = amount_to_allocate
-                    remaining_amount -= amount_to_allocate
-                else:
-                    line.allocated_amount = 0.0
-
-        except Exception as e:
-            _logger.error(f"Erreur lors du calcul de la répartition: {str(e)}")
+                amounts = [0.0] * len(lines)
+
+            if not payment.id:
+                # Onchange : affectation directe sur les lignes en mémoire
+                for line, amount in zip(lines, amounts):
+                    line.allocated_amount = amount
+                continue
+
+            # Une écriture par montant distinct, uniquement pour les lignes modifiées
+            lines_by_amount = {}
+            for line, amount in zip(lines, amounts):
+                if line.currency_id.compare_amounts(line.allocated_amount, amount) != 0:
+                    lines_by_amount.setdefault(amount, []).append(line.id)
+            for amount, line_ids in lines_by_amount.items():
+                self.env['payment.allocation.line'].browse(line_ids).write({'allocated_amount': amount})
 
     # ========== Override Methods ==========
     @api.model_create_multi
@@ -186,11 +204,8 @@ class AccountPayment(models.Model):
         """Override pour gérer la création avec les allocations"""
         payments = super().create(vals_list)
 
-        for payment in payments:
-            if payment.partner_id:
-                payment._create_allocation_lines_after_save()
-                if payment.amount > 0 and payment.auto_allocate:
-                    payment._compute_allocation_amounts()
+        # Lignes créées directement avec leur répartition FIFO
+        payments._create_allocation_lines_after_save()
 
         return payments
 
@@ -201,19 +216,13 @@ class AccountPayment(models.Model):
             res = super().write(vals)
 
             # Recréer les lignes pour les paiements en brouillon
-            for payment in self:
-                if payment.state == 'draft' and payment.partner_id:
-                    payment._create_allocation_lines_after_save()
-                    if payment.amount > 0 and payment.auto_allocate:
-                        payment._compute_allocation_amounts()
+            self.filtered(lambda p: p.state == 'draft')._create_allocation_lines_after_save()
             return res
 
         # Si on change le montant
         elif 'amount' in vals:
             res = super().write(vals)
-            for payment in self:
-                if payment.state == 'draft' and payment.auto_allocate:
-                    payment._compute_allocation_amounts()
+            self.filtered(lambda p: p.state == 'draft' and p.auto_allocate)._compute_allocation_amounts()
             return res
         else:
             return super().write(vals)
@@ -277,31 +286,91 @@ class AccountPayment(models.Model):
         if not payment_move_line:
             raise UserError(_("Impossible de trouver l'écriture de paiement à lettrer."))
 
-        # Lettrage avec chaque facture selon l'allocation
-        for allocation in self.allocation_line_ids:
-            if allocation.allocated_amount <= 0:
-                continue
-
-            invoice = allocation.invoice_id
+        payment_move_line = payment_move_line[:1]
 
-            # Recherche de la ligne à lettrer dans la facture
-            invoice_move_line = invoice.line_ids.filtered(
-                lambda l: l.account_id == account and not l.reconciled
-            )
+        # Lettrage facture par facture, dans l'ordre FIFO de la répartition et
+        # pour le montant alloué à chacune, via reconcile() pour garder ses
+        # contrôles, le lettrage complet et les écarts de change
+        allocations = self.allocation_line_ids.filtered(
+            lambda a: a.state != 'reconciled'
+            and a.currency_id.compare_amounts(a.allocated_amount, 0) > 0
+        )
+        if allocations:
+            payment_residual = self._get_line_residual_in_payment_currency(payment_move_line)
+            if self.currency_id.compare_amounts(sum(allocations.mapped('allocated_amount')), payment_residual) > 0:
+                raise UserError(_(
+                    "Le total alloué dépasse le montant restant à lettrer du paiement %s.", self.name))
 
-            if invoice_move_line:
-                # Lettrage partiel ou total
-                try:
-                    (payment_move_line + invoice_move_line).reconcile()
-                    # Mise à jour du statut de l'allocation
-                    allocation.write({'state': 'reconciled'})
-                except Exception as e:
-                    _logger.error(f"Erreur lors du lettrage: {str(e)}")
+            try:
+                with self.env.cr.savepoint():
+                    for allocation in allocations:
+                        self._reconcile_allocation(allocation, payment_move_line)
+            except Exception as e:
+                _logger.exception("Erreur lors du lettrage du paiement %s", self.name)
+                raise UserError(_("Le lettrage du paiement %(payment)s a échoué : %(error)s",
+                                  payment=self.name, error=e)) from e
+            allocations.write({'state': 'reconciled'})
 
         # Gestion du surplus si nécessaire
         if self.remaining_amount > 0:
             self._create_payment_surplus_move()
 
+    def _get_line_residual_in_payment_currency(self, move_line):
+        """Reste à lettrer (positif) d'une écriture, dans la devise du paiement"""
+        self.ensure_one()
+        if move_line.currency_id == self.currency_id:
+            return abs(move_line.amount_residual_currency)
+        return self.company_id.currency_id._convert(
+            abs(move_line.amount_residual), self.currency_id, self.company_id, self.date)
+
+    def _reconcile_allocation(self, allocation, payment_move_line):
+        """Lettre la facture de l'allocation avec le paiement pour
+        `allocated_amount` exactement"""
+        self.ensure_one()
+        invoice = allocation.invoice_id
+        invoice_move_lines = invoice.line_ids.filtered(
+            lambda l: l.account_id == payment_move_line.account_id
+            and not l.reconciled
+            # Une écriture du même sens que le paiement ne peut pas être lettrée avec lui
+            and (l.balance > 0) != (payment_move_line.balance > 0)
+        )
+        invoice_residual = sum(
+            self._get_line_residual_in_payment_currency(line) for line in invoice_move_lines)
+        compare = self.currency_id.compare_amounts(allocation.allocated_amount, invoice_residual)
+        if compare > 0:
+            raise UserError(_(
+                "Le montant alloué à %(invoice)s dépasse le reste à lettrer de la pièce. "
+                "Recalculez la répartition du paiement %(payment)s.",
+                invoice=invoice.name, payment=self.name))
+
+        lines = payment_move_line | invoice_move_lines
+        if compare == 0:
+            # Facture soldée : reconcile() s'arrête de lui-même à son reste dû
+            lines.reconcile()
+            return
+        # Allocation partielle : le reste du paiement est limité au montant alloué
+        # le temps du lettrage, sans écart de change sur ce lettrage incomplet
+        with self._limit_line_residual(payment_move_line, allocation.allocated_amount):
+            lines.with_context(no_exchange_difference=True).reconcile()
+
+    @contextmanager
+    def _limit_line_residual(self, move_line, amount):
+        """Limite en cache le reste à lettrer de `move_line` à `amount` (devise
+        du paiement) ; les vraies valeurs sont recalculées en sortie"""
+        self.ensure_one()
+        company = self.company_id
+        # Lecture préalable : un recalcul en attente écraserait la limite
+        sign = -1 if move_line.amount_residual < 0 else 1
+        amount_company = self.currency_id._convert(amount, company.currency_id, company, self.date)
+        amount_currency = self.currency_id._convert(amount, move_line.currency_id, company, self.date)
+        cache = self.env.cache
+        cache.set(move_line, move_line._fields['amount_residual'], sign * amount_company)
+        cache.set(move_line, move_line._fields['amount_residual_currency'], sign * amount_currency)
+        try:
+            yield
+        finally:
+            move_line.invalidate_recordset(['amount_residual', 'amount_residual_currency'])
+
     def _cancel_allocation(self):
         """Annule toutes les allocations et délettrage les écritures"""
         self.ensure_one()
@@ -170,10 +170,9 @@ class PaymentAllocationLine(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         """Override pour logging et validation"""
-        for vals in vals_list:
-            _logger.info(f"Creating allocation line with values: {vals}")
-            if not vals.get('invoice_id'):
-                _logger.warning("Tentative de création d'une ligne sans invoice_id")
+        missing_invoice = [vals for vals in vals_list if not vals.get('invoice_id')]
+        if missing_invoice:
+            _logger.warning(f"Tentative de création de {len(missing_invoice)} ligne(s) sans invoice_id")
 
         return super().create(vals_list)
 
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la répartition FIFO des paiements (adi_smart_payment_dispatch).
+Crée 1 000 factures client ouvertes, puis mesure la création et la validation
+d'un paiement global qui les solde. Toutes les données sont annulées à la fin.
+À exécuter via: odoo-bin shell -c /path/to/odoo.conf -d database_name < benchmark_payment_dispatch.py
+"""
+
+import time
+
+NB_FACTURES = 1000
+MONTANT_FACTURE = 150.0
+
+print("=" * 80)
+print("BENCHMARK RÉPARTITION DES PAIEMENTS - %s factures" % NB_FACTURES)
+print("=" * 80)
+
+partner = env['res.partner'].create({'name': 'Benchmark Client Marché', 'customer_rank': 1})
+income_account = env['account.account'].search([
+    ('company_id', '=', env.company.id),
+    ('account_type', '=', 'income'),
+], limit=1)
+
+# 1. Créer et valider les factures ouvertes
+start = time.time()
+invoices = env['account.move'].create([{
+    'move_type': 'out_invoice',
+    'partner_id': partner.id,
+    'invoice_date': '2024-01-01',
+    'invoice_line_ids': [(0, 0, {
+        'name': 'Ticket %s' % index,
+        'quantity': 1,
+        'price_unit': MONTANT_FACTURE,
+        'account_id': income_account.id,
+        'tax_ids': [(5, 0, 0)],
+    })],
+} for index in range(NB_FACTURES)])
+invoices.action_post()
+print("\n✓ %s factures créées et validées en %.2fs" % (len(invoices), time.time() - start))
+
+# 2. Paiement global couvrant toutes les factures sauf la moitié de la dernière
+amount = NB_FACTURES * MONTANT_FACTURE - MONTANT_FACTURE / 2
+env.cr.execute("SELECT COUNT(*) FROM account_partial_reconcile")
+partials_before = env.cr.fetchone()[0]
+
+start = time.time()
+payment = env['account.payment'].create({
+    'payment_type': 'inbound',
+    'partner_type': 'customer',
+    'partner_id': partner.id,
+    'amount': amount,
+})
+duration_create = time.time() - start
+print("✓ Paiement créé avec %s lignes d'allocation en %.2fs" % (len(payment.allocation_line_ids), duration_create))
+
+start = time.time()
+payment.action_post()
+env.flush_all()
+duration_post = time.time() - start
+
+env.cr.execute("SELECT COUNT(*) FROM account_partial_reconcile")
+partials = env.cr.fetchone()[0] - partials_before
+invoices.invalidate_recordset(['payment_state'])
+print("✓ Paiement validé et lettré en %.2fs (%s lettrages partiels)" % (duration_post, partials))
+print("  - factures payées : %s" % len(invoices.filtered(lambda i: i.payment_state in ('paid', 'in_payment'))))
+print("  - factures partielles : %s" % len(invoices.filtered(lambda i: i.payment_state == 'partial')))
+print("  - montant alloué : %s / %s" % (payment.total_allocated, payment.amount))
+
+print("\n" + "=" * 80)
+print("TOTAL création + validation : %.2fs" % (duration_create + duration_post))
+print("=" * 80)
+
+# Ne rien conserver en base
+env.cr.rollback()
@@ -2,7 +2,7 @@
 {
     'name': 'Warehouse Restrictions App',
     'author': 'Edge Technologies',
-    'version': '17.0.1.2',
+    'version': '17.0.1.3',
     'live_test_url':'https://youtu.be/WM2Y9NZy3U8',
     "images":['static/description/main_screenshot.png'],
     'summary': 'Warehouse user Restrictions user warehouse Restriction for user warehouse location restrict location on warehouse location Restrictions Warehouse Stock Restriction Warehouse Stock location Restriction inventory Restriction inventory location Restriction ',
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api,_
+from odoo import models, fields, api, tools, _
 from datetime import datetime,date
 from odoo.exceptions import AccessError, UserError, RedirectWarning, ValidationError
 
+# Fields used by the record rules: changing them bumps the user's restriction stamp
+WAREHOUSE_RESTRICTION_FIELDS = ('available_location_ids', 'available_warehouse_ids', 'picking_type_ids')
+
 
 class ResUsers(models.Model):
 	_inherit = "res.users"
@@ -15,23 +18,58 @@ class ResUsers(models.Model):
 	available_location_ids = fields.Many2many('stock.location', string='Allowed Locations')
 	available_warehouse_ids = fields.Many2many('stock.warehouse', string='Allowed Warehouse')
 
-	def write(self, vals):
-		if 'available_location_ids' in vals:
-			self.env['ir.model.access'].call_cache_clearing_methods()
-			self.env['ir.rule'].clear_caches()
+	restriction_location_ids = fields.Many2many('stock.location', string='Allowed Locations (with children)',
+		compute='_compute_allowed_restrictions', compute_sudo=True)
+	restriction_warehouse_ids = fields.Many2many('stock.warehouse', string='Allowed Warehouses (with locations)',
+		compute='_compute_allowed_restrictions', compute_sudo=True)
+	warehouse_restriction_stamp = fields.Integer(string="Warehouse Restriction Version", readonly=True, copy=False)
 
-		if 'picking_type_ids' in vals:
-			self.env['ir.model.access'].call_cache_clearing_methods()
-			self.env['ir.rule'].clear_caches()
+	@api.depends('available_location_ids', 'available_warehouse_ids', 'warehouse_restriction_stamp')
+	def _compute_allowed_restrictions(self):
+		for user in self:
+			location_ids, warehouse_ids = user._get_allowed_restriction_ids()
+			user.restriction_location_ids = self.env['stock.location'].browse(location_ids)
+			user.restriction_warehouse_ids = self.env['stock.warehouse'].browse(warehouse_ids)
 
-		if 'available_warehouse_ids' in vals:
-			self.env['ir.model.access'].call_cache_clearing_methods()
-			self.env['ir.rule'].clear_caches()
+	@tools.ormcache('self.id', 'self.warehouse_restriction_stamp')
+	def _get_allowed_restriction_ids(self):
+		""" Return the allowed location ids (with their children) and warehouse
+			ids (selected ones and those whose stock location is allowed) as
+			sorted tuples, cached per user and restriction stamp.
+		"""
+		self.ensure_one()
+		user = self.sudo()
+		location_ids = ()
+		if user.available_location_ids:
+			location_ids = tuple(sorted(self.env['stock.location'].sudo().with_context(active_test=False).search([
+				('id', 'child_of', user.available_location_ids.ids),
+			]).ids))
+		warehouse_ids = set(user.available_warehouse_ids.ids)
+		if location_ids:
+			warehouse_ids.update(self.env['stock.warehouse'].sudo().with_context(active_test=False).search([
+				('lot_stock_id', 'in', location_ids),
+			]).ids)
+		return location_ids, tuple(sorted(warehouse_ids))
 
-		self.env['ir.model.access'].call_cache_clearing_methods()
-		self.env['ir.rule'].clear_caches()
+	def _bump_warehouse_restriction_stamp(self):
+		""" Invalidate the cached restrictions of these users only: the stamp
+			is part of the cache keys of the allowed sets and of the record
+			rules domains, so the other users' entries stay valid.
+		"""
+		if not self:
+			return
+		self.env.cr.execute("""
+			UPDATE res_users
+			SET warehouse_restriction_stamp = COALESCE(warehouse_restriction_stamp, 0) + 1
+			WHERE id IN %s
+		""", [tuple(self.ids)])
+		self.invalidate_recordset(['warehouse_restriction_stamp'])
 
-		return super(ResUsers, self).write(vals)
+	def write(self, vals):
+		res = super(ResUsers, self).write(vals)
+		if any(field in vals for field in WAREHOUSE_RESTRICTION_FIELDS):
+			self._bump_warehouse_restriction_stamp()
+		return res
 
 
 	@api.onchange('restrict_location','restrict_warehouse_operation','restrict_stock_warehouse_operation')
@@ -42,3 +80,54 @@ class ResUsers(models.Model):
 			self.picking_type_ids = [(6, 0, [])]
 		if self.restrict_stock_warehouse_operation == False:
 			self.available_warehouse_ids = [(6, 0, [])]
+
+
+class IrRule(models.Model):
+	_inherit = 'ir.rule'
+
+	def _compute_domain_context_values(self):
+		# The rules domains read the user's restrictions: add the restriction
+		# stamp to the cache key instead of clearing the whole rules cache.
+		yield from super(IrRule, self)._compute_domain_context_values()
+		yield self.env.user.warehouse_restriction_stamp
+
+
+class StockLocation(models.Model):
+	_inherit = 'stock.location'
+
+	def _bump_parent_restrictions(self):
+		users = self.env['res.users'].sudo().with_context(active_test=False).search([
+			('available_location_ids', 'parent_of', self.ids),
+		])
+		users._bump_warehouse_restriction_stamp()
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		locations = super(StockLocation, self).create(vals_list)
+		locations._bump_parent_restrictions()
+		return locations
+
+	def write(self, vals):
+		if 'location_id' in vals:
+			# Users allowed on the former parents lose these locations
+			self._bump_parent_restrictions()
+		res = super(StockLocation, self).write(vals)
+		if 'location_id' in vals:
+			self._bump_parent_restrictions()
+		return res
+
+
+class StockWarehouse(models.Model):
+	_inherit = 'stock.warehouse'
+
+	@api.model_create_multi
+	def create(self, vals_list):
+		warehouses = super(StockWarehouse, self).create(vals_list)
+		warehouses.lot_stock_id._bump_parent_restrictions()
+		return warehouses
+
+	def write(self, vals):
+		res = super(StockWarehouse, self).write(vals)
+		if 'lot_stock_id' in vals:
+			self.lot_stock_id._bump_parent_restrictions()
+		return res
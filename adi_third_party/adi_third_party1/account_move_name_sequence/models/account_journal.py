@@ -32,15 +32,36 @@ class AccountJournal(models.Model):
         domain="[('company_id', '=', company_id)]",
         help="This sequence will be used to generate the journal entry number for refunds.",
     )
+    sequence_late_locking = fields.Boolean(
+        string="Number Entries at Commit",
+        help="Draw the entry number at the end of the posting transaction "
+        "instead of when the entry is posted. No-gap sequences lock their "
+        "counter until the transaction ends, so this shortens the time "
+        "concurrent postings on this journal wait for each other. Until the "
+        "end of the transaction the entry has a temporary name.",
+    )
     # Redefine the default to True as <=v13.0
     refund_sequence = fields.Boolean(default=True)
     # has_sequence_holes is not relevant anymore (since based on sequence_prefix/number)
     # -> compute=False to improve perf and to avoid displaying warning
     has_sequence_holes = fields.Boolean(compute=False)
 
-    @api.constrains("refund_sequence_id", "sequence_id")
+    @api.constrains(
+        "refund_sequence_id",
+        "sequence_id",
+        "sequence_late_locking",
+        "restrict_mode_hash_table",
+    )
     def _check_journal_sequence(self):
         for journal in self:
+            if journal.sequence_late_locking and journal.restrict_mode_hash_table:
+                raise ValidationError(
+                    _(
+                        "On journal '%s', entries can not be numbered at commit "
+                        "when they are locked with a hash at posting.",
+                        journal.display_name,
+                    )
+                )
             if (
                 journal.refund_sequence_id
                 and journal.sequence_id
@@ -2,8 +2,14 @@
 # @author: Alexis de Lattre <alexis.delattre@akretion.com>
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl).
 
+from collections import defaultdict
+
 from odoo import api, fields, models
 
+# Temporary name of the moves numbered at the end of the transaction, see
+# account.journal.sequence_late_locking
+LATE_NAME_PREFIX = "/~"
+
 
 class AccountMove(models.Model):
     _inherit = "account.move"
@@ -29,33 +35,108 @@ class AccountMove(models.Model):
 
     @api.depends("state", "journal_id", "date")
     def _compute_name_by_sequence(self):
+        to_number = defaultdict(lambda: self.browse())
+        to_number_late = self.browse()
         for move in self:
             name = move.name or "/"
             # I can't use posted_before in this IF because
             # posted_before is set to True in _post() at the same
             # time as state is set to "posted"
+            # A late placeholder left by a post then reset to draft in the
+            # same transaction was never numbered: number it again
             if (
                 move.state == "posted"
-                and (not move.name or move.name == "/")
+                and (
+                    not move.name
+                    or move.name == "/"
+                    or move.name.startswith(LATE_NAME_PREFIX)
+                )
                 and move.journal_id
                 and move.journal_id.sequence_id
             ):
-                if (
-                    move.move_type in ("out_refund", "in_refund")
-                    and move.journal_id.type in ("sale", "purchase")
-                    and move.journal_id.refund_sequence
-                    and move.journal_id.refund_sequence_id
-                ):
-                    seq = move.journal_id.refund_sequence_id
+                if move.journal_id.sequence_late_locking and move.id:
+                    # Unique placeholder, replaced by the real number
+                    # right before the transaction is committed
+                    name = LATE_NAME_PREFIX + str(move.id)
+                    to_number_late |= move
                 else:
-                    seq = move.journal_id.sequence_id
-                # next_by_id(date) only applies on ir.sequence.date_range selection
-                # => we use with_context(ir_sequence_date=date).next_by_id()
-                # which applies on ir.sequence.date_range selection AND prefix
-                name = seq.with_context(ir_sequence_date=move.date).next_by_id()
+                    to_number[(move._get_name_sequence(), move.date)] |= move
             move.name = name
+        # Draw the numbers of each sequence and date at once, in a stable
+        # order of sequences to avoid deadlocks between concurrent postings
+        for (seq, date), moves in sorted(
+            to_number.items(), key=lambda item: (item[0][0].id, item[0][1])
+        ):
+            # next_batch_by_id(count, date) applies on ir.sequence.date_range
+            # selection AND prefix, like next_by_id() with ir_sequence_date
+            names = seq.next_batch_by_id(len(moves), sequence_date=date)
+            for move, name in zip(moves, names):
+                move.name = name
+        if to_number_late:
+            to_number_late._register_late_sequence_numbering()
         self._inverse_name()
 
+    def _get_name_sequence(self):
+        self.ensure_one()
+        journal = self.journal_id
+        if (
+            self.move_type in ("out_refund", "in_refund")
+            and journal.type in ("sale", "purchase")
+            and journal.refund_sequence
+            and journal.refund_sequence_id
+        ):
+            return journal.refund_sequence_id
+        return journal.sequence_id
+
+    def _register_late_sequence_numbering(self):
+        """Number the moves when the transaction is flushed before commit.
+
+        The no_gap sequence row stays locked from the moment a number is
+        drawn until the end of the transaction, so drawing it at the very end
+        lets concurrent postings on the same journal run in parallel."""
+        precommit = self.env.cr.precommit
+        move_ids = precommit.data.get("account_move_name_sequence.late_moves")
+        if move_ids is None:
+            move_ids = precommit.data["account_move_name_sequence.late_moves"] = set()
+            precommit.add(self._number_late_moves)
+        move_ids.update(self.ids)
+
+    @api.model
+    def _number_late_moves(self):
+        move_ids = self.env.cr.precommit.data.pop(
+            "account_move_name_sequence.late_moves", set()
+        )
+        moves = (
+            self.sudo()
+            .browse(move_ids)
+            .exists()
+            .filtered(
+                lambda m: m.state == "posted"
+                and (m.name or "").startswith(LATE_NAME_PREFIX)
+            )
+        )
+        if not moves:
+            return
+        to_number = defaultdict(lambda: self.sudo().browse())
+        for move in moves:
+            to_number[(move._get_name_sequence(), move.date)] |= move
+        for (seq, date), seq_moves in sorted(
+            to_number.items(), key=lambda item: (item[0][0].id, item[0][1])
+        ):
+            names = seq.next_batch_by_id(len(seq_moves), sequence_date=date)
+            for move, name in zip(seq_moves, names):
+                placeholder = move.name
+                vals = {"name": name}
+                # The invoice reference computed in _post() is the move name
+                if move.payment_reference == placeholder:
+                    vals["payment_reference"] = name
+                move.write(vals)
+                move.line_ids.filtered(lambda line: line.name == placeholder).write(
+                    {"name": name}
+                )
+        # precommit hooks run after the flush of the transaction
+        self.env.flush_all()
+
     # We must by-pass this constraint of sequence.mixin
     def _constrains_date_sequence(self):
         return True
@@ -88,6 +169,16 @@ class AccountMove(models.Model):
         self.flush_recordset()
         return super()._post(soft=soft)
 
+    def button_draft(self):
+        res = super().button_draft()
+        # The precommit hook skips the moves that are not posted any more
+        late_moves = self.filtered(
+            lambda m: (m.name or "").startswith(LATE_NAME_PREFIX)
+        )
+        if late_moves:
+            late_moves.name = "/"
+        return res
+
     def _compute_name(self):
         """Overwrite account module method in order to
         avoid side effect if legacy code call it directly
@@ -1,3 +1,4 @@
 from . import test_account_move_name_seq
 from . import test_sequence_concurrency
 from . import test_account_incoming_supplier_invoice
+from . import test_sequence_benchmark
@@ -348,3 +348,67 @@ class TestAccountMoveNameSequence(TransactionCase):
         self.assertEqual(invoice.name, "/", "name based on journal instead of sequence")
         invoice.action_post()
         self.assertIn("TB2CSEQ/", invoice.name, "name was not based on sequence")
+
+    def _create_misc_moves(self, count):
+        return self.env["account.move"].create(
+            [
+                {
+                    "date": self.date,
+                    "journal_id": self.misc_journal.id,
+                    "line_ids": [
+                        (0, 0, {"account_id": self.account1.id, "debit": 10}),
+                        (0, 0, {"account_id": self.account2.id, "credit": 10}),
+                    ],
+                }
+                for __ in range(count)
+            ]
+        )
+
+    def _expected_misc_names(self, numbers):
+        seq = self.misc_journal.sequence_id
+        prefix = seq.prefix.replace("%(range_year)s", str(self.date.year))
+        return [prefix + str(number).zfill(seq.padding) for number in numbers]
+
+    def test_next_batch_by_id(self):
+        seq = self.misc_journal.sequence_id
+        names = seq.next_batch_by_id(3, sequence_date=self.date)
+        next_name = seq.with_context(ir_sequence_date=self.date).next_by_id()
+        self.assertEqual(names + [next_name], self._expected_misc_names(range(1, 5)))
+        self.assertEqual(seq.next_batch_by_id(0), [])
+
+    def test_misc_moves_batch_post(self):
+        moves = self._create_misc_moves(3)
+        moves.action_post()
+        self.assertEqual(moves.mapped("name"), self._expected_misc_names(range(1, 4)))
+
+    def test_misc_move_late_locking(self):
+        self.misc_journal.sequence_late_locking = True
+        moves = self._create_misc_moves(2)
+        moves.action_post()
+        for move in moves:
+            self.assertTrue(move.name.startswith("/~"))
+        # the numbers are drawn by the precommit hooks
+        self.env.cr.flush()
+        self.assertEqual(moves.mapped("name"), self._expected_misc_names(range(1, 3)))
+        for move in moves:
+            self.assertEqual(set(move.line_ids.mapped("move_name")), {move.name})
+
+    def test_misc_move_late_locking_reset_to_draft(self):
+        self.misc_journal.sequence_late_locking = True
+        moves = self._create_misc_moves(2)
+        moves.action_post()
+        moves[0].button_draft()
+        self.assertEqual(moves[0].name, "/")
+        moves[0].action_post()
+        moves[1].button_draft()
+        self.env.cr.flush()
+        self.assertEqual(moves[0].name, self._expected_misc_names(range(1, 2))[0])
+        self.assertEqual(moves[1].name, "/")
+        moves[1].action_post()
+        self.env.cr.flush()
+        self.assertEqual(moves[1].name, self._expected_misc_names(range(2, 3))[0])
+
+    def test_late_locking_hash_restrict(self):
+        self.misc_journal.restrict_mode_hash_table = True
+        with self.assertRaises(ValidationError):
+            self.misc_journal.sequence_late_locking = True
@@ -0,0 +1,84 @@
+import logging
+import time
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install", "test_move_sequence_benchmark")
+class TestSequenceBenchmark(TransactionCase):
+    """Throughput of the numbering of journal entries posted in bulk"""
+
+    MOVE_COUNT = 300
+
+    def setUp(self):
+        super().setUp()
+        self.company = self.env.ref("base.main_company")
+        self.journal = self.env["account.journal"].create(
+            {
+                "name": "Test Journal Move name seq benchmark",
+                "code": "ADLB",
+                "type": "general",
+                "company_id": self.company.id,
+            }
+        )
+        self.accounts = self.env["account.account"].search(
+            [("company_id", "=", self.company.id)], limit=2
+        )
+        self.date = fields.Date.today()
+
+    def _create_moves(self, count):
+        return self.env["account.move"].create(
+            [
+                {
+                    "date": self.date,
+                    "journal_id": self.journal.id,
+                    "line_ids": [
+                        (0, 0, {"account_id": self.accounts[0].id, "debit": 10}),
+                        (0, 0, {"account_id": self.accounts[1].id, "credit": 10}),
+                    ],
+                }
+                for __ in range(count)
+            ]
+        )
+
+    def _log_throughput(self, label, count, elapsed):
+        _logger.info(
+            "%s: %s numbers in %.3fs (%.0f/s)",
+            label,
+            count,
+            elapsed,
+            count / elapsed if elapsed else float("inf"),
+        )
+
+    def test_benchmark_sequence_allocation(self):
+        seq = self.journal.sequence_id.with_context(ir_sequence_date=self.date)
+        start = time.perf_counter()
+        single_names = [seq.next_by_id() for __ in range(self.MOVE_COUNT)]
+        self._log_throughput("next_by_id", self.MOVE_COUNT, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch_names = seq.next_batch_by_id(self.MOVE_COUNT, sequence_date=self.date)
+        self._log_throughput(
+            "next_batch_by_id", self.MOVE_COUNT, time.perf_counter() - start
+        )
+        self.assertEqual(len(set(single_names + batch_names)), 2 * self.MOVE_COUNT)
+        self.assertEqual(
+            int(batch_names[0].rsplit("/", 1)[1]),
+            int(single_names[-1].rsplit("/", 1)[1]) + 1,
+        )
+
+    def test_benchmark_bulk_post(self):
+        moves = self._create_moves(self.MOVE_COUNT)
+        self.env.flush_all()
+        start = time.perf_counter()
+        moves.action_post()
+        self.env.flush_all()
+        self._log_throughput("bulk posting", self.MOVE_COUNT, time.perf_counter() - start)
+        names = moves.mapped("name")
+        self.assertEqual(len(set(names)), self.MOVE_COUNT)
+        numbers = sorted(int(name.rsplit("/", 1)[1]) for name in names)
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + self.MOVE_COUNT)))
@@ -306,6 +306,41 @@ class TestSequenceConcurrency(TransactionCase):
                     env2, partner=self.partner2, ir_sequence_standard=True
                 )
 
+    def _set_late_locking(self, journal_id, value):
+        with self._new_cr() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env["account.journal"].browse(journal_id).sequence_late_locking = value
+            env.cr.commit()
+
+    def test_sequence_concurrency_93_invoices_late_locking(self):
+        """Posting concurrent invoices on a no_gap journal numbered at commit
+        should not wait for the sequence lock"""
+        with self._new_cr() as cr0, self._new_cr() as cr1, self._new_cr() as cr2:
+            env0 = api.Environment(cr0, SUPERUSER_ID, {})
+            env1 = api.Environment(cr1, SUPERUSER_ID, {})
+            env2 = api.Environment(cr2, SUPERUSER_ID, {})
+            for cr in [cr0, cr1, cr2]:
+                # Set 10s timeout in order to avoid waiting for release locks a long time
+                cr.execute("SET LOCAL statement_timeout = '10s'")
+
+            # Create "last move" to lock
+            invoice = self._create_invoice_form(env0)
+            journal = invoice.journal_id
+            self.assertEqual(journal.sequence_id.implementation, "no_gap")
+            journal.sequence_late_locking = True
+            self.addCleanup(self._clean_moves, invoice.ids)
+            self.addCleanup(self._set_late_locking, journal.id, False)
+            env0.cr.commit()
+            invoice1 = self._create_invoice_form(env1)
+            # Using another partner to bypass "increase_rank" lock error
+            invoice2 = self._create_invoice_form(env2, partner=self.partner2)
+            self.assertTrue(invoice1.name.startswith("/~"))
+            self.assertTrue(invoice2.name.startswith("/~"))
+            # Only the end of the transaction takes the sequence lock
+            env1.cr.flush()
+            self.assertFalse(invoice1.name.startswith("/~"))
+            self.assertEqual(invoice1.payment_reference, invoice1.name)
+
     @tools.mute_logger("odoo.sql_db")
     def test_sequence_concurrency_95_pay2inv_inv2pay(self):
         """Creating concurrent payment then invoice and invoice then payment
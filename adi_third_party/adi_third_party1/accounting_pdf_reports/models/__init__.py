@@ -1,3 +1,5 @@
 from . import account_account_type
 from . import account_financial_report
 from . import account_move_line
+from . import account_balance_snapshot
+from . import account_move
@@ -0,0 +1,277 @@
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, models, fields
+from odoo.osv import expression
+from odoo.tools import date_utils, split_every
+from odoo.tools.safe_eval import safe_eval
+
+SNAPSHOT_PARAM = 'accounting_pdf_reports.balance_snapshot_ready'
+# precommit data key holding the snapshot keys to recompute
+PENDING_KEYS = 'accounting_pdf_reports.balance_snapshot_keys'
+
+# Context keys of _query_get that snapshots cannot answer: the report then
+# falls back to the plain query over account_move_line.
+UNSUPPORTED_FILTERS = (
+    'aged_balance', 'reconcile_date', 'account_tag_ids', 'analytic_tag_ids',
+    'analytic_account_ids', 'partner_categories',
+)
+
+UPSERT_CLAUSE = """
+    ON CONFLICT (date, company_id, account_id, journal_id, COALESCE(partner_id, 0))
+    DO UPDATE SET debit = EXCLUDED.debit, credit = EXCLUDED.credit
+"""
+
+
+class AccountBalanceSnapshot(models.Model):
+    _name = "account.balance.snapshot"
+    _description = "Account Balance Snapshot"
+    _log_access = False
+
+    date = fields.Date('Period', required=True, index=True,
+                       help="First day of the month aggregated by this snapshot.")
+    company_id = fields.Many2one('res.company', 'Company', required=True, ondelete='cascade')
+    account_id = fields.Many2one('account.account', 'Account', required=True, ondelete='cascade', index=True)
+    journal_id = fields.Many2one('account.journal', 'Journal', required=True, ondelete='cascade')
+    partner_id = fields.Many2one('res.partner', 'Partner', ondelete='cascade')
+    debit = fields.Float('Debit')
+    credit = fields.Float('Credit')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS account_balance_snapshot_key_uniq
+            ON account_balance_snapshot (date, company_id, account_id, journal_id, COALESCE(partner_id, 0))
+        """)
+
+    def _is_ready(self):
+        return self.env['ir.config_parameter'].sudo().get_param(SNAPSHOT_PARAM) == 'True'
+
+    @api.model
+    def _get_line_keys(self, lines):
+        """ Snapshot keys (month, company, account, journal, partner) of the
+            posted lines among `lines`, read from their current values.
+        """
+        return {
+            (date_utils.start_of(line.date, 'month'), line.company_id.id, line.account_id.id,
+             line.journal_id.id, line.partner_id.id or 0)
+            for line in lines
+            if line.parent_state == 'posted' and line.date and line.account_id and line.journal_id
+        }
+
+    @api.model
+    def _mark_lines(self, lines):
+        """ Register the snapshots of `lines` to be recomputed from the
+            journal items when the transaction is flushed before commit.
+            Called before and after any change of posted lines, so both the
+            old and the new keys get recomputed.
+        """
+        if not lines or not self._is_ready():
+            return
+        keys = self._get_line_keys(lines)
+        if not keys:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_KEYS)
+        if pending is None:
+            pending = precommit.data[PENDING_KEYS] = set()
+            precommit.add(self._refresh_pending)
+        pending.update(keys)
+
+    @api.model
+    def _refresh_pending(self):
+        keys = self.env.cr.precommit.data.pop(PENDING_KEYS, None)
+        if keys:
+            self._refresh_keys(keys)
+
+    @api.model
+    def _refresh_keys(self, keys):
+        """ Recompute the snapshots of `keys` from the posted journal items.
+            Snapshots are rewritten rather than shifted by deltas, so a key
+            recomputed twice, or concurrently, can never drift.
+        """
+        self.env['account.move.line'].flush_model(
+            ['date', 'company_id', 'account_id', 'journal_id', 'partner_id', 'debit', 'credit',
+             'display_type', 'parent_state'])
+        for chunk in split_every(1000, sorted(keys)):
+            keys_query = "WITH keys (date, company_id, account_id, journal_id, partner_id) AS (VALUES " + \
+                ", ".join(["(%s::date, %s, %s, %s, %s)"] * len(chunk)) + ") "
+            params = [value for key in chunk for value in key]
+            # upsert: two transactions creating the same key must not collide
+            self.env.cr.execute(keys_query + """
+                INSERT INTO account_balance_snapshot (date, company_id, account_id, journal_id, partner_id, debit, credit)
+                SELECT k.date, k.company_id, k.account_id, k.journal_id, NULLIF(k.partner_id, 0),
+                       COALESCE(SUM(aml.debit), 0), COALESCE(SUM(aml.credit), 0)
+                FROM keys k
+                LEFT JOIN account_move_line aml
+                  ON aml.company_id = k.company_id AND aml.account_id = k.account_id
+                 AND aml.journal_id = k.journal_id AND COALESCE(aml.partner_id, 0) = k.partner_id
+                 AND aml.date >= k.date AND aml.date < k.date + interval '1 month'
+                 AND aml.parent_state = 'posted'
+                 AND (aml.display_type IS NULL OR aml.display_type NOT IN ('line_section', 'line_note'))
+                GROUP BY k.date, k.company_id, k.account_id, k.journal_id, k.partner_id
+                """ + UPSERT_CLAUSE, params)
+            # keys left without any posted line
+            self.env.cr.execute(keys_query + """
+                DELETE FROM account_balance_snapshot s USING keys k
+                WHERE s.date = k.date AND s.company_id = k.company_id AND s.account_id = k.account_id
+                  AND s.journal_id = k.journal_id AND COALESCE(s.partner_id, 0) = k.partner_id
+                  AND s.debit = 0 AND s.credit = 0
+            """, params)
+
+    @api.model
+    def _rebuild(self):
+        """ Recompute every snapshot from the posted journal items. """
+        self.env.flush_all()
+        self.env.cr.precommit.data.pop(PENDING_KEYS, None)
+        self.env.cr.execute("""
+            INSERT INTO account_balance_snapshot (date, company_id, account_id, journal_id, partner_id, debit, credit)
+            SELECT date_trunc('month', aml.date)::date, aml.company_id, aml.account_id,
+                   aml.journal_id, aml.partner_id, SUM(aml.debit), SUM(aml.credit)
+            FROM account_move_line aml
+            WHERE (aml.display_type IS NULL OR aml.display_type NOT IN ('line_section', 'line_note'))
+              AND aml.parent_state = 'posted'
+            GROUP BY 1, 2, 3, 4, 5
+            """ + UPSERT_CLAUSE)
+        self.env.cr.execute("""
+            DELETE FROM account_balance_snapshot s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM account_move_line aml
+                WHERE aml.company_id = s.company_id AND aml.account_id = s.account_id
+                  AND aml.journal_id = s.journal_id AND aml.partner_id IS NOT DISTINCT FROM s.partner_id
+                  AND aml.date >= s.date AND aml.date < s.date + interval '1 month'
+                  AND aml.parent_state = 'posted'
+                  AND (aml.display_type IS NULL OR aml.display_type NOT IN ('line_section', 'line_note'))
+            )
+        """)
+        self.env['ir.config_parameter'].sudo().set_param(SNAPSHOT_PARAM, 'True')
+
+    @api.model
+    def _cron_rebuild(self):
+        self._rebuild()
+
+    def _get_company_ids(self):
+        context = self._context
+        if context.get('company_id'):
+            return [context['company_id']]
+        if context.get('allowed_company_ids'):
+            return self.env.companies.ids
+        return [self.env.company.id]
+
+    def _can_use_snapshots(self):
+        context = self._context
+        if not self._is_ready():
+            return False
+        if (context.get('state') or '').lower() != 'posted':
+            return False
+        if any(context.get(key) for key in UNSUPPORTED_FILTERS):
+            return False
+        # without strict_range, _query_get also keeps the lines before
+        # date_from of the accounts including their initial balance
+        if context.get('date_from') and not context.get('strict_range'):
+            return False
+        if self._has_line_rules_beyond_company():
+            return False
+        return set(self._get_company_ids()) <= set(self.env.companies.ids)
+
+    def _has_line_rules_beyond_company(self):
+        """ Whether a record rule restricts account.move.line on anything
+            but the company: _query_get applies it, the snapshots cannot.
+        """
+        if self.env.su:
+            return False
+        IrRule = self.env['ir.rule']
+        eval_context = IrRule._eval_context()
+        for rule in IrRule._get_rules('account.move.line').sudo():
+            domain = safe_eval(rule.domain_force, eval_context) if rule.domain_force else []
+            for term in expression.normalize_domain(domain):
+                if expression.is_leaf(term) and term != expression.TRUE_LEAF and term[0] != 'company_id':
+                    return True
+        return False
+
+    def _read_live_balances(self, accounts, date_from, date_to):
+        """ Sums the journal items of `accounts` between the two dates with
+            the regular _query_get filters, used for partial months.
+        """
+        context = dict(self._context, date_from=date_from, date_to=date_to,
+                       strict_range=True, initial_bal=False)
+        tables, where_clause, where_params = self.env['account.move.line'].with_context(context)._query_get()
+        tables = tables.replace('"', '') if tables else "account_move_line"
+        wheres = [""]
+        if where_clause.strip():
+            wheres.append(where_clause.strip())
+        filters = " AND ".join(wheres)
+        request = ("SELECT account_id AS id, COALESCE(SUM(debit), 0) AS debit, COALESCE(SUM(credit), 0) AS credit"
+                   " FROM " + tables + " WHERE account_id IN %s " + filters + " GROUP BY account_id")
+        self.env.cr.execute(request, (tuple(accounts.ids),) + tuple(where_params))
+        return self.env.cr.dictfetchall()
+
+    def _read_snapshot_balances(self, accounts, period_from, period_to):
+        context = self._context
+        request = ("SELECT account_id AS id, SUM(debit) AS debit, SUM(credit) AS credit"
+                   " FROM account_balance_snapshot WHERE account_id IN %s AND company_id IN %s")
+        params = [tuple(accounts.ids), tuple(self._get_company_ids())]
+        if period_from:
+            request += " AND date >= %s"
+            params.append(period_from)
+        if period_to:
+            request += " AND date <= %s"
+            params.append(period_to)
+        if context.get('journal_ids'):
+            request += " AND journal_id IN %s"
+            params.append(tuple(context['journal_ids']))
+        if context.get('account_ids'):
+            request += " AND account_id IN %s"
+            params.append(tuple(context['account_ids'].ids))
+        if context.get('partner_ids'):
+            request += " AND partner_id IN %s"
+            params.append(tuple(context['partner_ids'].ids))
+        self.env.cr.execute(request + " GROUP BY account_id", params)
+        return self.env.cr.dictfetchall()
+
+    @api.model
+    def _get_account_balances(self, accounts):
+        """ compute the debit, credit and balance of the provided accounts from
+            the monthly snapshots, completed with the journal items of the
+            partial months at both ends of the period.
+            :Returns a dictionary {account_id: {'debit', 'credit', 'balance'}}
+             or None when the context cannot be answered from the snapshots.
+        """
+        if not accounts or not self._can_use_snapshots():
+            return None
+        self.env['account.move.line'].check_access_rights('read')
+        # changes of this transaction are not committed yet
+        self._refresh_pending()
+
+        date_from = fields.Date.to_date(self._context.get('date_from'))
+        date_to = fields.Date.to_date(self._context.get('date_to'))
+        if self._context.get('initial_bal') and date_from:
+            # same as _query_get: lines before date_from, still bounded by date_to
+            initial_to = date_from - relativedelta(days=1)
+            date_from, date_to = False, min(date_to, initial_to) if date_to else initial_to
+
+        period_from = period_to = False
+        if date_from:
+            period_from = date_utils.start_of(date_from, 'month')
+            if period_from != date_from:
+                period_from += relativedelta(months=1)
+        if date_to:
+            period_to = date_utils.start_of(date_to, 'month')
+            if date_utils.end_of(date_to, 'month') != date_to:
+                period_to -= relativedelta(months=1)
+        if period_from and period_to and period_from > period_to:
+            # no full month in the period: the plain query is cheap enough
+            return None
+
+        rows = self._read_snapshot_balances(accounts, period_from, period_to)
+        if date_from and date_from < period_from:
+            rows += self._read_live_balances(accounts, date_from, period_from - relativedelta(days=1))
+        if date_to and date_to > date_utils.end_of(period_to, 'month'):
+            rows += self._read_live_balances(accounts, period_to + relativedelta(months=1), date_to)
+
+        res = {}
+        for row in rows:
+            values = res.setdefault(row['id'], {'debit': 0.0, 'credit': 0.0})
+            values['debit'] += row['debit'] or 0.0
+            values['credit'] += row['credit'] or 0.0
+        for values in res.values():
+            values['balance'] = values['debit'] - values['credit']
+        return res
@@ -0,0 +1,59 @@
+from odoo import api, models
+
+# account.move.line fields part of a snapshot key or amount
+SNAPSHOT_LINE_FIELDS = {
+    'date', 'company_id', 'account_id', 'journal_id', 'partner_id', 'move_id',
+    'debit', 'credit', 'balance', 'amount_currency', 'currency_id', 'display_type',
+}
+# account.move fields propagated to the key of its lines
+SNAPSHOT_MOVE_FIELDS = {'date', 'company_id', 'journal_id', 'partner_id'}
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        self.env['account.balance.snapshot'].sudo()._mark_lines(posted.line_ids)
+        return posted
+
+    def button_draft(self):
+        posted = self.filtered(lambda move: move.state == 'posted')
+        self.env['account.balance.snapshot'].sudo()._mark_lines(posted.line_ids)
+        return super().button_draft()
+
+    def write(self, vals):
+        if not SNAPSHOT_MOVE_FIELDS.intersection(vals):
+            return super().write(vals)
+        snapshot = self.env['account.balance.snapshot'].sudo()
+        snapshot._mark_lines(self.line_ids)
+        res = super().write(vals)
+        snapshot._mark_lines(self.line_ids)
+        return res
+
+    def unlink(self):
+        self.env['account.balance.snapshot'].sudo()._mark_lines(self.line_ids)
+        return super().unlink()
+
+
+class AccountMoveLine(models.Model):
+    _inherit = "account.move.line"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['account.balance.snapshot'].sudo()._mark_lines(lines)
+        return lines
+
+    def write(self, vals):
+        if not SNAPSHOT_LINE_FIELDS.intersection(vals):
+            return super().write(vals)
+        snapshot = self.env['account.balance.snapshot'].sudo()
+        snapshot._mark_lines(self)
+        res = super().write(vals)
+        snapshot._mark_lines(self)
+        return res
+
+    def unlink(self):
+        self.env['account.balance.snapshot'].sudo()._mark_lines(self)
+        return super().unlink()
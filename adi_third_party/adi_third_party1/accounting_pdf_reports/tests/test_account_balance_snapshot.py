@@ -0,0 +1,134 @@
+from datetime import date
+
+from odoo import Command
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests import tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAccountBalanceSnapshot(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.snapshot = cls.env['account.balance.snapshot']
+        cls.snapshot._rebuild()
+        cls.account_revenue = cls.company_data['default_account_revenue']
+        cls.account_expense = cls.company_data['default_account_expense']
+        cls.accounts = cls.account_revenue | cls.account_expense
+        cls.date_from = date(2024, 1, 10)
+        cls.date_to = date(2024, 12, 20)
+
+    def _create_move(self, move_date, amount, post=True):
+        move = self.env['account.move'].create({
+            'move_type': 'entry',
+            'date': move_date,
+            'journal_id': self.company_data['default_journal_misc'].id,
+            'line_ids': [
+                Command.create({
+                    'account_id': self.account_expense.id,
+                    'partner_id': self.partner_a.id,
+                    'debit': amount,
+                    'credit': 0.0,
+                }),
+                Command.create({
+                    'account_id': self.account_revenue.id,
+                    'debit': 0.0,
+                    'credit': amount,
+                }),
+            ],
+        })
+        if post:
+            move.action_post()
+        return move
+
+    def _assert_snapshot_matches_live(self, accounts=None, **context):
+        accounts = accounts or self.accounts
+        context = dict({
+            'state': 'posted',
+            'strict_range': True,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+        }, **context)
+        snapshot = self.snapshot.with_context(context)
+        balances = snapshot._get_account_balances(accounts)
+        self.assertIsNotNone(balances, "The period should be answered from the snapshots")
+        tables, where_clause, where_params = self.env['account.move.line'].with_context(context)._query_get()
+        self.env.cr.execute(
+            "SELECT account_id, SUM(debit), SUM(credit) FROM " + tables.replace('"', '')
+            + " WHERE account_id IN %s AND " + where_clause + " GROUP BY account_id",
+            (tuple(accounts.ids),) + tuple(where_params))
+        live = {account_id: (debit, credit) for account_id, debit, credit in self.env.cr.fetchall()}
+        for account in accounts:
+            expected = live.get(account.id, (0.0, 0.0))
+            values = balances.get(account.id, {'debit': 0.0, 'credit': 0.0})
+            self.assertAlmostEqual(values['debit'], expected[0], msg=account.display_name)
+            self.assertAlmostEqual(values['credit'], expected[1], msg=account.display_name)
+
+    def test_post_and_reset_to_draft(self):
+        self._create_move(date(2024, 1, 5), 100.0)
+        self._create_move(date(2024, 3, 15), 200.0)
+        move = self._create_move(date(2024, 12, 25), 300.0)
+        self._assert_snapshot_matches_live()
+        move.button_draft()
+        self._create_move(date(2024, 6, 1), 50.0, post=False)
+        self._assert_snapshot_matches_live()
+
+    def test_posted_line_changes(self):
+        move = self._create_move(date(2024, 4, 10), 100.0)
+        self._assert_snapshot_matches_live()
+        expense_line = move.line_ids.filtered(lambda line: line.account_id == self.account_expense)
+        other_expense = self.account_expense.copy()
+        expense_line.account_id = other_expense
+        expense_line.partner_id = self.partner_b
+        self._assert_snapshot_matches_live(self.accounts | other_expense)
+
+    def test_statement_line_synchronization(self):
+        st_line = self.env['account.bank.statement.line'].create({
+            'journal_id': self.company_data['default_journal_bank'].id,
+            'date': date(2024, 5, 20),
+            'payment_ref': 'snapshot',
+            'amount': 100.0,
+        })
+        accounts = st_line.move_id.line_ids.account_id
+        self._assert_snapshot_matches_live(accounts)
+        st_line.amount = 150.0
+        self._assert_snapshot_matches_live(accounts)
+
+    def test_force_delete(self):
+        move = self._create_move(date(2024, 7, 1), 100.0)
+        self._assert_snapshot_matches_live()
+        move.with_context(force_delete=True).unlink()
+        self._assert_snapshot_matches_live()
+
+    def test_initial_balance(self):
+        self._create_move(date(2023, 11, 15), 100.0)
+        self._create_move(date(2024, 1, 5), 200.0)
+        self._assert_snapshot_matches_live(initial_bal=True)
+        # without date_from, the initial balance stops at date_to
+        self._assert_snapshot_matches_live(initial_bal=True, date_from=False, date_to=date(2023, 12, 31))
+
+    def test_rebuild_matches_incremental(self):
+        self._create_move(date(2024, 2, 14), 80.0)
+        self._create_move(date(2024, 2, 28), 20.0).button_draft()
+        self.snapshot._refresh_pending()
+        self.env.cr.execute("SELECT date, company_id, account_id, journal_id, partner_id, debit, credit"
+                            " FROM account_balance_snapshot ORDER BY 1, 2, 3, 4, 5")
+        incremental = self.env.cr.fetchall()
+        self.snapshot._rebuild()
+        self.env.cr.execute("SELECT date, company_id, account_id, journal_id, partner_id, debit, credit"
+                            " FROM account_balance_snapshot ORDER BY 1, 2, 3, 4, 5")
+        self.assertEqual(incremental, self.env.cr.fetchall())
+
+    def test_record_rule_beyond_company(self):
+        context = {'state': 'posted', 'strict_range': True,
+                   'date_from': self.date_from, 'date_to': self.date_to}
+        snapshot = self.snapshot.with_user(self.env.user).with_context(context)
+        self.assertTrue(snapshot._can_use_snapshots())
+        self.env['ir.rule'].create({
+            'name': 'Only partner A lines',
+            'model_id': self.env['ir.model']._get_id('account.move.line'),
+            'domain_force': "[('partner_id', '=', %s)]" % self.partner_a.id,
+        })
+        self.assertFalse(snapshot._can_use_snapshots(),
+                         "Snapshots cannot apply a rule on the partner")
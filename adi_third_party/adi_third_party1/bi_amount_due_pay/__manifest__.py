@@ -3,7 +3,7 @@
 
 {
     'name': 'Customer Amount Due and Amount Pay Details',
-    'version': '17.0.0.0',
+    'version': '17.0.0.1',
     'category': 'Accounting',
     'summary': 'Customer Amount Due Customer Amount Pay Details on Partner Amount Due Partner Amount Pay Details on customer amount to pay on partner amount to pay on customer total amount due for customer total amount to pay on customer due amount on customer',
     'description' :"""
@@ -20,6 +20,7 @@
     'website': 'https://www.browseinfo.com',
     'depends': ['base', 'account', 'mail'],
     'data': [
+        'data/amount_due_snapshot_cron.xml',
         'views/models_view.xml',
     ],
     'demo': [],
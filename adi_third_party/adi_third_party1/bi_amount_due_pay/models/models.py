@@ -7,6 +7,11 @@ from dateutil.relativedelta import relativedelta
 import base64
 import vobject
 
+SNAPSHOT_PARAM = 'bi_amount_due_pay.amount_due_snapshot_ready'
+
+# account.move fields changing the amount due of its partner
+DUE_MOVE_FIELDS = {'state', 'partner_id', 'invoice_date_due', 'date'}
+
 class account_move(models.Model):
 	
 	_inherit = 'account.move'
@@ -28,53 +33,160 @@ class account_move(models.Model):
 	credit_amount = fields.Float(compute ='_get_credit',   string="Credit/paid")
 	result = fields.Float(compute ='_get_result',   string="Solde") #'balance' field is not the sames
 
-class Amountdue(models.Model):
-	_inherit='res.partner'
-
+	def write(self, vals):
+		if not DUE_MOVE_FIELDS.intersection(vals):
+			return super(account_move, self).write(vals)
+		partner_ids = set(self.partner_id.ids)
+		res = super(account_move, self).write(vals)
+		partner_ids.update(self.partner_id.ids)
+		self.env['res.partner']._register_amount_due_refresh(partner_ids)
+		return res
 
+class account_partial_reconcile(models.Model):
 
-	def _compute_amount_due(self):
-		user_id = self._uid		
-		current_date = fields.date.today()
+	_inherit = 'account.partial.reconcile'
 
-		for partner in self:
-			amount_due = amount_overdue = 0.0
-			supplier_amount_due = supplier_amount_overdue = 0.0
+	def _get_due_partner_ids(self):
+		return set((self.debit_move_id.move_id | self.credit_move_id.move_id).partner_id.ids)
 
-			balance_invoice_moves = self.env['account.move'].sudo().search([
-				('partner_id', '=', partner.id),
-				('move_type', 'in', ['out_invoice', 'out_refund', 'entry']),
-				('state', '=', 'posted')
-			])
+	@api.model_create_multi
+	def create(self, vals_list):
+		partials = super(account_partial_reconcile, self).create(vals_list)
+		self.env['res.partner']._register_amount_due_refresh(partials._get_due_partner_ids())
+		return partials
 
-			for aml in balance_invoice_moves:
-				date_maturity = aml.invoice_date_due or aml.date
-				amount_due += aml.result
-				if date_maturity and date_maturity <= current_date:
-					amount_overdue += aml.result
+	def unlink(self):
+		partner_ids = self._get_due_partner_ids()
+		res = super(account_partial_reconcile, self).unlink()
+		self.env['res.partner']._register_amount_due_refresh(partner_ids)
+		return res
 
-			partner.payment_amount_due_amt = amount_due
+class Amountdue(models.Model):
+	_inherit='res.partner'
 
-			supplier_invoice_moves = self.env['account.move'].sudo().search([
-				('partner_id', '=', partner.id),
-				('move_type', 'in', ['in_invoice', 'in_refund', 'entry']),
-				('state', '=', 'posted')
-			])
+	def _get_amount_due_query(self, partner_ids=None):
+		""" Returns the query summing the residual of the posted moves per
+			partner, and its parameters. The amount of a move is
+			abs(amount_residual_signed), the former result field; entries
+			count on both the customer and supplier side.
+			Columns: partner_id, due, overdue, supplier_due, supplier_overdue
+		"""
+		self.env['account.move'].flush_model(
+			['partner_id', 'move_type', 'state', 'amount_residual_signed', 'invoice_date_due', 'date'])
+		query = """
+			SELECT partner_id,
+				COALESCE(SUM(ABS(amount_residual_signed)) FILTER (
+					WHERE move_type IN ('out_invoice', 'out_refund', 'entry')), 0) AS due,
+				COALESCE(SUM(ABS(amount_residual_signed)) FILTER (
+					WHERE move_type IN ('out_invoice', 'out_refund', 'entry')
+					AND COALESCE(invoice_date_due, date) <= %(today)s), 0) AS overdue,
+				COALESCE(SUM(ABS(amount_residual_signed)) FILTER (
+					WHERE move_type IN ('in_invoice', 'in_refund', 'entry')), 0) AS supplier_due,
+				COALESCE(SUM(ABS(amount_residual_signed)) FILTER (
+					WHERE move_type IN ('in_invoice', 'in_refund', 'entry')
+					AND COALESCE(invoice_date_due, date) <= %(today)s), 0) AS supplier_overdue
+			FROM account_move
+			WHERE state = 'posted' AND partner_id IS NOT NULL
+		"""
+		params = {'today': fields.Date.context_today(self)}
+		if partner_ids is not None:
+			query += " AND partner_id IN %(partner_ids)s"
+			params['partner_ids'] = tuple(partner_ids)
+		return query + " GROUP BY partner_id", params
 
-			for aml in supplier_invoice_moves:
-				date_maturity = aml.invoice_date_due or aml.date
-				supplier_amount_due += aml.result
-				if date_maturity and date_maturity <= current_date:
-					supplier_amount_overdue += aml.result
+	def _compute_amount_due(self):
+		partner_ids = [partner_id for partner_id in self._origin.ids if partner_id]
+		amounts = {}
+		if partner_ids:
+			self.env.cr.execute(*self._get_amount_due_query(partner_ids))
+			amounts = {row[0]: row[1:] for row in self.env.cr.fetchall()}
 
+		for partner in self:
+			amount_due, amount_overdue, supplier_amount_due, supplier_amount_overdue = \
+				amounts.get(partner._origin.id, (0.0, 0.0, 0.0, 0.0))
+			partner.payment_amount_due_amt = amount_due
+			partner.payment_amount_overdue_amt = amount_overdue
 			partner.payment_amount_due_amt_supplier = supplier_amount_due
-			
-		
+			partner.payment_amount_overdue_amt_supplier = supplier_amount_overdue
+
 	supplier_invoice_ids = fields.One2many('account.move', 'partner_id', 'Supplier move lines', domain=[('move_type', 'in', ['in_invoice','in_refund','entry']),('state', 'in', ['posted'])]) 
 	balance_invoice_ids = fields.One2many('account.move', 'partner_id', 'Customer move lines', domain=[('move_type', 'in', ['out_invoice','out_refund','entry']),('state', 'in', ['posted'])]) 
 	payment_amount_due_amt = fields.Float(string ='Amount Due',compute ='_compute_amount_due')
+	payment_amount_overdue_amt = fields.Float(string='Amount Overdue', compute='_compute_amount_due')
 	payment_amount_due_amt_supplier = fields.Float(compute='_compute_amount_due', string="Montant à payer")
-
+	payment_amount_overdue_amt_supplier = fields.Float(compute='_compute_amount_due', string="Montant à payer échu")
+
+	# Optional stored copy of the amounts above, used to sort and filter the
+	# partner lists. Maintained only once the snapshot cron has run.
+	amount_due_snapshot = fields.Float('Amount Due (Stored)', readonly=True, copy=False)
+	amount_overdue_snapshot = fields.Float('Amount Overdue (Stored)', readonly=True, copy=False)
+	amount_due_supplier_snapshot = fields.Float('Amount To Pay (Stored)', readonly=True, copy=False)
+	amount_overdue_supplier_snapshot = fields.Float('Amount To Pay Overdue (Stored)', readonly=True, copy=False)
+
+	def _is_amount_due_snapshot_ready(self):
+		return self.env['ir.config_parameter'].sudo().get_param(SNAPSHOT_PARAM) == 'True'
+
+	@api.model
+	def _update_amount_due_snapshot(self, partner_ids=None):
+		""" Write the stored amounts of the given partners (all partners when
+			None) from one grouped query over the move residuals.
+		"""
+		amount_query, params = self._get_amount_due_query(partner_ids)
+		partner_filter = ""
+		if partner_ids is not None:
+			partner_filter = "AND p.id IN %(partner_ids)s"
+		# partners whose moves are all settled get back to zero
+		self.env.cr.execute("""
+			WITH amounts AS (""" + amount_query + """)
+			UPDATE res_partner p
+			SET amount_due_snapshot = COALESCE(a.due, 0),
+				amount_overdue_snapshot = COALESCE(a.overdue, 0),
+				amount_due_supplier_snapshot = COALESCE(a.supplier_due, 0),
+				amount_overdue_supplier_snapshot = COALESCE(a.supplier_overdue, 0)
+			FROM res_partner src
+			LEFT JOIN amounts a ON a.partner_id = src.id
+			WHERE p.id = src.id """ + partner_filter + """
+			AND (a.partner_id IS NOT NULL OR p.amount_due_snapshot != 0
+				OR p.amount_overdue_snapshot != 0 OR p.amount_due_supplier_snapshot != 0
+				OR p.amount_overdue_supplier_snapshot != 0)
+		""", params)
+		snapshot_fields = ['amount_due_snapshot', 'amount_overdue_snapshot',
+						   'amount_due_supplier_snapshot', 'amount_overdue_supplier_snapshot']
+		if partner_ids is None:
+			self.invalidate_model(snapshot_fields)
+		else:
+			self.browse(partner_ids).invalidate_recordset(snapshot_fields)
+
+	@api.model
+	def _register_amount_due_refresh(self, partner_ids):
+		""" Refresh the stored amounts of the partners at the end of the
+			transaction, once the residuals of their moves are recomputed.
+		"""
+		partner_ids = set(partner_ids) - {False}
+		if not partner_ids or not self._is_amount_due_snapshot_ready():
+			return
+		precommit = self.env.cr.precommit
+		pending = precommit.data.get('bi_amount_due_pay.partners')
+		if pending is None:
+			pending = precommit.data['bi_amount_due_pay.partners'] = set()
+			precommit.add(self._refresh_amount_due_snapshot)
+		pending.update(partner_ids)
+
+	@api.model
+	def _refresh_amount_due_snapshot(self):
+		partner_ids = self.env.cr.precommit.data.pop('bi_amount_due_pay.partners', set())
+		if partner_ids:
+			# precommit hooks run after the flush of the transaction
+			self.env.flush_all()
+			self._update_amount_due_snapshot(list(partner_ids))
+
+	@api.model
+	def _cron_rebuild_amount_due_snapshot(self):
+		""" Recompute the stored amounts of every partner. Run daily so the
+			overdue amounts follow the due dates.
+		"""
+		self._update_amount_due_snapshot()
+		self.env['ir.config_parameter'].sudo().set_param(SNAPSHOT_PARAM, 'True')
 
 	def action_view_amount_due(self):
 		self.ensure_one()
@@ -21,7 +21,7 @@
 ###############################################################################
 {
     'name': 'Stock Analysis By Location Report',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.1.1',
     'category': 'Warehouse',
     'summary': 'To view each products stock in each location',
     'description': """This module helps to get the stock positions in each """
@@ -34,6 +34,7 @@
     'depends': ['base', 'stock', 'product'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/stock_location_product_views.xml',
         'views/stock_location_product_variant_views.xml',
         'views/product_template_views.xml',
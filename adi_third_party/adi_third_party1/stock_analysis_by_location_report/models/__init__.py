@@ -21,5 +21,8 @@
 ###############################################################################
 from . import product_product
 from . import product_template
+# The summary table must exist before the report views selecting from it
+from . import stock_location_qty_summary
 from . import stock_location_product
 from . import stock_location_product_variant
+from . import stock_move
@@ -46,20 +46,14 @@ class StockLocationProduct(models.Model):
         creates a new view with the following columns for the Product model"""
         tools.drop_view_if_exists(self._cr, self._table)
         self._cr.execute(''' CREATE OR REPLACE VIEW %s AS (
-        SELECT row_number() OVER () AS id,
-        product_template.id AS product_id,
-        stock_location.id AS location_id,
-        SUM(stock_quant.quantity) AS on_hand_qty,
-        SUM(stock_quant.quantity + 
-         product_template.qty_incoming - product_template.qty_outgoing)
-         AS forecast_qty,
-        SUM(product_template.qty_incoming) AS qty_incoming,
-        SUM(product_template.qty_outgoing) AS qty_outgoing
-        FROM product_template
-        INNER JOIN product_product ON 
-        product_product.product_tmpl_id = product_template.id
-        INNER JOIN stock_quant ON stock_quant.product_id = product_product.id
-        INNER JOIN stock_location ON
-         stock_quant.location_id = stock_location.id
-        WHERE stock_location.usage = 'internal'
-        GROUP BY product_template.id, stock_location.id)''' % (self._table,))
+        SELECT MIN(summary.id) AS id,
+        summary.product_tmpl_id AS product_id,
+        summary.location_id AS location_id,
+        SUM(summary.on_hand_qty) AS on_hand_qty,
+        SUM(summary.on_hand_qty + summary.qty_incoming -
+         summary.qty_outgoing) AS forecast_qty,
+        SUM(summary.qty_incoming) AS qty_incoming,
+        SUM(summary.qty_outgoing) AS qty_outgoing
+        FROM stock_location_qty_summary summary
+        GROUP BY summary.product_tmpl_id, summary.location_id)''' % (
+            self._table,))
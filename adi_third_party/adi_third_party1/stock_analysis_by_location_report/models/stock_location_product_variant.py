@@ -48,18 +48,12 @@ class StockLocationProductVariant(models.Model):
         model"""
         tools.drop_view_if_exists(self._cr, self._table)
         self._cr.execute(''' CREATE OR REPLACE VIEW %s AS (
-        select row_number() OVER () as id, 
-        stock_quant.product_id, 
-        stock_quant.location_id, 
-        stock_quant.quantity on_hand_qty, 
-        (stock_quant.quantity + 
-         product_product.qty_incoming - product_product.qty_outgoing) 
-         AS forecast_qty, 
-        product_product.qty_incoming,
-        product_product.qty_outgoing from product_product 
-        inner JOIN stock_quant on stock_quant.product_id = product_product.id
-        inner join product_template on 
-        product_product.product_tmpl_id = product_template.id
-        inner join stock_location on 
-        stock_quant.location_id = stock_location.id
-        where stock_location.usage = 'internal')''' % (self._table,))
+        SELECT summary.id,
+        summary.product_id,
+        summary.location_id,
+        summary.on_hand_qty,
+        (summary.on_hand_qty + summary.qty_incoming - summary.qty_outgoing)
+         AS forecast_qty,
+        summary.qty_incoming,
+        summary.qty_outgoing
+        FROM stock_location_qty_summary summary)''' % (self._table,))
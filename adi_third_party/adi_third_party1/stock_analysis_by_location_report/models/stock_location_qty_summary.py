@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Nihala KP(odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU AFFERO
+#    GENERAL PUBLIC LICENSE (AGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU AFFERO GENERAL PUBLIC LICENSE (AGPL v3) for more details.
+#
+#    You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+#    (AGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+from odoo import api, fields, models
+
+PENDING_MOVE_STATES = ('waiting', 'confirmed', 'partially_available',
+                       'assigned')
+
+
+class StockLocationQtySummary(models.Model):
+    """ Per product variant and internal location quantity summary. Rows are
+    refreshed for the touched (product, location) pairs whenever a stock move
+    changes state, so that the reports never aggregate the whole quant table"""
+    _name = 'stock.location.qty.summary'
+    _description = "Product Location Quantity Summary"
+    _log_access = False
+
+    product_id = fields.Many2one('product.product', string="Product",
+                                 required=True, ondelete='cascade',
+                                 help='Product variant of the summary')
+    product_tmpl_id = fields.Many2one('product.template',
+                                      string="Product Template",
+                                      required=True, ondelete='cascade',
+                                      index=True,
+                                      help='Template of the product variant')
+    location_id = fields.Many2one('stock.location', string='Location',
+                                  required=True, ondelete='cascade',
+                                  index=True,
+                                  help='Internal location of the summary')
+    on_hand_qty = fields.Float(string='On Hand Quantity',
+                               help='Quantity of the quants in the location')
+    qty_incoming = fields.Float(string='Incoming Quantity',
+                                help='Quantity of the pending moves coming '
+                                     'to the location')
+    qty_outgoing = fields.Float(string='Outgoing Quantity',
+                                help='Quantity of the pending moves leaving '
+                                     'the location')
+
+    _sql_constraints = [
+        ('product_location_uniq', 'unique(product_id, location_id)',
+         'Only one summary per product and location.'),
+    ]
+
+    def init(self):
+        """Build the summary on install only; stock moves keep it up to date
+        afterwards and full rebuilds go through _refresh_all"""
+        self._cr.execute("SELECT 1 FROM stock_location_qty_summary LIMIT 1")
+        if not self._cr.fetchone():
+            self._refresh_all()
+
+    def _refresh_query(self, keys_query):
+        """ Return the upsert query recomputing the summary of the
+        (product_id, location_id) pairs selected by keys_query"""
+        return """
+        WITH keys AS (%s),
+        amounts AS (
+            SELECT keys.product_id, product_product.product_tmpl_id,
+            keys.location_id,
+            COALESCE((SELECT SUM(stock_quant.quantity) FROM stock_quant
+             WHERE stock_quant.product_id = keys.product_id
+             AND stock_quant.location_id = keys.location_id), 0)
+             AS on_hand_qty,
+            COALESCE((SELECT SUM(stock_move.product_qty) FROM stock_move
+             WHERE stock_move.product_id = keys.product_id
+             AND stock_move.location_dest_id = keys.location_id
+             AND stock_move.location_id != keys.location_id
+             AND stock_move.state IN %%(states)s), 0) AS qty_incoming,
+            COALESCE((SELECT SUM(stock_move.product_qty) FROM stock_move
+             WHERE stock_move.product_id = keys.product_id
+             AND stock_move.location_id = keys.location_id
+             AND stock_move.location_dest_id != keys.location_id
+             AND stock_move.state IN %%(states)s), 0) AS qty_outgoing
+            FROM keys
+            INNER JOIN product_product ON
+             product_product.id = keys.product_id
+            INNER JOIN stock_location ON
+             stock_location.id = keys.location_id
+            WHERE stock_location.usage = 'internal'
+        ),
+        purged AS (
+            DELETE FROM stock_location_qty_summary summary
+            USING amounts
+            WHERE summary.product_id = amounts.product_id
+            AND summary.location_id = amounts.location_id
+            AND amounts.on_hand_qty = 0 AND amounts.qty_incoming = 0
+            AND amounts.qty_outgoing = 0
+        )
+        INSERT INTO stock_location_qty_summary
+        (product_id, product_tmpl_id, location_id, on_hand_qty, qty_incoming,
+         qty_outgoing)
+        SELECT * FROM amounts
+        WHERE on_hand_qty != 0 OR qty_incoming != 0 OR qty_outgoing != 0
+        ON CONFLICT (product_id, location_id) DO UPDATE SET
+        on_hand_qty = EXCLUDED.on_hand_qty,
+        qty_incoming = EXCLUDED.qty_incoming,
+        qty_outgoing = EXCLUDED.qty_outgoing""" % keys_query
+
+    @api.model
+    def _refresh(self, keys):
+        """ Recompute the summary of the given (product_id, location_id)
+        pairs"""
+        keys = {key for key in keys if all(key)}
+        if not keys:
+            return
+        self.env['stock.quant'].flush_model(
+            ['product_id', 'location_id', 'quantity'])
+        self.env['stock.move'].flush_model(
+            ['product_id', 'location_id', 'location_dest_id', 'state',
+             'product_qty'])
+        product_ids, location_ids = zip(*keys)
+        self._cr.execute(self._refresh_query(
+            "SELECT * FROM unnest(%(product_ids)s::int[], "
+            "%(location_ids)s::int[]) AS k(product_id, location_id)"), {
+            'product_ids': list(product_ids),
+            'location_ids': list(location_ids),
+            'states': PENDING_MOVE_STATES,
+        })
+
+    @api.model
+    def _refresh_all(self):
+        """ Recompute the summary of every product and internal location"""
+        self.env.flush_all()
+        self._cr.execute("DELETE FROM stock_location_qty_summary")
+        self._cr.execute(self._refresh_query("""
+            SELECT product_id, location_id FROM stock_quant
+            UNION
+            SELECT product_id, location_id FROM stock_move
+             WHERE state IN %(states)s
+            UNION
+            SELECT product_id, location_dest_id FROM stock_move
+             WHERE state IN %(states)s"""), {'states': PENDING_MOVE_STATES})
+
+    @api.model
+    def _cron_refresh_all(self):
+        """ Full rebuild, run manually from the scheduled action"""
+        self._refresh_all()
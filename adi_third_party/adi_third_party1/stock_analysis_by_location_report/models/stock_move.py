@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+###############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Nihala KP(odoo@cybrosys.com)
+#
+#    You can modify it under the terms of the GNU AFFERO
+#    GENERAL PUBLIC LICENSE (AGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU AFFERO GENERAL PUBLIC LICENSE (AGPL v3) for more details.
+#
+#    You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+#    (AGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+###############################################################################
+from odoo import models
+
+SUMMARY_FIELDS = ('state', 'product_id', 'product_uom_qty', 'location_id',
+                  'location_dest_id')
+
+
+class StockMove(models.Model):
+    """Inherited stock move to keep the location quantity summary up to date
+    when moves change state"""
+    _inherit = 'stock.move'
+
+    def _get_summary_keys(self):
+        """Return the (product, location) pairs touched by the moves and their
+        move lines"""
+        keys = set()
+        for move in self:
+            keys.add((move.product_id.id, move.location_id.id))
+            keys.add((move.product_id.id, move.location_dest_id.id))
+            for line in move.move_line_ids:
+                keys.add((line.product_id.id, line.location_id.id))
+                keys.add((line.product_id.id, line.location_dest_id.id))
+        return keys
+
+    def write(self, vals):
+        """Refresh the summary of the locations of the moves before and after
+        the write"""
+        if not any(field in vals for field in SUMMARY_FIELDS):
+            return super().write(vals)
+        keys = self._get_summary_keys()
+        res = super().write(vals)
+        keys |= self._get_summary_keys()
+        self.env['stock.location.qty.summary']._refresh(keys)
+        return res
+
+
+class StockMoveLine(models.Model):
+    """Inherited stock move line to refresh the location quantity summary
+    when done lines are edited"""
+    _inherit = 'stock.move.line'
+
+    def write(self, vals):
+        """Done lines update the quants without any move state change"""
+        done_lines = self.filtered(lambda line: line.state == 'done')
+        if not done_lines or not any(
+                field in vals for field in ('quantity', 'location_id',
+                                            'location_dest_id')):
+            return super().write(vals)
+        keys = done_lines.move_id._get_summary_keys()
+        res = super().write(vals)
+        keys |= done_lines.move_id._get_summary_keys()
+        self.env['stock.location.qty.summary']._refresh(keys)
+        return res
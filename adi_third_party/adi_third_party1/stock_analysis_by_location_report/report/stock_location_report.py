@@ -33,76 +33,90 @@ class StockLocationReport(models.AbstractModel):
         value = self.query_data(data['report_type'], data['product_id'],
                                 data['product_variant_id'])
         grouped_data = {}
-        for product_id, group in (
-                groupby(value, key=lambda x: x['product']['en_US'])):
+        for product_id, group in groupby(value, key=lambda x: x['product']):
             grouped_data[product_id] = list(group)
         return {
             'grouped_data': grouped_data,
             'var': value
         }
 
-    def query_data(self, report_type, product_id, product_variant_id):
-        """ To fetch values from database using query"""
-
+    def query_data(self, report_type, product_id, product_variant_id,
+                   limit=None, after=None):
+        """ To fetch values from the location quantity summary, ordered by
+        product and location. When a limit is given, the rows following the
+        sort key `after` (the 'sort_key' of the last row of the previous
+        page) are returned."""
         if report_type == 'product':
-            query = """SELECT row_number() OVER () AS id,
-            product_template.name AS product,
+            product_key = 'summary.product_tmpl_id'
+            group_by = 'GROUP BY summary.product_tmpl_id, product_template.name, ' \
+                       'summary.location_id, stock_location.complete_name'
+            amounts = """SUM(summary.on_hand_qty) AS on_hand_qty,
+                SUM(summary.qty_incoming) AS qty_incoming,
+                SUM(summary.qty_outgoing) AS qty_outgoing"""
+            where = 'summary.product_tmpl_id = %(product_id)s' \
+                if product_id else 'TRUE'
+        else:
+            product_key = 'summary.product_id'
+            group_by = ''
+            amounts = """summary.on_hand_qty,
+                summary.qty_incoming,
+                summary.qty_outgoing"""
+            where = 'summary.product_id = %(product_variant_id)s' \
+                if product_variant_id else 'TRUE'
+        query = """SELECT * FROM (
+            SELECT COALESCE(product_template.name->>%(lang)s,
+             product_template.name->>'en_US') AS product,
             stock_location.complete_name AS location,
-            SUM(stock_quant.quantity) AS on_hand_qty,
-            SUM(stock_quant.quantity + 
-             product_template.qty_incoming - product_template.qty_outgoing) 
-             AS forecast_qty,
-            SUM(product_template.qty_incoming) AS qty_incoming,
-            SUM(product_template.qty_outgoing) AS qty_outgoing
-            FROM product_template 
-            INNER JOIN product_product ON 
-             product_product.product_tmpl_id = product_template.id
-            INNER JOIN stock_quant ON 
-             stock_quant.product_id = product_product.id
+            """ + product_key + """ AS product_key,
+            summary.location_id,
+            """ + amounts + """
+            FROM stock_location_qty_summary summary
+            INNER JOIN product_template ON
+             summary.product_tmpl_id = product_template.id
             INNER JOIN stock_location ON
-             stock_quant.location_id = stock_location.id
-            WHERE stock_location.usage = 'internal'
-            GROUP BY product_template.id, stock_location.id"""
-            if product_id:
-                query = """SELECT row_number() OVER () AS id,
-                product_template.name AS product,
-                stock_location.complete_name AS location,
-                SUM(stock_quant.quantity) AS on_hand_qty,
-                SUM(stock_quant.quantity +
-                 product_template.qty_incoming - product_template.qty_outgoing)
-                 AS forecast_qty,
-                SUM(product_template.qty_incoming) AS qty_incoming,
-                SUM(product_template.qty_outgoing) AS qty_outgoing
-                FROM product_template 
-                INNER JOIN product_product ON
-                 product_product.product_tmpl_id = product_template.id
-                INNER JOIN stock_quant ON
-                 stock_quant.product_id = product_product.id
-                INNER JOIN stock_location ON
-                 stock_quant.location_id = stock_location.id
-                WHERE stock_location.usage = 'internal' 
-                and product_template.id=%(product_id)s
-                GROUP BY product_template.id, stock_location.id"""
-        else:
-            query = """select product_template.name as Product,
-            stock_location.complete_name as Location,
-            stock_quant.quantity on_hand_qty, 
-            (stock_quant.quantity + 
-            product_product.qty_incoming - product_product.qty_outgoing)  
-             AS forecast_qty,  product_product.qty_incoming,
-            product_product.qty_outgoing from product_product 
-            inner JOIN stock_quant on 
-             stock_quant.product_id = product_product.id 
-            inner join product_template 
-             on product_product.product_tmpl_id = product_template.id
-            inner join stock_location on
-             stock_quant.location_id = stock_location.id
-            where stock_location.usage = 'internal'"""
-            if product_variant_id:
-                query += """ and product_id=%(product_variant_id)s"""
-        self.env.cr.execute(query,
-                            {'report_type': report_type,
-                             'product_id': product_id,
-                             'product_variant_id': product_variant_id,
-                             })
-        return self.env.cr.dictfetchall()
+             summary.location_id = stock_location.id
+            WHERE """ + where + """
+            """ + group_by + """
+            ) AS rows"""
+        if after:
+            query += """ WHERE (product, location, product_key, location_id)
+             > (%(after_product)s, %(after_location)s, %(after_key)s,
+             %(after_location_id)s)"""
+        query += " ORDER BY product, location, product_key, location_id"
+        if limit:
+            query += " LIMIT %(limit)s"
+        params = {
+            'lang': self.env.lang or 'en_US',
+            'product_id': product_id,
+            'product_variant_id': product_variant_id,
+            'limit': limit,
+        }
+        if after:
+            params.update({
+                'after_product': after[0],
+                'after_location': after[1],
+                'after_key': after[2],
+                'after_location_id': after[3],
+            })
+        self.env.cr.execute(query, params)
+        rows = self.env.cr.dictfetchall()
+        for row in rows:
+            row['forecast_qty'] = (row['on_hand_qty'] + row['qty_incoming'] -
+                                   row['qty_outgoing'])
+            row['sort_key'] = (row['product'], row['location'],
+                               row.pop('product_key'), row.pop('location_id'))
+        return rows
+
+    def iter_data(self, report_type, product_id, product_variant_id,
+                  page_size=2000):
+        """ Yield the report rows page by page, for exports of large
+        inventories"""
+        after = None
+        while True:
+            rows = self.query_data(report_type, product_id,
+                                   product_variant_id, limit=page_size,
+                                   after=after)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after = rows[-1]['sort_key']
@@ -20,9 +20,10 @@
 #
 ###############################################################################
 import io
+import itertools
 import json
 from odoo import fields, models, _
-from odoo.tools import date_utils, groupby
+from odoo.tools import date_utils
 
 try:
     from odoo.tools.misc import xlsxwriter
@@ -63,16 +64,12 @@ class StockLocation(models.TransientModel):
             None, data=data)
 
     def action_xlsx_report(self):
-        """ To print the XLSX report type"""
-        query = self.env[
-            'report.stock_analysis_by_location_report.report_stock_location'
-        ].query_data(
-            self.report_type, self.product_id.id, self.product_variant_id.id)
+        """ To print the XLSX report type. Only the filters are sent, the rows
+        are read page by page while writing the file"""
         data = {
             'report_type': self.report_type,
             'product_id': self.product_id.id,
             'product_variant_id': self.product_variant_id.id,
-            'var': query
         }
         return {
             'type': 'ir.actions.report',
@@ -87,11 +84,10 @@ class StockLocation(models.TransientModel):
 
     def get_xlsx_report(self, data, response):
         """To get the report values for xlsx report"""
-        query_result = data['var']
-        grouped_data = {}
-        for product_id, group in groupby(query_result,
-                                         key=lambda x: x['product']['en_US']):
-            grouped_data[product_id] = list(group)
+        rows = self.env[
+            'report.stock_analysis_by_location_report.report_stock_location'
+        ].iter_data(data['report_type'], data['product_id'],
+                    data['product_variant_id'])
         output = io.BytesIO()
         workbook = xlsxwriter.Workbook(output, {'in_memory': True})
         sheet = workbook.add_worksheet()
@@ -121,25 +117,23 @@ class StockLocation(models.TransientModel):
         sheet.write('E6', 'Outgoing Qty', grey_cell_format)
         sheet.write('F6', 'Forecast Qty', grey_cell_format)
         row = 6
-        for product_id, product_data in grouped_data.items():
+        # rows are sorted by product, so the lines of a product are
+        # consecutive even when they span several pages
+        for product_id, product_data in itertools.groupby(
+                rows, key=lambda x: x['product']):
+            totals = [0.0, 0.0, 0.0, 0.0]
             for data in product_data:
                 sheet.write(row, 0, product_id)
                 sheet.write(row, 1, data['location'])
-                sheet.write(row, 2, data['on_hand_qty'])
-                sheet.write(row, 3, data['qty_incoming'])
-                sheet.write(row, 4, data['qty_outgoing'])
-                sheet.write(row, 5, data['forecast_qty'])
+                for col, key in enumerate(('on_hand_qty', 'qty_incoming',
+                                           'qty_outgoing', 'forecast_qty')):
+                    sheet.write(row, col + 2, data[key])
+                    totals[col] += data[key]
                 row += 1
             sheet.write(row, 0, 'Total:', grey_cell_format)
             sheet.write(row, 1, '', grey_cell_format)
-            sheet.write(row, 2, sum(x['on_hand_qty'] for x in product_data),
-                        grey_cell_format)
-            sheet.write(row, 3, sum(x['qty_incoming'] for x in product_data),
-                        grey_cell_format)
-            sheet.write(row, 4, sum(x['qty_outgoing'] for x in product_data),
-                        grey_cell_format)
-            sheet.write(row, 5, sum(x['forecast_qty'] for x in product_data),
-                        grey_cell_format)
+            for col, total in enumerate(totals):
+                sheet.write(row, col + 2, total, grey_cell_format)
             row += 1
         workbook.close()
         output.seek(0)
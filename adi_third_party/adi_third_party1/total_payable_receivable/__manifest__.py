@@ -21,7 +21,7 @@
 ################################################################################
 {
     'name': 'Payable And Receivable Amount',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.2.0',
     'category': 'Accounting',
     'summary': """Amount Payable & Receivable In Partner Form""",
     'description': """Shows Amount Payable & Receivable In customer/vendor Form""",
@@ -31,6 +31,7 @@
     'website': 'https://www.cybrosys.com',
     'depends': ['sale', 'purchase'],
     'data': [
+        'security/ir.model.access.csv',
         'views/res_partner_views.xml',
     ],
     'images': ['static/description/banner.jpg'],
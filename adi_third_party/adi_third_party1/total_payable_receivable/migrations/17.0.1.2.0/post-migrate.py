@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """Rows written by the previous version while reading the totals may be
+    stale: recompute the whole cache."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['res.partner.balance.cache']._rebuild()
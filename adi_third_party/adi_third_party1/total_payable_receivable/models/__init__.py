@@ -20,3 +20,5 @@
 #
 ################################################################################
 from . import res_partner
+from . import res_partner_balance_cache
+from . import account_move
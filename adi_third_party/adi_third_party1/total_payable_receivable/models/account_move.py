@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Bhagyadev KP (odoo@cybrosys.com)
+#
+#    This program is free software: you can modify
+#    it under the terms of the GNU Affero General Public License (AGPL) as
+#    published by the Free Software Foundation, either version 3 of the
+#    License, or (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the GNU Affero General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, models
+
+# account.move.line fields changing the open items of a partner
+BALANCE_LINE_FIELDS = {'partner_id', 'account_id', 'company_id', 'debit',
+                       'credit', 'balance', 'amount_currency'}
+
+
+class AccountMove(models.Model):
+    """Inheriting account_move model"""
+    _inherit = 'account.move'
+
+    def _post(self, soft=True):
+        """Posting opens new receivable/payable items for the partners."""
+        posted = super()._post(soft=soft)
+        self.env['res.partner.balance.cache']._invalidate(
+            posted.line_ids.partner_id)
+        return posted
+
+    def button_draft(self):
+        """Resetting to draft removes the open items of the partners."""
+        self.env['res.partner.balance.cache']._invalidate(
+            self.line_ids.partner_id)
+        return super().button_draft()
+
+
+class AccountPartialReconcile(models.Model):
+    """Inheriting account_partial_reconcile model"""
+    _inherit = 'account.partial.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Reconciliation changes the residual amounts of the partners."""
+        partials = super().create(vals_list)
+        self.env['res.partner.balance.cache']._invalidate(
+            partials.debit_move_id.partner_id |
+            partials.credit_move_id.partner_id)
+        return partials
+
+    def unlink(self):
+        """Unreconciliation restores the residual amounts of the partners."""
+        self.env['res.partner.balance.cache']._invalidate(
+            self.debit_move_id.partner_id | self.credit_move_id.partner_id)
+        return super().unlink()
+
+
+class AccountMoveLine(models.Model):
+    """Inheriting account_move_line model"""
+    _inherit = 'account.move.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Lines added to posted moves open new items for the partners."""
+        lines = super().create(vals_list)
+        self.env['res.partner.balance.cache']._invalidate(
+            lines.filtered(lambda l: l.parent_state == 'posted').partner_id)
+        return lines
+
+    def write(self, vals):
+        """Partner, account or amount changes of posted lines move the open
+        items from one partner to another or change their residual."""
+        if not BALANCE_LINE_FIELDS.intersection(vals):
+            return super().write(vals)
+        partners = self.filtered(
+            lambda l: l.parent_state == 'posted').partner_id
+        res = super().write(vals)
+        partners |= self.filtered(
+            lambda l: l.parent_state == 'posted').partner_id
+        self.env['res.partner.balance.cache']._invalidate(partners)
+        return res
+
+    def unlink(self):
+        """Deleting posted lines (force_delete) removes their open items."""
+        self.env['res.partner.balance.cache']._invalidate(
+            self.filtered(lambda l: l.parent_state == 'posted').partner_id)
+        return super().unlink()
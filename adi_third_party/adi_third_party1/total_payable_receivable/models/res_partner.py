@@ -39,42 +39,12 @@ class ResPartner(models.Model):
     @api.depends_context('company')
     def _compute_partner_credit(self):
         """
-          Retrieve the total receivable and payable amounts from customers
-          for the current company.
+          Retrieve the total receivable and payable amounts of every partner
+          of the recordset for the current company, from the balance cache.
         """
-        tables, where_clause, where_params = (
-            self.env['account.move.line']._where_calc(
-                [('parent_state', '=', 'posted'),
-                 ('company_id', '=', self.env.company.id)]).get_sql())
-        where_params = [tuple(self.ids)] + where_params
-        if where_clause:
-            where_clause = 'AND ' + where_clause
-        self._cr.execute("""SELECT account_move_line.partner_id, a.account_type, 
-                      SUM(account_move_line.amount_residual)
-                      FROM """ + tables + """
-                      LEFT JOIN account_account a ON 
-                      (account_move_line.account_id=a.id)
-                      WHERE a.account_type IN 
-                      ('asset_receivable','liability_payable')
-                      AND account_move_line.partner_id IN %s
-                      AND account_move_line.reconciled IS FALSE
-                      """ + where_clause + """
-                      GROUP BY account_move_line.partner_id, a.account_type
-                      """, where_params)
-        treated = self.browse()
-        query = self.env.cr.dictfetchall()
-        for rec in query:
-            partner = self.browse(rec['partner_id'])
-            if rec['account_type'] == 'asset_receivable':
-                self.partner_credit = rec['sum']
-                if not self.partner_debit:
-                    self.partner_debit = False
-                treated |= partner
-            elif rec['account_type'] == 'liability_payable':
-                self.partner_debit = -rec['sum']
-                if not self.partner_credit:
-                    self.partner_credit = False
-                treated |= partner
-        remaining = (self - treated)
-        remaining.partner_debit = False
-        remaining.partner_credit = False
+        balances = self.env['res.partner.balance.cache']._get_balances(
+            self._origin.ids, self.env.company)
+        for partner in self:
+            receivable, payable = balances.get(partner._origin.id, (0.0, 0.0))
+            partner.partner_credit = receivable
+            partner.partner_debit = payable
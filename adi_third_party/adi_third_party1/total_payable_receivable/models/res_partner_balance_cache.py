@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>).
+#    Author: Bhagyadev KP (odoo@cybrosys.com)
+#
+#    This program is free software: you can modify
+#    it under the terms of the GNU Affero General Public License (AGPL) as
+#    published by the Free Software Foundation, either version 3 of the
+#    License, or (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the GNU Affero General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, fields, models
+
+# precommit data key holding the partners whose totals must be refreshed
+PENDING_PARTNERS = 'total_payable_receivable.partners'
+
+
+class ResPartnerBalanceCache(models.Model):
+    """Per-partner and per-company receivable and payable totals. Rows are
+    only written by the transactions changing the open items of a partner,
+    right before they commit; reading the totals never writes."""
+    _name = 'res.partner.balance.cache'
+    _description = 'Partner Receivable/Payable Cache'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', string='Partner',
+                                 required=True, ondelete='cascade',
+                                 index=True)
+    company_id = fields.Many2one('res.company', string='Company',
+                                 required=True, ondelete='cascade')
+    receivable = fields.Float(string='Receivable')
+    payable = fields.Float(string='Payable')
+
+    _sql_constraints = [
+        ('partner_company_uniq', 'unique(partner_id, company_id)',
+         'Only one cached balance per partner and company.'),
+    ]
+
+    def init(self):
+        """Fill the cache on install; later updates keep it in sync."""
+        self._cr.execute("SELECT 1 FROM res_partner_balance_cache LIMIT 1")
+        if not self._cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _get_balances(self, partner_ids, company):
+        """
+          Return {partner_id: (receivable, payable)} for the given partners.
+          Partners without cached totals are computed with a single grouped
+          query, without storing the result.
+        """
+        if not partner_ids:
+            return {}
+        self._cr.execute("""SELECT partner_id, receivable, payable
+                      FROM res_partner_balance_cache
+                      WHERE company_id = %s AND partner_id IN %s
+                      """, (company.id, tuple(partner_ids)))
+        # partners changed by this transaction are refreshed only at commit
+        pending = self.env.cr.precommit.data.get(PENDING_PARTNERS) or set()
+        balances = {row[0]: (row[1], row[2]) for row in self._cr.fetchall()
+                    if row[0] not in pending}
+        missing = [pid for pid in partner_ids if pid not in balances]
+        if missing:
+            balances.update(self._compute_balances(missing, company))
+        return balances
+
+    @api.model
+    def _compute_balances(self, partner_ids, company):
+        """Sum the unreconciled receivable and payable residuals of the
+        partners in one query."""
+        self.env['account.move.line'].flush_model(
+            ['partner_id', 'account_id', 'company_id', 'parent_state',
+             'amount_residual', 'reconciled'])
+        self._cr.execute("""SELECT aml.partner_id,
+                      SUM(CASE WHEN a.account_type = 'asset_receivable'
+                          THEN aml.amount_residual ELSE 0 END),
+                      -SUM(CASE WHEN a.account_type = 'liability_payable'
+                          THEN aml.amount_residual ELSE 0 END)
+                      FROM account_move_line aml
+                      JOIN account_account a ON (aml.account_id = a.id)
+                      WHERE a.account_type IN
+                      ('asset_receivable', 'liability_payable')
+                      AND aml.partner_id IN %s
+                      AND aml.company_id = %s
+                      AND aml.parent_state = 'posted'
+                      AND aml.reconciled IS FALSE
+                      GROUP BY aml.partner_id
+                      """, (tuple(partner_ids), company.id))
+        balances = dict.fromkeys(partner_ids, (0.0, 0.0))
+        for partner_id, receivable, payable in self._cr.fetchall():
+            balances[partner_id] = (receivable or 0.0, payable or 0.0)
+        return balances
+
+    def _store_balances_query(self, where_clause):
+        """Return the query writing the totals of every company for the
+        partners matching `where_clause` (on account_move_line aml)."""
+        return """INSERT INTO res_partner_balance_cache
+                      (partner_id, company_id, receivable, payable)
+                      SELECT aml.partner_id, aml.company_id,
+                      SUM(CASE WHEN a.account_type = 'asset_receivable'
+                          THEN aml.amount_residual ELSE 0 END),
+                      -SUM(CASE WHEN a.account_type = 'liability_payable'
+                          THEN aml.amount_residual ELSE 0 END)
+                      FROM account_move_line aml
+                      JOIN account_account a ON (aml.account_id = a.id)
+                      WHERE a.account_type IN
+                      ('asset_receivable', 'liability_payable')
+                      AND aml.partner_id IS NOT NULL
+                      AND aml.parent_state = 'posted'
+                      AND aml.reconciled IS FALSE
+                      AND """ + where_clause + """
+                      GROUP BY aml.partner_id, aml.company_id
+                      ON CONFLICT (partner_id, company_id) DO UPDATE
+                      SET receivable = EXCLUDED.receivable,
+                          payable = EXCLUDED.payable
+                      """
+
+    @api.model
+    def _refresh(self, partner_ids):
+        """Recompute the cached totals of the given partners in every
+        company. Partners left without open items get zero totals."""
+        if not partner_ids:
+            return
+        partner_ids = tuple(sorted(partner_ids))
+        self.env['account.move.line'].flush_model(
+            ['partner_id', 'account_id', 'company_id', 'parent_state',
+             'amount_residual', 'reconciled'])
+        self._cr.execute("""UPDATE res_partner_balance_cache
+                      SET receivable = 0, payable = 0
+                      WHERE partner_id IN %s""", (partner_ids,))
+        self._cr.execute(self._store_balances_query("aml.partner_id IN %s"),
+                         (partner_ids,))
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the cached totals of every partner."""
+        self.env.flush_all()
+        self._cr.execute("DELETE FROM res_partner_balance_cache")
+        self._cr.execute(self._store_balances_query("TRUE"))
+
+    @api.model
+    def _invalidate(self, partners):
+        """Refresh the totals of the given partners when the transaction is
+        flushed before commit, once their residuals are recomputed."""
+        partner_ids = set(partners.ids)
+        if not partner_ids:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_PARTNERS)
+        if pending is None:
+            pending = precommit.data[PENDING_PARTNERS] = set()
+            precommit.add(self._refresh_pending)
+        pending.update(partner_ids)
+
+    @api.model
+    def _refresh_pending(self):
+        partner_ids = self.env.cr.precommit.data.pop(PENDING_PARTNERS, None)
+        if partner_ids:
+            self._refresh(partner_ids)
@@ -19,7 +19,10 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 ###############################################################################
-from odoo import api, fields, models
+from odoo import fields, models
+
+# res.users fields read by the record rules of the restriction modules
+RESTRICTION_FIELDS = ('restrict_location', 'location_ids', 'allowed_warehouse_ids')
 
 
 class ResUsers(models.Model):
@@ -39,14 +42,13 @@ class ResUsers(models.Model):
                                 help="Indicates whether the user has warehouse"
                                      " location restrictions.")
 
-    @api.model
-    def create(self, vals):
-        self.clear_caches()
-        return super(ResUsers, self).create(vals)
-
     def write(self, vals):
-        self.clear_caches()
-        return super(ResUsers, self).write(vals)
+        """Record rules read the user's restricted locations and warehouses:
+        clear the caches only when those fields change."""
+        res = super(ResUsers, self).write(vals)
+        if any(field in vals for field in RESTRICTION_FIELDS):
+            self.env.registry.clear_cache()
+        return res
 
     def _compute_check_user(self):
         """To determine if the user has warehouse location restrictions.
@@ -7,3 +7,7 @@ from . import report
 
 def _pre_init_clean_m2m_models(env):
     env.cr.execute("""DROP TABLE IF EXISTS account_journal_account_report_partner_ledger_rel""")
+
+
+def _post_init_build_balance_snapshots(env):
+    env['account.balance.snapshot']._rebuild()
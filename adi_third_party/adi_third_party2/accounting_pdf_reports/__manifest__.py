@@ -2,7 +2,7 @@
 
 {
     'name': 'Odoo 17 Accounting Financial Reports',
-    'version': '17.0.1.3',
+    'version': '17.0.1.4',
     'category': 'Invoicing Management',
     'description': 'Accounting Reports For Odoo 17, Accounting Financial Reports, '
                    'Odoo 17 Financial Reports',
@@ -19,6 +19,7 @@
     'data': [
         'security/ir.model.access.csv',
         'data/account_account_type.xml',
+        'data/balance_snapshot_cron.xml',
         'views/menu.xml',
         'views/ledger_menu.xml',
         'views/financial_report.xml',
@@ -43,6 +44,7 @@
         'report/report_journal_entries.xml',
     ],
     'pre_init_hook': '_pre_init_clean_m2m_models',
+    'post_init_hook': '_post_init_build_balance_snapshots',
     'images': ['static/description/banner.gif'],
 }
 
@@ -0,0 +1,9 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """ The post-init hook only runs on install: build the balance snapshots
+        of databases upgrading to this version.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['account.balance.snapshot']._rebuild()
@@ -19,7 +19,10 @@ class ReportFinancial(models.AbstractModel):
         res = {}
         for account in accounts:
             res[account.id] = dict.fromkeys(mapping, 0.0)
-        if accounts:
+        snapshot_res = self.env['account.balance.snapshot']._get_account_balances(accounts)
+        if snapshot_res is not None:
+            res.update(snapshot_res)
+        elif accounts:
             tables, where_clause, where_params = self.env['account.move.line']._query_get()
             tables = tables.replace('"', '') if tables else "account_move_line"
             wheres = [""]
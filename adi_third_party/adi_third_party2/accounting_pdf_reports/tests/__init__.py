@@ -0,0 +1 @@
+from . import test_account_balance_snapshot
@@ -7,7 +7,7 @@ from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools import float_compare, float_is_zero
+from odoo.tools import float_compare, float_is_zero, groupby
 from markupsafe import Markup
 
 
@@ -205,12 +205,10 @@ class AccountAssetAsset(models.Model):
         if asset_type:
             type_domain = [('type', '=', asset_type)]
 
-        ungrouped_assets = self.env['account.asset.asset'].search(type_domain + [('state', '=', 'open'), ('category_id.group_entries', '=', False)])
-        created_move_ids += ungrouped_assets._compute_entries(date, group_entries=False)
-
-        for grouped_category in self.env['account.asset.category'].search(type_domain + [('group_entries', '=', True)]):
-            assets = self.env['account.asset.asset'].search([('state', '=', 'open'), ('category_id', '=', grouped_category.id)])
-            created_move_ids += assets._compute_entries(date, group_entries=True)
+        assets = self.env['account.asset.asset'].search(type_domain + [('state', '=', 'open')])
+        grouped_assets = assets.filtered(lambda asset: asset.category_id.group_entries)
+        created_move_ids += (assets - grouped_assets)._compute_entries(date, group_entries=False)
+        created_move_ids += grouped_assets._compute_entries(date, group_entries=True)
         return created_move_ids
 
     def _compute_board_amount(self, sequence, residual_amount, amount_to_depr,
@@ -260,74 +258,115 @@ class AccountAssetAsset(models.Model):
             undone_dotation_number += 1
         return undone_dotation_number
 
-    def compute_depreciation_board(self):
+    def _compute_depreciation_schedule(self, posted_depreciation_line_ids):
+        """ Return the values of the unposted depreciation lines of the asset,
+            following its posted lines.
+        """
         self.ensure_one()
+        schedule = []
+        if self.value_residual == 0.0:
+            return schedule
 
-        posted_depreciation_line_ids = self.depreciation_line_ids.filtered(lambda x: x.move_check).sorted(key=lambda l: l.depreciation_date)
-        unposted_depreciation_line_ids = self.depreciation_line_ids.filtered(lambda x: not x.move_check)
-
-        # Remove old unposted depreciation lines. We cannot use unlink() with One2many field
-        commands = [(2, line_id.id, False) for line_id in unposted_depreciation_line_ids]
-
-        if self.value_residual != 0.0:
-            amount_to_depr = residual_amount = self.value_residual
-
-            # if we already have some previous validated entries, starting date is last entry + method period
-            if posted_depreciation_line_ids and posted_depreciation_line_ids[-1].depreciation_date:
-                last_depreciation_date = fields.Date.from_string(posted_depreciation_line_ids[-1].depreciation_date)
-                depreciation_date = last_depreciation_date + relativedelta(months=+self.method_period)
-            else:
-                # depreciation_date computed from the purchase date
-                depreciation_date = self.date
-                if self.date_first_depreciation == 'last_day_period':
-                    # depreciation_date = the last day of the month
-                    depreciation_date = depreciation_date + relativedelta(day=31)
-                    # ... or fiscalyear depending the number of period
-                    if self.method_period == 12:
-                        depreciation_date = depreciation_date + relativedelta(month=int(self.company_id.fiscalyear_last_month))
-                        depreciation_date = depreciation_date + relativedelta(day=int(self.company_id.fiscalyear_last_day))
-                        if depreciation_date < self.date:
-                            depreciation_date = depreciation_date + relativedelta(years=1)
-                elif self.first_depreciation_manual_date and self.first_depreciation_manual_date != self.date:
-                    # depreciation_date set manually from the 'first_depreciation_manual_date' field
-                    depreciation_date = self.first_depreciation_manual_date
-            total_days = (depreciation_date.year % 4) and 365 or 366
-            month_day = depreciation_date.day
-            undone_dotation_number = self._compute_board_undone_dotation_nb(depreciation_date, total_days)
-
-            for x in range(len(posted_depreciation_line_ids), undone_dotation_number):
-                sequence = x + 1
-                amount = self._compute_board_amount(sequence, residual_amount, amount_to_depr,
-                                                    undone_dotation_number, posted_depreciation_line_ids,
-                                                    total_days, depreciation_date)
-                amount = self.currency_id.round(amount)
-                if float_is_zero(amount, precision_rounding=self.currency_id.rounding):
-                    continue
-                residual_amount -= amount
-                vals = {
-                    'amount': amount,
-                    'asset_id': self.id,
-                    'sequence': sequence,
-                    'name': (self.code or '') + '/' + str(sequence),
-                    'remaining_value': residual_amount,
-                    'depreciated_value': self.value - (self.salvage_value + residual_amount),
-                    'depreciation_date': depreciation_date,
-                }
-                commands.append((0, False, vals))
+        amount_to_depr = residual_amount = self.value_residual
 
-                depreciation_date = depreciation_date + relativedelta(months=+self.method_period)
+        # if we already have some previous validated entries, starting date is last entry + method period
+        if posted_depreciation_line_ids and posted_depreciation_line_ids[-1].depreciation_date:
+            last_depreciation_date = fields.Date.from_string(posted_depreciation_line_ids[-1].depreciation_date)
+            depreciation_date = last_depreciation_date + relativedelta(months=+self.method_period)
+        else:
+            # depreciation_date computed from the purchase date
+            depreciation_date = self.date
+            if self.date_first_depreciation == 'last_day_period':
+                # depreciation_date = the last day of the month
+                depreciation_date = depreciation_date + relativedelta(day=31)
+                # ... or fiscalyear depending the number of period
+                if self.method_period == 12:
+                    depreciation_date = depreciation_date + relativedelta(month=int(self.company_id.fiscalyear_last_month))
+                    depreciation_date = depreciation_date + relativedelta(day=int(self.company_id.fiscalyear_last_day))
+                    if depreciation_date < self.date:
+                        depreciation_date = depreciation_date + relativedelta(years=1)
+            elif self.first_depreciation_manual_date and self.first_depreciation_manual_date != self.date:
+                # depreciation_date set manually from the 'first_depreciation_manual_date' field
+                depreciation_date = self.first_depreciation_manual_date
+        total_days = (depreciation_date.year % 4) and 365 or 366
+        month_day = depreciation_date.day
+        undone_dotation_number = self._compute_board_undone_dotation_nb(depreciation_date, total_days)
+
+        for x in range(len(posted_depreciation_line_ids), undone_dotation_number):
+            sequence = x + 1
+            amount = self._compute_board_amount(sequence, residual_amount, amount_to_depr,
+                                                undone_dotation_number, posted_depreciation_line_ids,
+                                                total_days, depreciation_date)
+            amount = self.currency_id.round(amount)
+            if float_is_zero(amount, precision_rounding=self.currency_id.rounding):
+                continue
+            residual_amount -= amount
+            schedule.append({
+                'amount': amount,
+                'asset_id': self.id,
+                'sequence': sequence,
+                'name': (self.code or '') + '/' + str(sequence),
+                'remaining_value': residual_amount,
+                'depreciated_value': self.value - (self.salvage_value + residual_amount),
+                'depreciation_date': depreciation_date,
+            })
+
+            depreciation_date = depreciation_date + relativedelta(months=+self.method_period)
+
+            if month_day > 28 and self.date_first_depreciation == 'manual':
+                max_day_in_month = calendar.monthrange(depreciation_date.year, depreciation_date.month)[1]
+                depreciation_date = depreciation_date.replace(day=min(max_day_in_month, month_day))
+
+            # datetime doesn't take into account that the number of days is not the same for each month
+            if not self.prorata and self.method_period % 12 != 0 and self.date_first_depreciation == 'last_day_period':
+                max_day_in_month = calendar.monthrange(depreciation_date.year, depreciation_date.month)[1]
+                depreciation_date = depreciation_date.replace(day=max_day_in_month)
+        return schedule
+
+    def _get_depreciation_line_changes(self, line, vals):
+        """ Return the values of `vals` that differ from the existing `line`. """
+        changes = {}
+        for field_name, value in vals.items():
+            if field_name in ('amount', 'remaining_value', 'depreciated_value'):
+                if self.currency_id.compare_amounts(line[field_name], value) != 0:
+                    changes[field_name] = value
+            elif field_name != 'asset_id' and line[field_name] != value:
+                changes[field_name] = value
+        return changes
 
-                if month_day > 28 and self.date_first_depreciation == 'manual':
-                    max_day_in_month = calendar.monthrange(depreciation_date.year, depreciation_date.month)[1]
-                    depreciation_date = depreciation_date.replace(day=min(max_day_in_month, month_day))
+    def compute_depreciation_board(self):
+        """ Recompute the unposted depreciation lines of the assets. The new
+            schedules are compared with the existing lines: only the lines that
+            changed are written, the missing ones are created at once and the
+            extra ones removed at once.
+        """
+        DepreciationLine = self.env['account.asset.depreciation.line']
+        lines_to_create = []
+        lines_to_unlink = DepreciationLine
+        for asset in self:
+            posted_depreciation_line_ids = asset.depreciation_line_ids.filtered(lambda x: x.move_check).sorted(key=lambda l: l.depreciation_date)
+            unposted_depreciation_line_ids = asset.depreciation_line_ids.filtered(lambda x: not x.move_check)
 
-                # datetime doesn't take into account that the number of days is not the same for each month
-                if not self.prorata and self.method_period % 12 != 0 and self.date_first_depreciation == 'last_day_period':
-                    max_day_in_month = calendar.monthrange(depreciation_date.year, depreciation_date.month)[1]
-                    depreciation_date = depreciation_date.replace(day=max_day_in_month)
+            existing_lines = {}
+            for line in unposted_depreciation_line_ids.sorted('id'):
+                if line.sequence in existing_lines:
+                    lines_to_unlink |= line
+                else:
+                    existing_lines[line.sequence] = line
 
-        self.write({'depreciation_line_ids': commands})
+            for vals in asset._compute_depreciation_schedule(posted_depreciation_line_ids):
+                line = existing_lines.pop(vals['sequence'], None)
+                if not line:
+                    lines_to_create.append(vals)
+                    continue
+                changes = asset._get_depreciation_line_changes(line, vals)
+                if changes:
+                    line.write(changes)
+            for line in existing_lines.values():
+                lines_to_unlink |= line
 
+        lines_to_unlink.unlink()
+        DepreciationLine.create(lines_to_create)
         return True
 
     def validate(self):
@@ -493,15 +532,13 @@ class AccountAssetAsset(models.Model):
     @api.model_create_multi
     def create(self, vals_list):
         assets = super(AccountAssetAsset, self.with_context(mail_create_nolog=True)).create(vals_list)
-        for asset in assets:
-            asset.sudo().compute_depreciation_board()
+        assets.sudo().compute_depreciation_board()
         return assets
 
     def write(self, vals):
         res = super(AccountAssetAsset, self).write(vals)
         if 'depreciation_line_ids' not in vals and 'state' not in vals:
-            for rec in self:
-                rec.compute_depreciation_board()
+            self.compute_depreciation_board()
         return res
 
     def open_entries(self):
@@ -558,14 +595,11 @@ class AccountAssetDepreciationLine(models.Model):
             line.move_posted_check = True if line.move_id and line.move_id.state == 'posted' else False
 
     def create_move(self, post_move=True):
-        created_moves = self.env['account.move']
-        for line in self:
-            if line.move_id:
-                raise UserError(_('This depreciation is already linked to a journal entry. Please post or delete it.'))
-            move_vals = self._prepare_move(line)
-            move = self.env['account.move'].create(move_vals)
+        if any(line.move_id for line in self):
+            raise UserError(_('This depreciation is already linked to a journal entry. Please post or delete it.'))
+        created_moves = self.env['account.move'].create([self._prepare_move(line) for line in self])
+        for line, move in zip(self, created_moves):
             line.write({'move_id': move.id, 'move_check': True})
-            created_moves |= move
 
         if post_move and created_moves:
             created_moves.filtered(lambda m: any(m.asset_depreciation_ids.mapped('asset_id.category_id.open_asset'))).action_post()
@@ -652,13 +686,17 @@ class AccountAssetDepreciationLine(models.Model):
         return move_vals
 
     def create_grouped_move(self, post_move=True):
+        """ Create one entry per asset category for the depreciation lines. """
         if not self.exists():
             return []
 
-        created_moves = self.env['account.move']
-        move = self.env['account.move'].create(self._prepare_move_grouped())
-        self.write({'move_id': move.id, 'move_check': True})
-        created_moves |= move
+        lines_by_category = [
+            self.browse(line.id for line in lines)
+            for category, lines in groupby(self.exists(), key=lambda l: l.asset_id.category_id)
+        ]
+        created_moves = self.env['account.move'].create([lines._prepare_move_grouped() for lines in lines_by_category])
+        for lines, move in zip(lines_by_category, created_moves):
+            lines.write({'move_id': move.id, 'move_check': True})
 
         if post_move and created_moves:
             created_moves.action_post()